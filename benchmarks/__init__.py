@@ -0,0 +1,20 @@
+"""Бенчмарки Блогикума.
+
+Запускаются из корня репозитория: ``python -m benchmarks.<модуль>``.
+"""
+import os
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'blogicum'
+
+
+def setup_django(environment='bench'):
+    """Подключает проект и настраивает Django с профилем BLOGICUM_ENV."""
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ['BLOGICUM_ENV'] = environment
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'blogicum.settings'
+    import django
+
+    django.setup()
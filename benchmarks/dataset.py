@@ -0,0 +1,141 @@
+"""Воспроизводимый набор данных для бенчмарков.
+
+Пользователи, категории, места, посты и комментарии создаются
+пачками с заданным зерном: одинаковые параметры дают одинаковые
+данные. Популярность неравномерна, как на живом блоге: вес k-й
+по популярности категории, автора или поста — ``1 / k ** skew``.
+Поэтому у немногих авторов много постов, а у немногих постов —
+большие обсуждения.
+
+Отдельный запуск наполняет базу для ручных проверок::
+
+    python -m benchmarks.dataset --db bench.sqlite3 --posts 20000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django
+
+# Все даты публикаций — за год до этой даты: данные не зависят от дня
+# запуска, а посты уже опубликованы.
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Пароль всех пользователей набора.
+PASSWORD = 'bench-password'
+DEFAULTS = {
+    'users': 500,
+    'categories': 20,
+    'locations': 30,
+    'posts': 10000,
+    'comments': 50000,
+    'skew': 1.1,
+    'seed': 0,
+}
+BATCH_SIZE = 1000
+
+
+def weights(count, skew):
+    """Веса по убыванию популярности: 1, 1/2**skew, 1/3**skew..."""
+    return [1 / rank ** skew for rank in range(1, count + 1)]
+
+
+def generate(users, categories, locations, posts, comments, skew, seed):
+    """Наполняет пустую базу; возвращает число строк по таблицам."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from faker import Faker
+
+    from blog.caching import forget_publication_state
+    from blog.counters import actual_comment_count
+    from blog.models import Category, Comment, Location, Post
+
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    # Хешировать пароль для каждого пользователя незачем и долго.
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        (User(id=index, username=f'user{index}', password=password)
+         for index in range(1, users + 1)),
+        batch_size=BATCH_SIZE,
+    )
+    Category.objects.bulk_create(
+        Category(id=index, title=f'Категория {index}',
+                 slug=f'category-{index}', description=fake.sentence())
+        for index in range(1, categories + 1)
+    )
+    Location.objects.bulk_create(
+        Location(id=index, name=fake.city())
+        for index in range(1, locations + 1)
+    )
+    # Тексты повторяются: Faker на каждый пост дорог для больших наборов.
+    texts = [fake.text(800) for _ in range(200)]
+    titles = [fake.sentence(nb_words=5)[:-1] for _ in range(200)]
+    author_ids = rng.choices(range(1, users + 1), weights(users, skew),
+                             k=posts)
+    category_ids = rng.choices(range(1, categories + 1),
+                               weights(categories, skew), k=posts)
+    Post.objects.bulk_create(
+        (Post(id=index, title=rng.choice(titles), text=rng.choice(texts),
+              pub_date=EPOCH - timedelta(seconds=rng.randrange(365 * 86400)),
+              # Каждый двадцатый пост — черновик.
+              is_published=rng.random() >= 0.05,
+              author_id=author_ids[index - 1],
+              category_id=category_ids[index - 1],
+              location_id=rng.randint(1, locations))
+         for index in range(1, posts + 1)),
+        batch_size=BATCH_SIZE,
+    )
+    comment_texts = [fake.sentence(nb_words=12) for _ in range(200)]
+    post_ids = rng.choices(range(1, posts + 1), weights(posts, skew),
+                           k=comments)
+    Comment.objects.bulk_create(
+        (Comment(id=index, text=rng.choice(comment_texts),
+                 post_id=post_ids[index - 1],
+                 author_id=rng.randint(1, users))
+         for index in range(1, comments + 1)),
+        batch_size=BATCH_SIZE,
+    )
+    Post.objects.update(comment_count=actual_comment_count())
+    forget_publication_state()
+    return {'users': users, 'categories': categories,
+            'locations': locations, 'posts': posts, 'comments': comments}
+
+
+def create_database(path, **params):
+    """Создаёт базу-файл path с набором данных; возвращает секунды."""
+    from django.core.management import call_command
+    from django.db import connection
+
+    connection.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(f'{path}{suffix}'):
+            os.remove(f'{path}{suffix}')
+    started = time.perf_counter()
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
+    generate(**params)
+    return time.perf_counter() - started
+
+
+def add_arguments(parser):
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f'--{name}', type=type(default), default=default)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+    os.environ['BLOGICUM_BENCH_DB'] = os.path.abspath(args.db)
+    setup_django('bench')
+    params = {name: getattr(args, name) for name in DEFAULTS}
+    elapsed = create_database(args.db, **params)
+    print(f'{args.db}: {params} за {elapsed:.1f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""Нагрузочный прогон основных страниц с базовой линией.
+
+На новой базе-файле создаётся набор данных benchmarks.dataset, затем
+сценарии index, category_posts, post_detail, profile и add_comment
+прогоняются через тестовый клиент Django (``client``: только код
+приложения) и через настоящий многопоточный WSGI-сервер по HTTP
+(``wsgi``: вместе с разбором HTTP и middleware сервера). Адреса
+выбираются с той же неравномерной популярностью, что и данные, и
+с тем же зерном, поэтому прогоны с одинаковыми параметрами делают
+одинаковые запросы.
+
+Для каждого сценария печатаются p50/p95/p99 задержки, запросы в
+секунду и запросы к БД на запрос (по метрикам blog.metrics). ``--save``
+сохраняет результат в JSON, ``--compare`` сравнивает с сохранённым
+и завершается с кодом 1, если какой-то сценарий стал хуже больше чем
+на ``--tolerance``::
+
+    python -m benchmarks.load --compare benchmarks/baseline.json
+
+Базовая линия benchmarks/baseline.json снята с параметрами по
+умолчанию; сравнивать имеет смысл только с ними (иначе печатается
+предупреждение). Задержки и rps зависят от машины, поэтому после
+намеренного изменения производительности или при переезде на другую
+машину базовую линию перезаписывают и коммитят вместе с изменением::
+
+    python -m benchmarks.load --save benchmarks/baseline.json
+
+В профиле bench кэш общий (DatabaseCache из prod), поэтому в запросы
+к БД на запрос входят и обращения к кэшу.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from benchmarks import setup_django
+from benchmarks.dataset import (DEFAULTS, PASSWORD, add_arguments,
+                                create_database, weights)
+
+# Сценарий: имя URL; сценарии выполняются в этом порядке, запись —
+# последней, чтобы не менять данные для чтения.
+SCENARIOS = {
+    'index': 'blog:index',
+    'category_posts': 'blog:category_posts',
+    'post_detail': 'blog:post_detail',
+    'profile': 'blog:profile',
+    'add_comment': 'blog:add_comment',
+}
+MODES = ('client', 'wsgi')
+LATENCIES = ('p50', 'p95', 'p99')
+
+
+class Targets:
+    """Адреса сценариев с популярностью как в наборе данных."""
+
+    def __init__(self, skew, seed):
+        from django.contrib.auth.models import User
+
+        from blog.models import Category, Post
+
+        self.rng = random.Random(seed)
+        self.categories = list(Category.objects.order_by('id').values_list(
+            'slug', flat=True
+        ))
+        self.posts = list(Post.objects.published().order_by('id').values_list(
+            'id', flat=True
+        ))
+        self.authors = list(User.objects.order_by('id').values_list(
+            'username', flat=True
+        ))
+        self.weights = {
+            name: weights(len(items), skew) for name, items in (
+                ('categories', self.categories), ('posts', self.posts),
+                ('authors', self.authors),
+            )
+        }
+
+    def pick(self, name):
+        return self.rng.choices(getattr(self, name), self.weights[name])[0]
+
+    def request(self, scenario):
+        """Метод, путь и данные формы очередного запроса сценария."""
+        if scenario == 'index':
+            return 'GET', '/', None
+        if scenario == 'category_posts':
+            return 'GET', f'/category/{self.pick("categories")}/', None
+        if scenario == 'post_detail':
+            return 'GET', f'/posts/{self.pick("posts")}/', None
+        if scenario == 'profile':
+            return 'GET', f'/profile/{self.pick("authors")}/', None
+        return ('POST', f'/posts/{self.pick("posts")}/comment/',
+                {'text': f'Комментарий {self.rng.randrange(10 ** 6)}'})
+
+    def plan(self, scenario, count):
+        return [self.request(scenario) for _ in range(count)]
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django, без HTTP."""
+
+    def __init__(self, username):
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        self.client = Client(SERVER_NAME='localhost')
+        if username is not None:
+            self.client.force_login(User.objects.get(username=username))
+
+    def send(self, method, path, data):
+        if method == 'GET':
+            return self.client.get(path).status_code
+        return self.client.post(path, data).status_code
+
+
+class HttpDriver:
+    """Запросы по HTTP с keep-alive, cookie сессии и CSRF."""
+
+    def __init__(self, address, username):
+        self.connection = http.client.HTTPConnection(*address, timeout=60)
+        self.cookies = SimpleCookie()
+        if username is not None:
+            self.request('GET', '/auth/login/')
+            status = self.send('POST', '/auth/login/', {
+                'username': username, 'password': PASSWORD,
+            })
+            assert status == 302, f'Вход {username}: ответ {status}.'
+
+    def request(self, method, path, data=None):
+        headers = {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{name}={morsel.value}'
+                for name, morsel in self.cookies.items()
+            )
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        response.read()
+        for header in response.headers.get_all('Set-Cookie') or ():
+            self.cookies.load(header)
+        return response.status
+
+    def send(self, method, path, data):
+        if method == 'POST':
+            data = dict(data, csrfmiddlewaretoken=self.cookies[
+                'csrftoken'
+            ].value)
+        return self.request(method, path, data)
+
+
+@contextmanager
+def wsgi_server():
+    """Многопоточный WSGI-сервер Django (как runserver) на свободном порту."""
+    from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                              WSGIRequestHandler)
+
+    from blogicum.wsgi import application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+    server.set_app(application)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def view_totals(view):
+    """Сколько запросов к сайту и к БД записано для имени URL."""
+    from blog import metrics
+
+    requests = queries = 0
+    for (name, labels), value in metrics.collect().items():
+        if ('view', view) not in labels:
+            continue
+        if name == 'blog_requests_total':
+            requests += value
+        elif name == 'blog_db_queries_total':
+            queries += value
+    return requests, queries
+
+
+def latency_summary(timings):
+    if len(timings) < 2:
+        timings = timings * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def run_scenario(drivers, plan, expected):
+    """Запросы plan поровну между drivers, каждый driver — в своём потоке."""
+    timings, errors = [], []
+    lock = threading.Lock()
+
+    def worker(driver, requests):
+        for method, path, data in requests:
+            started = time.perf_counter()
+            try:
+                status = driver.send(method, path, data)
+            except Exception as error:
+                status = repr(error)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                timings.append(elapsed)
+                if status != expected:
+                    errors.append(f'{method} {path}: {status}')
+
+    threads = [
+        threading.Thread(target=worker,
+                         args=(driver, plan[index::len(drivers)]))
+        for index, driver in enumerate(drivers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return timings, errors, elapsed
+
+
+def run_mode(make_driver, targets, args):
+    """Все сценарии одним способом отправки запросов."""
+    readers = [make_driver(None if args.anonymous else f'user{index}')
+               for index in range(1, args.concurrency + 1)]
+    writers = [make_driver(f'user{index}')
+               for index in range(1, args.concurrency + 1)]
+    results = {}
+    for scenario, view in SCENARIOS.items():
+        drivers, expected = (
+            (writers, 302) if scenario == 'add_comment' else (readers, 200)
+        )
+        run_scenario(drivers[:1], targets.plan(scenario, args.warmup),
+                     expected)
+        plan = targets.plan(scenario, args.requests)
+        before = view_totals(view)
+        timings, errors, elapsed = run_scenario(drivers, plan, expected)
+        requests, queries = (
+            after - start for after, start in zip(view_totals(view), before)
+        )
+        results[scenario] = {
+            **{key: round(value, 2)
+               for key, value in latency_summary(timings).items()},
+            'rps': round(len(plan) / elapsed, 1),
+            'queries': round(queries / requests, 2) if requests else None,
+            'errors': len(errors),
+        }
+        for error in errors[:3]:
+            print(f'  {scenario}: {error}', file=sys.stderr)
+    return results
+
+
+def regressions(baseline, report, tolerance):
+    """Сценарии, ставшие хуже базовой линии больше чем на tolerance."""
+    found = []
+    for mode, scenarios in report['results'].items():
+        for scenario, row in scenarios.items():
+            old = baseline['results'].get(mode, {}).get(scenario)
+            if old is None:
+                continue
+            name = f'{mode}/{scenario}'
+            for key in LATENCIES:
+                if row[key] > old[key] * (1 + tolerance):
+                    found.append(f'{name}: {key} {old[key]} → {row[key]} мс')
+            if row['rps'] < old['rps'] * (1 - tolerance):
+                found.append(f'{name}: rps {old["rps"]} → {row["rps"]}')
+            # Запросов к БД детерминированно столько же: рост на
+            # ползапроса в среднем — уже лишний запрос в части ответов.
+            if (row['queries'] or 0) > (old['queries'] or 0) + 0.5:
+                found.append(
+                    f'{name}: запросов к БД {old["queries"]} → '
+                    f'{row["queries"]}'
+                )
+            if row['errors'] > old['errors']:
+                found.append(f'{name}: ошибок {old["errors"]} → '
+                             f'{row["errors"]}')
+    return found
+
+
+def print_report(report, baseline=None):
+    columns = LATENCIES + ('rps', 'queries', 'errors')
+    print(f'{"сценарий":<24}' + ''.join(f'{name:>10}' for name in columns))
+    for mode, scenarios in report['results'].items():
+        for scenario, row in scenarios.items():
+            print(f'{mode + "/" + scenario:<24}'
+                  + ''.join(f'{str(row[name]):>10}' for name in columns))
+            old = (baseline or {}).get('results', {}).get(mode, {}).get(
+                scenario
+            )
+            if old:
+                print(f'{"  база":<24}'
+                      + ''.join(f'{str(old[name]):>10}' for name in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter,
+    )
+    add_arguments(parser)
+    parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='запросов на сценарий')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--anonymous', action='store_true',
+                        help='читать страницы без входа (через кэш страниц)')
+    parser.add_argument('--db', help='файл базы; по умолчанию временный')
+    parser.add_argument('--save', metavar='JSON')
+    parser.add_argument('--compare', metavar='JSON')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(
+        tempfile.mkdtemp(prefix='blogicum-load-'), 'bench.sqlite3'
+    ))
+    os.environ['BLOGICUM_BENCH_DB'] = db_path
+    setup_django('bench')
+    from django.core.cache import cache
+
+    dataset = {name: getattr(args, name) for name in DEFAULTS}
+    params = {**dataset, 'requests': args.requests,
+              'concurrency': args.concurrency, 'anonymous': args.anonymous}
+    report = {'params': params, 'results': {}}
+    for mode in MODES if args.mode == 'both' else (args.mode,):
+        # Каждый способ начинает с одинаковых данных и пустого кэша.
+        elapsed = create_database(db_path, **dataset)
+        cache.clear()
+        print(f'{mode}: набор данных создан за {elapsed:.1f} с',
+              file=sys.stderr)
+        targets = Targets(args.skew, args.seed)
+        if mode == 'client':
+            report['results'][mode] = run_mode(ClientDriver, targets, args)
+        else:
+            with wsgi_server() as address:
+                report['results'][mode] = run_mode(
+                    lambda username: HttpDriver(address, username),
+                    targets, args,
+                )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['params'] != params:
+            print(f'Параметры базовой линии другие: {baseline["params"]}',
+                  file=sys.stderr)
+    print(f'Задержка в мс; запросов на сценарий: {args.requests},'
+          f' потоков: {args.concurrency}')
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if baseline is not None:
+        found = regressions(baseline, report, args.tolerance)
+        for line in found:
+            print(f'Регрессия: {line}')
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Накладные расходы профиля разработки на один запрос.
+
+Сравнивает профиль dev (DEBUG, debug_toolbar) с bench (боевые
+настройки) на одних и тех же страницах. Каждый профиль запускается
+в отдельном процессе на чистой тестовой базе в памяти.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import setup_django
+
+PROFILES = ('dev', 'bench')
+URLS = ('/', '/pages/about/', '/auth/login/')
+
+
+def measure(environment, requests):
+    """Замер внутри дочернего процесса: мс на запрос по каждому URL."""
+    setup_django(environment)
+    from django.db import connection
+    from django.test import Client
+
+    connection.creation.create_test_db(verbosity=0)
+    client = Client(SERVER_NAME='localhost')
+    result = {}
+    for url in URLS:
+        client.get(url)
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+        result[url] = statistics.median(timings)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.child, args.requests)))
+        return
+
+    results = {}
+    for environment in PROFILES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.overhead', '--child',
+             environment, '--requests', str(args.requests)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[environment] = json.loads(output.splitlines()[-1])
+
+    print(f'Медиана из {args.requests} запросов, мс')
+    print(f'{"URL":<20}' + ''.join(f'{name:>10}' for name in PROFILES)
+          + f'{"разница":>10}')
+    for url in URLS:
+        dev, bench = (results[name][url] for name in PROFILES)
+        print(f'{url:<20}{dev:>10.2f}{bench:>10.2f}{dev - bench:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
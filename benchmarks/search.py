@@ -0,0 +1,103 @@
+"""Поиск по постам: icontains, FTS5 и индекс на чистом Python.
+
+На тестовой базе в памяти создаются посты со случайным русским текстом
+(Faker), затем для каждого запроса замеряется медиана времени:
+``title__icontains`` | ``text__icontains`` — как поиск в PostAdmin,
+blog.search.fts и blog.search.inverted. Заодно печатается размер
+индекса на диске.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+QUERIES = ('город', 'работа', 'новый день', '"новый день"', 'развит*')
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def create_posts(count):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from faker import Faker
+
+    from blog.models import Category, Post
+
+    fake = Faker('ru_RU')
+    Faker.seed(0)
+    author = User.objects.create_user('bench')
+    category = Category.objects.create(
+        title='Бенчмарк', description='-', slug='bench'
+    )
+    now = timezone.now()
+    Post.objects.bulk_create(
+        Post(title=fake.sentence(nb_words=6), text=fake.text(1500),
+             pub_date=now, author=author, category=category)
+        for _ in range(count)
+    )
+    return Post.objects.only('id', 'title', 'text')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django('bench')
+    from django.db import connection
+    from django.db.models import Q
+
+    connection.creation.create_test_db(verbosity=0)
+    from blog.models import Post
+    from blog.search import MAX_RESULTS
+    from blog.search.fts import Fts5Backend
+    from blog.search.inverted import InvertedIndexBackend
+
+    posts = create_posts(args.posts)
+    directory = Path(tempfile.mkdtemp(prefix='blogicum-search-'))
+    inverted = InvertedIndexBackend(directory)
+    fts = Fts5Backend()
+    started = time.perf_counter()
+    fts.index(posts.iterator())
+    fts_build = time.perf_counter() - started
+    started = time.perf_counter()
+    # Вне транзакции on_commit выполняется сразу.
+    inverted.index(posts.iterator())
+    inverted_build = time.perf_counter() - started
+    size = sum(path.stat().st_size for path in directory.iterdir())
+    print(f'Постов: {args.posts}. Индексация: FTS5 {fts_build:.1f} с,'
+          f' inverted {inverted_build:.1f} с ({size / 1024:.0f} КиБ).')
+
+    published = Post.objects.published()
+    backends = {
+        'icontains': lambda query: list(published.filter(
+            Q(title__icontains=query) | Q(text__icontains=query)
+        ).values_list('id', flat=True)[:MAX_RESULTS]),
+        'fts5': lambda query: fts.search(published, query, MAX_RESULTS),
+        'inverted': lambda query: inverted.search(
+            published, query, MAX_RESULTS
+        ),
+    }
+    print(f'Медиана из {args.repeat} запросов, мс')
+    print(f'{"Запрос":<16}' + ''.join(f'{name:>12}' for name in backends))
+    for query in QUERIES:
+        row = ''.join(
+            f'{median_ms(lambda: search(query), args.repeat):>12.2f}'
+            for search in backends.values()
+        )
+        print(f'{query:<16}{row}')
+
+
+if __name__ == '__main__':
+    main()
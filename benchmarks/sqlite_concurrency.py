@@ -0,0 +1,144 @@
+"""Конкуренция записи комментариев и чтения лент в SQLite.
+
+Писатели отправляют комментарии через blog:add_comment, читатели
+(авторизованные, чтобы не попадать в кэш страниц) открывают
+blog:index. Сравниваются PRAGMA из settings.SQLITE_PRAGMAS вместе
+с SQLITE_JOURNAL_MODE и настройки SQLite по умолчанию; каждый
+вариант — в своём процессе на новой базе-файле.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import setup_django
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def measure(db_path, pragmas, writers, readers, seconds):
+    """Замер внутри дочернего процесса."""
+    import os
+
+    os.environ['BLOGICUM_BENCH_DB'] = db_path
+    setup_django('bench')
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+    from django.utils import timezone
+
+    if not pragmas:
+        settings.SQLITE_PRAGMAS = {}
+        settings.SQLITE_JOURNAL_MODE = None
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
+    from blog.models import Category, Post
+
+    category = Category.objects.create(
+        title='Бенчмарк', description='-', slug='bench'
+    )
+    users = [User.objects.create_user(f'bench{i}')
+             for i in range(writers + readers)]
+    post = Post.objects.create(
+        title='Пост', text='Текст', pub_date=timezone.now(),
+        author=users[0], category=category,
+    )
+    connection.close()
+
+    stop = time.monotonic() + seconds
+    stats = {'write': [], 'read': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(user, kind):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        url = (reverse('blog:add_comment', args=[post.id])
+               if kind == 'write' else reverse('blog:index'))
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                if kind == 'write':
+                    client.post(url, {'text': 'Комментарий'})
+                else:
+                    client.get(url)
+            except Exception:
+                with lock:
+                    stats['errors'] += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                stats[kind].append(elapsed)
+        connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(user, kind))
+        for user, kind in zip(
+            users, ['write'] * writers + ['read'] * readers
+        )
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        kind: {
+            'requests': len(stats[kind]),
+            'p50': statistics.median(stats[kind]) if stats[kind] else 0.0,
+            'p95': percentile(stats[kind], 0.95),
+        }
+        for kind in ('write', 'read')
+    } | {'errors': stats['errors']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--pragmas', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.child, args.pragmas, args.writers,
+                                 args.readers, args.seconds)))
+        return
+
+    print(f'{args.writers} писателей, {args.readers} читателей,'
+          f' {args.seconds:g} с; задержки в мс')
+    print(f'{"вариант":<12}{"записей":>9}{"p95 зап.":>10}'
+          f'{"чтений":>9}{"p95 чт.":>10}{"ошибок":>8}')
+    for name, pragmas in (('default', False), ('pragmas', True)):
+        with tempfile.TemporaryDirectory() as directory:
+            command = [
+                sys.executable, '-m', 'benchmarks.sqlite_concurrency',
+                '--child', str(Path(directory) / 'bench.sqlite3'),
+                '--writers', str(args.writers),
+                '--readers', str(args.readers),
+                '--seconds', str(args.seconds),
+            ] + (['--pragmas'] if pragmas else [])
+            output = subprocess.run(
+                command, check=True, capture_output=True, text=True
+            ).stdout
+        result = json.loads(output.splitlines()[-1])
+        write, read = result['write'], result['read']
+        print(f'{name:<12}{write["requests"]:>9}{write["p95"]:>10.1f}'
+              f'{read["requests"]:>9}{read["p95"]:>10.1f}'
+              f'{result["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Задержка первого запроса «холодного» воркера.
+
+Каждый вариант запускается в отдельном процессе: профиль разработки,
+профиль bench (боевые настройки с кэширующим загрузчиком) без
+предварительной компиляции шаблонов и с ней.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import setup_django
+
+CASES = {
+    'dev': ('dev', False),
+    'production': ('bench', False),
+    'production+warmup': ('bench', True),
+}
+# Страницы без обращений к БД: замеряется именно разбор шаблонов.
+URLS = ('/pages/about/', '/auth/login/', '/auth/registration/')
+
+
+def measure(environment, warm):
+    """Замер внутри дочернего процесса; результат — словарь в мс."""
+    started = time.perf_counter()
+    setup_django(environment)
+    from django.test import Client
+
+    from blogicum.warmup import warm_templates
+
+    result = {'boot': 0.0, 'warmup': 0.0}
+    if warm:
+        result['warmup'] = warm_templates()[1] * 1000
+    result['boot'] = (time.perf_counter() - started) * 1000
+    client = Client(SERVER_NAME='localhost')
+    for attempt in ('first', 'second'):
+        request_started = time.perf_counter()
+        for url in URLS:
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        result[attempt] = (time.perf_counter() - request_started) * 1000
+    return result
+
+
+def run_case(environment, warm):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child',
+         environment] + (['--warm'] if warm else []),
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.child, args.warm)))
+        return
+
+    print(f'Первые запросы к {", ".join(URLS)}; медиана из {args.runs}, мс')
+    print(f'{"вариант":<20}{"старт":>10}{"прогрев":>10}'
+          f'{"первый":>10}{"второй":>10}')
+    for name, (environment, warm) in CASES.items():
+        runs = [run_case(environment, warm) for _ in range(args.runs)]
+        row = {
+            key: statistics.median(run[key] for run in runs)
+            for key in ('boot', 'warmup', 'first', 'second')
+        }
+        print(f'{name:<20}{row["boot"]:>10.1f}{row["warmup"]:>10.1f}'
+              f'{row["first"]:>10.1f}{row["second"]:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,170 @@
+import math
+
+from django import forms
 from django.contrib import admin
-from .models import Category, Location, Post, Comment
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from . import export, jobs
+from .models import Category, Comment, Job, Location, Post
+from .paginators import EstimatedCountPaginator
+
+
+class ExportMixin:
+    """Потоковая выгрузка строк модели по адресу ``<модель>/export/``.
+
+    Параметры выгрузки — в строке запроса, см.
+    blog.export.streaming_response.
+    """
+
+    export_kind = None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('export/', self.admin_site.admin_view(self.export_view),
+                 name='%s_%s_export' % info),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return export.streaming_response(self.export_kind, request.GET)
+
+
+class EstimatedCountMixin:
+    """Список без точного COUNT(*), см. EstimatedCountPaginator.
+
+    Пагинатор получает номер запрошенной страницы: точный подсчёт
+    доходит до неё, даже если строк больше EXACT_COUNT_LIMIT.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        try:
+            page_number = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page_number = 1
+        return self.paginator(queryset, per_page, orphans,
+                              allow_empty_first_page, page_number=page_number)
+
+
+class BackgroundActionsMixin:
+    """Массовые действия пачками в фоновой очереди.
+
+    Запрос только собирает id строк и ставит задачи, поэтому действие
+    над десятками тысяч строк не упирается во время ответа.
+    """
+
+    # Сколько строк обрабатывает одна задача.
+    chunk_size = 1000
+
+    def get_actions(self, request):
+        # Стандартное удаление рисует подтверждение со всеми строками
+        # и удаляет их по одной в запросе.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def run_in_background(self, request, task, ids, description,
+                          **payload):
+        ids = list(ids)
+        group = jobs.enqueue_chunks(task, ids, self.chunk_size, **payload)
+        self.message_user(request, format_html(
+            '{}: {} шт., пачек: {}. <a href="{}">Ход выполнения</a>.',
+            description, len(ids), math.ceil(len(ids) / self.chunk_size),
+            reverse('admin:blog_job_changelist') + f'?group={group}',
+        ))
+
+
+class MoveToCategoryForm(forms.Form):
+    category = forms.ModelChoiceField(Category.objects.all(),
+                                      label='Категория')
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которому выбранный объект передаёт форма.
+
+    Обычный виджет запрашивает подпись выбранного значения из БД —
+    в списке постов это запрос на каждое поле каждой строки.
+    """
+
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        chosen = [str(item) for item in value if item not in ('', None)]
+        if self.selected is None or chosen != [str(self.selected.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, self.selected.pk,
+            self.choices.field.label_from_instance(self.selected),
+            True, len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class PostChangelistForm(forms.ModelForm):
+    """Строка списка постов: выбранные значения — из загруженных объектов."""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            # RelatedFieldWidgetWrapper добавляет ссылки «изменить/добавить».
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, LoadedAutocompleteSelect):
+                widget.selected = getattr(self.instance, name, None)
 
-class PostAdmin(admin.ModelAdmin):
+
+class AuthorFilter(admin.ListFilter):
+    """Фильтр по имени автора: поле ввода вместо списка всех авторов."""
+
+    title = 'автору'
+    parameter_name = 'author__username'
+    template = 'admin/blog/input_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        self.value = params.pop(self.parameter_name, '').strip()
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.parameter_name]
+
+    def queryset(self, request, queryset):
+        if self.value:
+            return queryset.filter(author__username=self.value)
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value,
+            'remove_query': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            # Остальные фильтры и поиск сохраняются; страница — с начала.
+            'hidden': [(key, value) for key, value in changelist.params.items()
+                       if key not in (self.parameter_name, 'p')],
+        }
+
+
+class PostAdmin(EstimatedCountMixin, BackgroundActionsMixin, ExportMixin,
+                admin.ModelAdmin):
+    export_kind = 'posts'
+    actions = ('publish', 'unpublish', 'move_to_category', 'delete_posts',
+               'delete_by_author')
     list_display = (
         'title',
         'category',
@@ -18,11 +180,135 @@ class PostAdmin(admin.ModelAdmin):
         'location'
     )
     search_fields = ('title',)
-    list_filter = ('author', 'location', 'category', 'created_at')
+    list_filter = (AuthorFilter, 'location', 'category', 'created_at')
     list_display_links = ('title',)
+    # Связанные объекты строк — одним запросом со списком, а не по
+    # запросу на строку.
+    list_select_related = ('author', 'category', 'location')
+    # Вместо <select> со всеми пользователями в каждой строке.
+    autocomplete_fields = ('author', 'category', 'location')
+
+    @staticmethod
+    def _ids(queryset):
+        return queryset.order_by('pk').values_list('pk', flat=True)
+
+    @admin.action(description='Опубликовать', permissions=['change'])
+    def publish(self, request, queryset):
+        self.run_in_background(request, 'blog.bulk_posts',
+                               self._ids(queryset), 'Публикация',
+                               operation='publish')
+
+    @admin.action(description='Снять с публикации', permissions=['change'])
+    def unpublish(self, request, queryset):
+        self.run_in_background(request, 'blog.bulk_posts',
+                               self._ids(queryset), 'Снятие с публикации',
+                               operation='unpublish')
+
+    @admin.action(description='Перенести в категорию',
+                  permissions=['change'])
+    def move_to_category(self, request, queryset):
+        form = MoveToCategoryForm(
+            request.POST if 'apply' in request.POST else None
+        )
+        if form.is_valid():
+            category = form.cleaned_data['category']
+            self.run_in_background(
+                request, 'blog.bulk_posts', self._ids(queryset),
+                f'Перенос в категорию «{category}»', operation='move',
+                category_id=category.pk,
+            )
+            return None
+        return TemplateResponse(request, 'admin/blog/move_to_category.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Перенос публикаций в категорию',
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
+
+    @admin.action(description='Удалить', permissions=['delete'])
+    def delete_posts(self, request, queryset):
+        self.run_in_background(request, 'blog.bulk_posts',
+                               self._ids(queryset), 'Удаление',
+                               operation='delete')
+
+    @admin.action(description='Удалить все публикации их авторов',
+                  permissions=['delete'])
+    def delete_by_author(self, request, queryset):
+        posts = Post.objects.filter(author__in=queryset.values('author'))
+        self.run_in_background(request, 'blog.bulk_posts',
+                               self._ids(posts),
+                               'Удаление публикаций авторов',
+                               operation='delete')
+
+    def lookup_allowed(self, lookup, value):
+        # Параметр фильтра-класса не выводится из list_filter.
+        if lookup == AuthorFilter.parameter_name:
+            return True
+        return super().lookup_allowed(lookup, value)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangelistForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', LoadedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get('using')
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class CategoryAdmin(admin.ModelAdmin):
+    search_fields = ('title', 'slug')
+
+
+class LocationAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+class CommentAdmin(EstimatedCountMixin, BackgroundActionsMixin, ExportMixin,
+                   admin.ModelAdmin):
+    export_kind = 'comments'
+    actions = ('delete_comments', 'delete_by_author')
+    list_display = ('__str__', 'post', 'author', 'created_at')
+    list_select_related = ('post', 'author')
+
+    @admin.action(description='Удалить', permissions=['delete'])
+    def delete_comments(self, request, queryset):
+        self.run_in_background(
+            request, 'blog.bulk_comments',
+            queryset.order_by('pk').values_list('pk', flat=True),
+            'Удаление комментариев',
+        )
+
+    @admin.action(description='Удалить все комментарии их авторов',
+                  permissions=['delete'])
+    def delete_by_author(self, request, queryset):
+        self.run_in_background(
+            request, 'blog.bulk_comments',
+            Comment.objects.filter(
+                author__in=queryset.values('author')
+            ).order_by('pk').values_list('pk', flat=True),
+            'Удаление комментариев авторов',
+        )
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'attempts', 'run_after',
+                    'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('=group',)
+    readonly_fields = ('task', 'group', 'payload', 'attempts', 'locked_until',
+                       'lease', 'last_error', 'created_at', 'started_at',
+                       'finished_at')
 
 
-admin.site.register(Category)
-admin.site.register(Location)
+admin.site.register(Category, CategoryAdmin)
+admin.site.register(Location, LocationAdmin)
 admin.site.register(Post, PostAdmin)
-admin.site.register(Comment)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Job, JobAdmin)
@@ -1,7 +1,26 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Кэши, которые каждый процесс держит у себя в памяти.
+PER_PROCESS_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def check_shared_cache():
+    """Фоновые задачи без общего кэша сбрасывали бы кэш только воркеру."""
+    backend = settings.CACHES['default']['BACKEND']
+    if not settings.BLOG_JOBS_EAGER and backend in PER_PROCESS_CACHES:
+        raise ImproperlyConfigured(
+            f'BLOG_JOBS_EAGER = False требует кэша, общего для процессов:'
+            f' сбросы из run_jobs не дойдут до сайта через {backend}.'
+        )
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        check_shared_cache()
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,303 @@
+"""Потоковая загрузка категорий, мест, постов и комментариев.
+
+Формат — как у dumpdata: объекты ``{"model": "blog.post", "pk": 1,
+"fields": {...}}`` JSON-массивом или по одному в строке (JSONL). Файл
+читается кусками, в памяти держатся только текущие пачки и строки,
+которые ждут строк, на которые ссылаются: dumpdata пишет модели по
+алфавиту, посты — раньше категорий и мест. Ждущие строки вставляются,
+как только их ссылки появятся в базе, а отклоняются, только если
+ссылок нет и в конце загрузки. Пачка вставляется одним INSERT в своей
+транзакции; строки, которые уже есть в базе, пропускаются, поэтому
+прерванную загрузку можно запустить заново.
+
+Сигналы при вставке пачкой не срабатывают, поэтому после каждой пачки
+загрузчик сам пересчитывает счётчики комментариев, ставит посты
+в очередь на индексацию и сбрасывает кэш страниц.
+"""
+import json
+import time
+from collections import Counter
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from . import jobs, snapshots
+from .caching import (bump, category_group, forget_publication_state,
+                      groups_for_posts)
+from .counters import actual_comment_count
+from .models import Category, Comment, Location, Post
+
+MODELS = {
+    'blog.category': Category,
+    'blog.location': Location,
+    'blog.post': Post,
+    'blog.comment': Comment,
+}
+# Порядок вставки: пачка ссылается только на модели левее.
+ORDER = (Category, Location, Post, Comment)
+# Сколько символов читать из файла за раз.
+CHUNK_SIZE = 1 << 20
+# Сколько ошибок в строках запоминать для отчёта.
+MAX_ERRORS = 100
+
+
+def _skip_separators(buffer, position):
+    while position < len(buffer) and buffer[position] in ' \t\r\n,':
+        position += 1
+    return position
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива из потока по одному."""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидался JSON-массив объектов.')
+    position, eof = 1, False
+    while True:
+        position = _skip_separators(buffer, position)
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Элемент разрезан границей куска: дочитываем.
+                if eof:
+                    raise
+            else:
+                yield item
+                position = end
+                if position > chunk_size:
+                    buffer, position = buffer[position:], 0
+                continue
+        elif eof:
+            raise ValueError('JSON-массив не закрыт.')
+        more = stream.read(chunk_size)
+        eof = not more
+        buffer, position = buffer[position:] + more, 0
+
+
+def iter_json_lines(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+class BulkLoader:
+    """Собирает строки в пачки по моделям и вставляет их."""
+
+    def __init__(self, batch_size=500, using=DEFAULT_DB_ALIAS,
+                 on_batch=None):
+        self.batch_size = batch_size
+        self.using = using
+        self.on_batch = on_batch
+        self.pending = {model: [] for model in ORDER}
+        # Строки, чьих ссылок ещё нет в базе.
+        self.waiting = {model: [] for model in ORDER}
+        self.loaded = Counter()
+        self.skipped = Counter()
+        self.rejected = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def rate(self):
+        """Строк в секунду с начала загрузки."""
+        elapsed = time.monotonic() - self.started
+        return sum(self.loaded.values()) / elapsed if elapsed else 0
+
+    def add(self, record):
+        label = record.get('model') if isinstance(record, dict) else None
+        model = MODELS.get(label)
+        if model is None:
+            self.skipped[label] += 1
+            return
+        try:
+            obj = self.build(model, record)
+        except ValidationError as error:
+            self.reject(label, record.get('pk'), '; '.join(error.messages))
+            return
+        self.pending[model].append(obj)
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush(model)
+
+    def reject(self, label, pk, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f'{label} pk={pk}: {message}')
+
+    @staticmethod
+    def build(model, record):
+        """Объект модели из записи с проверкой полей.
+
+        Ссылки на другие строки проверяются потом, целой пачкой.
+        """
+        if record.get('pk') is None:
+            raise ValidationError('Нет pk.')
+        obj = model(pk=model._meta.pk.to_python(record['pk']))
+        for name, value in record.get('fields', {}).items():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete:
+                raise ValidationError(f'Неизвестное поле {name}.')
+            setattr(obj, field.attname,
+                    None if value is None else field.to_python(value))
+        for field in model._meta.concrete_fields:
+            if (getattr(field, 'auto_now_add', False)
+                    and getattr(obj, field.attname) is None):
+                setattr(obj, field.attname, timezone.now())
+        obj.full_clean(
+            exclude=[field.name for field in model._meta.concrete_fields
+                     if field.is_relation],
+            validate_unique=False,
+        )
+        return obj
+
+    def _chunks(self, items):
+        items = list(items)
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def _existing(self, model, ids):
+        """Те из ids, что уже есть в базе."""
+        existing = set()
+        for chunk in self._chunks(set(ids) - {None}):
+            existing.update(
+                model._base_manager.using(self.using)
+                .filter(pk__in=chunk).values_list('pk', flat=True)
+            )
+        return existing
+
+    def _check_references(self, model, objs):
+        """Делит строки на те, чьи ссылки есть в базе, и остальные.
+
+        Возвращает готовые строки и пары (строка, сообщение) для тех,
+        кому не хватает строки, на которую они ссылаются.
+        """
+        missing = {}
+        for field in model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            existing = self._existing(
+                field.related_model,
+                (getattr(obj, field.attname) for obj in objs),
+            )
+            for index, obj in enumerate(objs):
+                value = getattr(obj, field.attname)
+                if value is not None and value not in existing:
+                    missing.setdefault(index,
+                                       f'Нет строки {field.name}={value}.')
+        ready = [obj for index, obj in enumerate(objs)
+                 if index not in missing]
+        return ready, [(objs[index], message)
+                       for index, message in sorted(missing.items())]
+
+    def _insert(self, model, objs):
+        """Вставляет новые строки пачки и возвращает вставленные.
+
+        Строки, которые уже есть в базе, пропускаются молча; строки,
+        пропущенные из-за другого ограничения уникальности, отклоняются.
+        """
+        unique = {}
+        for obj in objs:
+            unique.setdefault(obj.pk, obj)
+        existing = self._existing(model, unique)
+        objs = [obj for pk, obj in unique.items() if pk not in existing]
+        # bulk_create заменил бы created_at (auto_now_add) текущим
+        # временем, поэтому пачка вставляется тем же INSERT, но «сырым»,
+        # как при loaddata.
+        fields = model._meta.concrete_fields
+        connection = connections[self.using]
+        size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+        queryset = model._base_manager.using(self.using)
+        for start in range(0, len(objs), size):
+            queryset._insert(objs[start:start + size], fields=fields,
+                             raw=True, using=self.using,
+                             ignore_conflicts=True)
+        inserted = self._existing(model, (obj.pk for obj in objs))
+        for obj in objs:
+            if obj.pk not in inserted:
+                self.reject(model._meta.label_lower, obj.pk,
+                            'Нарушает уникальность.')
+        return [obj for obj in objs if obj.pk in inserted]
+
+    def flush(self, model):
+        """Вставляет накопленную пачку модели и всех, на кого она ссылается.
+
+        Строки без строк, на которые они ссылаются, ждут следующих пачек.
+        """
+        for dependency in ORDER[:ORDER.index(model)]:
+            if self.pending[dependency]:
+                self.flush(dependency)
+        ready, missing = self._check_references(model, self.pending[model])
+        self.pending[model] = []
+        self.waiting[model].extend(obj for obj, _ in missing)
+        self._store(model, ready)
+
+    def _store(self, model, objs):
+        if not objs:
+            return
+        with transaction.atomic(using=self.using):
+            objs = self._insert(model, objs)
+            if objs:
+                self._refresh(model, objs)
+        self.loaded[model._meta.label_lower] += len(objs)
+        if self.on_batch is not None:
+            self.on_batch(self)
+        if objs:
+            self._retry(model)
+
+    def _retry(self, model):
+        """Вставляет ждущие строки, чьи ссылки появились вместе с model."""
+        for dependent in ORDER[ORDER.index(model) + 1:]:
+            if self.waiting[dependent]:
+                ready, missing = self._check_references(
+                    dependent, self.waiting[dependent]
+                )
+                self.waiting[dependent] = [obj for obj, _ in missing]
+                self._store(dependent, ready)
+
+    @staticmethod
+    def _refresh(model, objs):
+        """То, что при обычном save сделали бы сигналы."""
+        if model is Category:
+            bump({category_group(obj.slug) for obj in objs})
+        elif model is Post:
+            post_ids = [obj.pk for obj in objs]
+            bump(groups_for_posts(Post.objects.filter(pk__in=post_ids)))
+            jobs.enqueue('blog.index_posts', post_ids=post_ids)
+        elif model is Comment:
+            post_ids = sorted({obj.post_id for obj in objs})
+            Post.objects.filter(pk__in=post_ids).update(
+                comment_count=actual_comment_count()
+            )
+            bump(groups_for_posts(Post.objects.filter(pk__in=post_ids)))
+            snapshots.drop(post_ids)
+
+    def finish(self):
+        """Вставляет остатки пачек и сдвигает счётчики первичных ключей.
+
+        Ждущие строки, чьих ссылок так и нет в базе, отклоняются.
+        """
+        for model in ORDER:
+            if self.pending[model]:
+                self.flush(model)
+        for model in ORDER:
+            ready, missing = self._check_references(model,
+                                                    self.waiting[model])
+            self.waiting[model] = []
+            self._store(model, ready)
+            for obj, message in missing:
+                self.reject(model._meta.label_lower, obj.pk, message)
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(), ORDER)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        forget_publication_state()
@@ -0,0 +1,269 @@
+"""Кэш страниц блога для анонимных читателей.
+
+Каждая страница зависит от «групп»: лента главной (``index``),
+категория (``category:<slug>``), автор (``author:<username>``),
+пост (``post:<id>``). У группы есть версия в кэше; ключ страницы
+включает версии её групп, поэтому сброс страниц — это смена версии
+группы, без перебора и удаления самих ключей.
+"""
+import hashlib
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import metrics
+from .routers import request_state
+
+# Параметры запроса, от которых зависит содержимое страницы.
+PAGE_PARAMS = ('cursor', 'page')
+
+INDEX = 'index'
+
+PUBLICATION_KEY = 'blog:publication'
+
+
+def post_group(post_id):
+    return f'post:{post_id}'
+
+
+def category_group(slug):
+    return f'category:{slug}'
+
+
+def author_group(username):
+    return f'author:{username}'
+
+
+def _version_key(group):
+    return f'blog:version:{group}'
+
+
+def get_versions(groups):
+    """Текущие версии групп одним обращением к кэшу."""
+    keys = {_version_key(group): group for group in groups}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    for key, group in keys.items():
+        if group not in versions:
+            # Версия вытеснена или ещё не заводилась: новая метка времени
+            # гарантирует, что старые страницы группы не подхватятся.
+            cache.add(key, time.time_ns(), None)
+            versions[group] = cache.get(key)
+    return versions
+
+
+def bump(groups):
+    """Сбрасывает страницы групп, выдавая им новые версии."""
+    if groups:
+        version = time.time_ns()
+        cache.set_many(
+            {_version_key(group): version for group in groups}, None
+        )
+
+
+def groups_for_posts(posts):
+    """Группы страниц, на которых выводятся посты из выборки."""
+    groups = {INDEX}
+    for post_id, slug, username in posts.values_list(
+        'id', 'category__slug', 'author__username'
+    ).iterator():
+        groups.add(post_group(post_id))
+        groups.add(author_group(username))
+        if slug:
+            groups.add(category_group(slug))
+    return groups
+
+
+def attach_card_versions(posts):
+    """Проставляет постам версию карточки для кэша фрагментов.
+
+    Версия карточки — версия группы поста: она меняется при правке поста,
+    его комментариев, категории или местоположения.
+    """
+    versions = get_versions({post_group(post.id) for post in posts})
+    for post in posts:
+        post.card_version = versions[post_group(post.id)]
+    return posts
+
+
+def _publication_dates(now):
+    from .models import Post
+
+    # С основной базы: отстающая реплика закэшировала бы старые даты.
+    posts = Post.objects.using(DEFAULT_DB_ALIAS).filter(is_published=True)
+    latest = posts.filter(pub_date__lte=now).order_by(
+        '-pub_date'
+    ).values_list('pub_date', flat=True).first()
+    upcoming = posts.filter(pub_date__gt=now).order_by(
+        'pub_date'
+    ).values_list('pub_date', flat=True).first()
+    return latest, upcoming
+
+
+def publication_state():
+    """Даты последней наступившей и ближайшей отложенной публикации.
+
+    Пара хранится в кэше и пересчитывается, когда наступает отложенная
+    публикация или меняется пост, — обычный запрос обходится без БД.
+    """
+    now = timezone.now()
+    state = cache.get(PUBLICATION_KEY)
+    if state is None or (state[1] is not None and state[1] <= now):
+        state = _publication_dates(now)
+        cache.set(PUBLICATION_KEY, state, None)
+    return state
+
+
+def forget_publication_state():
+    cache.delete(PUBLICATION_KEY)
+
+
+def seconds_until_next_publication():
+    """Сколько секунд до ближайшего отложенного поста (или None)."""
+    next_date = publication_state()[1]
+    if next_date is None:
+        return None
+    return max((next_date - timezone.now()).total_seconds(), 1)
+
+
+def _read_primary_if_fresh(versions):
+    """Собирать страницу с основной базы, если группы только что сброшены.
+
+    Реплика может отставать от записи, сбросившей страницу, а собранная
+    с неё страница попала бы в кэш под новой версией.
+    """
+    state = request_state.get()
+    if state is not None and versions and (
+        time.time_ns() - max(versions.values())
+        < settings.REPLICA_STICKY_SECONDS * 10 ** 9
+    ):
+        state['pinned'] = True
+
+
+def _page_key(request, versions):
+    params = '&'.join(
+        f'{name}={request.GET.get(name, "")}' for name in PAGE_PARAMS
+    )
+    stamp = ','.join(
+        f'{group}={version}' for group, version in sorted(versions.items())
+    )
+    raw = f'{request.path}?{params}|{stamp}'
+    return 'blog:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_page_for_anonymous(groups_func, scheduled=False):
+    """Кэширует страницу для неавторизованных пользователей.
+
+    groups_func получает именованные аргументы view из URL и возвращает
+    группы страницы. Для лент (scheduled=True) срок хранения не переходит
+    момент публикации ближайшего отложенного поста.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view_func(request, *args, **kwargs)
+            versions = get_versions(groups_func(**kwargs))
+            key = _page_key(request, versions)
+            response = cache.get(key)
+            metrics.cache_result('page', response is not None)
+            if response is not None:
+                return response
+            _read_primary_if_fresh(versions)
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200 or response.cookies:
+                return response
+            timeout = settings.BLOG_PAGE_CACHE_TIMEOUT
+            if scheduled:
+                until_next = seconds_until_next_publication()
+                if until_next is not None:
+                    timeout = min(timeout, until_next)
+
+            def store(rendered):
+                cache.set(key, rendered, timeout)
+
+            if callable(getattr(response, 'render', None)):
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+        return wrapper
+    return decorator
+
+
+def _validators(request, groups):
+    """Валидаторы ETag и Last-Modified страницы, один раз на запрос.
+
+    Версии групп меняются при правках, а дата последней наступившей
+    публикации — когда выходит отложенный пост. Страницы авторизованных
+    пользователей у каждого свои: их ETag включает id пользователя,
+    ключ сессии и CSRF-токен формы (после нового входа старая страница
+    с прежним токеном не годится), а Last-Modified им не отдаётся.
+    """
+    if not hasattr(request, '_blog_validators'):
+        versions = get_versions(groups)
+        latest = publication_state()[0]
+        user = ''
+        if request.user.is_authenticated:
+            # get_token заводит токен, если его нет, — тот же, что попадёт
+            # в куку и в форму страницы.
+            get_token(request)
+            user = '|'.join(map(str, (
+                request.user.pk, request.session.session_key,
+                request.META['CSRF_COOKIE'],
+            )))
+        stamp = ','.join(
+            f'{group}={version}' for group, version in sorted(versions.items())
+        )
+        raw = f'{request.get_full_path()}|{stamp}|{latest}|{user}'
+        modified = None
+        if not user:
+            # Округляем вверх: If-Modified-Since точен до секунды, и правка
+            # в ту же секунду, что и прежняя версия, не должна потеряться.
+            modified = datetime.fromtimestamp(
+                math.ceil(max(versions.values()) / 10 ** 9), dt_timezone.utc
+            )
+            if latest is not None:
+                modified = max(modified, latest)
+        request._blog_validators = (
+            hashlib.md5(raw.encode()).hexdigest(), modified
+        )
+    return request._blog_validators
+
+
+def conditional_page(groups_func):
+    """Отвечает 304 Not Modified, пока группы страницы не менялись.
+
+    Валидаторы считаются по версиям групп из кэша, без запроса ленты;
+    Cache-Control: no-cache заставляет браузер и CDN их проверять.
+    """
+    def etag(request, *args, **kwargs):
+        return _validators(request, groups_func(**kwargs))[0]
+
+    def last_modified(request, *args, **kwargs):
+        return _validators(request, groups_func(**kwargs))[1]
+
+    def decorator(view_func):
+        conditional = condition(etag_func=etag,
+                                last_modified_func=last_modified)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,13 @@
+"""Денормализованные счётчики блога."""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment
+
+
+def actual_comment_count():
+    """Подзапрос с реальным числом комментариев поста."""
+    return Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(n=Count('pk')).values('n')[:1]
+    ), 0)
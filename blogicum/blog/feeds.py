@@ -0,0 +1,208 @@
+"""Ленты RSS, Atom и JSON Feed: общая, категории и автора.
+
+Посты отбираются так же, как для страниц лент (get_post_list), а тело
+ленты отдаётся потоком прямо из итератора по постам. Дошедшее до конца
+тело заодно кэшируется: следующие читатели получают готовый текст, пока
+не сменятся версии групп ленты (см. blog.caching) или не выйдет
+отложенный пост.
+"""
+import hashlib
+import io
+import json
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.html import linebreaks
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from . import metrics
+from .caching import (INDEX, author_group, category_group, conditional_page,
+                      get_versions, publication_state)
+from .models import Category
+from .views import get_post_list
+
+# Сколько последних постов попадает в ленту.
+FEED_SIZE = 20
+
+
+class StreamingFeedMixin:
+    """Генератор ленты, который пишет элементы по одному.
+
+    Сначала лента без элементов пишется целиком, чтобы запомнить место
+    элементов; затем отдаются её начало, элементы и окончание.
+    """
+
+    def __init__(self, *args, latest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latest = latest
+        self._skeleton = None
+
+    def latest_post_date(self):
+        return self.latest or super().latest_post_date()
+
+    def write_items(self, handler):
+        if self._skeleton is None:
+            super().write_items(handler)
+        else:
+            self._items_at = self._skeleton.tell()
+
+    def stream(self, items):
+        self.items = []
+        self._skeleton = io.StringIO()
+        self.write(self._skeleton, 'utf-8')
+        document, split = self._skeleton.getvalue(), self._items_at
+        self._skeleton = None
+        yield document[:split]
+        for fields in items:
+            self.items = []
+            self.add_item(**fields)
+            chunk = io.StringIO()
+            self.write_items(SimplerXMLGenerator(chunk, 'utf-8',
+                                                 short_empty_elements=True))
+            yield chunk.getvalue()
+        yield document[split:]
+
+
+class RssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    pass
+
+
+class AtomFeed(StreamingFeedMixin, Atom1Feed):
+    pass
+
+
+class JsonFeed:
+    """JSON Feed 1.1 с тем же интерфейсом, что и у RssFeed и AtomFeed."""
+
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def __init__(self, title, link, description, feed_url=None, **kwargs):
+        self.feed = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': title,
+            'home_page_url': link,
+            'feed_url': feed_url,
+            'description': description,
+            'language': kwargs.get('language'),
+        }
+
+    @staticmethod
+    def item(fields):
+        return {
+            'id': fields['unique_id'],
+            'url': fields['link'],
+            'title': fields['title'],
+            'content_html': fields['description'],
+            'date_published': fields['pubdate'].isoformat(),
+            'authors': [{'name': fields['author_name']}],
+            'tags': fields['categories'],
+        }
+
+    def stream(self, items):
+        head = json.dumps(self.feed, ensure_ascii=False)
+        yield head[:-1] + ', "items": ['
+        separator = ''
+        for fields in items:
+            yield separator + json.dumps(self.item(fields),
+                                         ensure_ascii=False)
+            separator = ', '
+        yield ']}'
+
+
+FORMATS = {'rss': RssFeed, 'atom': AtomFeed, 'json': JsonFeed}
+
+
+def feed_groups(feed_format, category_slug=None, username=None):
+    """Группы страниц, с которыми меняется лента."""
+    if category_slug is not None:
+        return {category_group(category_slug)}
+    if username is not None:
+        return {author_group(username)}
+    return {INDEX}
+
+
+def _feed_source(category_slug, username):
+    """Заголовок, описание, адрес страницы и посты ленты."""
+    anonymous = AnonymousUser()
+    if category_slug is not None:
+        category = get_object_or_404(Category, slug=category_slug,
+                                     is_published=True)
+        return (category.title, category.description,
+                reverse('blog:category_posts', args=[category_slug]),
+                get_post_list(anonymous, category=category))
+    if username is not None:
+        author = get_object_or_404(User, username=username)
+        return (f'Записи {author.username}', f'Блогикум: {author.username}',
+                reverse('blog:profile', args=[username]),
+                get_post_list(anonymous, author=author))
+    return ('Блогикум', 'Новые записи Блогикума', reverse('blog:index'),
+            get_post_list(anonymous))
+
+
+def _item_fields(request, post):
+    link = request.build_absolute_uri(
+        reverse('blog:post_detail', args=[post.id])
+    )
+    return {
+        'title': post.title,
+        'link': link,
+        'unique_id': link,
+        'description': linebreaks(post.text),
+        'pubdate': post.pub_date,
+        'author_name': post.author.username,
+        'categories': [post.category.title] if post.category else [],
+    }
+
+
+def _feed_key(request, groups):
+    stamp = ','.join(
+        f'{group}={version}'
+        for group, version in sorted(get_versions(groups).items())
+    )
+    raw = f'{request.build_absolute_uri()}|{stamp}|{publication_state()[0]}'
+    return 'blog:feed:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _cached_stream(key, chunks):
+    """Отдаёт части ленты, а дошедшее до конца тело кладёт в кэш."""
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(body), settings.BLOG_PAGE_CACHE_TIMEOUT)
+
+
+@conditional_page(feed_groups)
+def feed(request, feed_format, category_slug=None, username=None):
+    """Лента в формате RSS, Atom или JSON Feed."""
+    generator_class = FORMATS[feed_format]
+    key = _feed_key(request, feed_groups(feed_format, category_slug,
+                                         username))
+    body = cache.get(key)
+    metrics.cache_result('feed', body is not None)
+    if body is not None:
+        return HttpResponse(body, content_type=generator_class.content_type)
+    title, description, page, posts = _feed_source(category_slug, username)
+    posts = posts.order_by('-pub_date', '-id')[:FEED_SIZE].iterator()
+    first = next(posts, None)
+    if first is not None:
+        posts = chain([first], posts)
+    generator = generator_class(
+        title=title,
+        link=request.build_absolute_uri(page),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        language=settings.LANGUAGE_CODE,
+        latest=first.pub_date if first is not None else None,
+    )
+    items = (_item_fields(request, post) for post in posts)
+    return StreamingHttpResponse(
+        _cached_stream(key, generator.stream(items)),
+        content_type=generator.content_type,
+    )
@@ -0,0 +1,199 @@
+"""Фоновая очередь задач в таблице БД.
+
+Задача — строка Job с именем обработчика и аргументами в JSON. Её ставят
+в очередь в той же транзакции, что и изменение данных (enqueue), а
+выполняет команда run_jobs. Воркер берёт задачу в аренду: условный
+UPDATE проставляет ``locked_until`` и ``lease``, поэтому задачу не
+возьмут двое, и без SELECT FOR UPDATE, которого нет в SQLite. Если
+воркер упал, аренда истекает и задачу берёт другой (visibility
+timeout). Ошибка откладывает задачу с растущей задержкой, после
+max_attempts попыток задача помечается неудавшейся.
+
+При BLOG_JOBS_EAGER задачи выполняются сразу в enqueue: так работают
+разработка и тесты, где воркер не запущен.
+"""
+import logging
+import statistics
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Обработчики задач: имя -> функция. Заполняется декоратором task.
+TASKS = {}
+# Задержка перед повтором: RETRY_DELAY * 2 ** (попытка - 1), не больше
+# MAX_RETRY_DELAY секунд.
+RETRY_DELAY = 10
+MAX_RETRY_DELAY = 60 * 60
+# По скольким последним выполненным задачам считать задержки.
+STATS_WINDOW = 1000
+
+
+def task(name, max_attempts=5):
+    """Регистрирует функцию обработчиком задачи name.
+
+    Обработчик получает аргументы задачи именованными и должен выдержать
+    повторный запуск: после истёкшей аренды задача выполняется снова.
+    """
+    def decorator(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, /, **payload):
+    """Ставит задачу в очередь; аргументы должны сериализоваться в JSON."""
+    func, max_attempts = TASKS[name]
+    if settings.BLOG_JOBS_EAGER:
+        func(**payload)
+        return None
+    return Job.objects.create(task=name, payload=payload,
+                              max_attempts=max_attempts)
+
+
+def enqueue_chunks(name, ids, chunk_size, **payload):
+    """Ставит задачу на каждые chunk_size id; возвращает метку операции.
+
+    Пачки одной операции помечены общей группой: по ней видно, сколько
+    пачек выполнено (group_progress).
+    """
+    group = uuid.uuid4().hex
+    ids = list(ids)
+    chunks = [ids[start:start + chunk_size]
+              for start in range(0, len(ids), chunk_size)]
+    func, max_attempts = TASKS[name]
+    if settings.BLOG_JOBS_EAGER:
+        for chunk in chunks:
+            func(ids=chunk, **payload)
+        return group
+    Job.objects.bulk_create(
+        Job(task=name, group=group, payload=dict(payload, ids=chunk),
+            max_attempts=max_attempts)
+        for chunk in chunks
+    )
+    return group
+
+
+def group_progress(group):
+    """Сколько пачек операции в каждом состоянии."""
+    counts = dict(Job.objects.filter(group=group).values_list(
+        'status'
+    ).annotate(count=Count('id')).order_by('status'))
+    return {status: counts.get(status, 0) for status, _ in Job.STATUSES}
+
+
+def _ready(now):
+    return (Q(status=Job.QUEUED, run_after__lte=now)
+            | Q(status=Job.RUNNING, locked_until__lt=now))
+
+
+def claim(visibility_timeout=None):
+    """Берёт в аренду первую готовую задачу или возвращает None."""
+    timeout = visibility_timeout or settings.BLOG_JOBS_VISIBILITY_TIMEOUT
+    now = timezone.now()
+    candidates = Job.objects.filter(_ready(now)).values_list(
+        'id', flat=True
+    )[:10]
+    for job_id in candidates:
+        lease = uuid.uuid4().hex
+        # Условие повторяется в UPDATE: если задачу успел взять другой
+        # воркер, строка не обновится.
+        taken = Job.objects.filter(_ready(now), id=job_id).update(
+            status=Job.RUNNING,
+            locked_until=now + timedelta(seconds=timeout),
+            lease=lease,
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+        if taken:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def _finish(job, **fields):
+    """Записывает итог, если аренда задачи всё ещё наша."""
+    return Job.objects.filter(id=job.id, lease=job.lease).update(
+        lease='', locked_until=None, **fields
+    )
+
+
+def run(job):
+    """Выполняет взятую задачу и записывает итог."""
+    if job.attempts > job.max_attempts:
+        # Аренда истекала каждый раз: задача роняет или вешает воркер.
+        _finish(job, status=Job.FAILED, finished_at=timezone.now(),
+                last_error=job.last_error or 'Истекла аренда.')
+        return False
+    try:
+        func, _ = TASKS[job.task]
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s не выполнена', job)
+        if job.attempts >= job.max_attempts:
+            _finish(job, status=Job.FAILED, last_error=error,
+                    finished_at=timezone.now())
+            return False
+        delay = min(RETRY_DELAY * 2 ** (job.attempts - 1), MAX_RETRY_DELAY)
+        _finish(job, status=Job.QUEUED, last_error=error,
+                run_after=timezone.now() + timedelta(seconds=delay))
+        return False
+    _finish(job, status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def purge(older_than=None):
+    """Удаляет выполненные задачи старше older_than секунд."""
+    age = older_than or settings.BLOG_JOBS_RETENTION
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(seconds=age),
+    ).delete()[0]
+
+
+def _percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else None
+        return {'p50': value, 'p95': value}
+    cuts = statistics.quantiles(values, n=20)
+    return {'p50': statistics.median(values), 'p95': cuts[18]}
+
+
+def stats():
+    """Метрики очереди: глубина по задачам и задержки выполнения.
+
+    ``wait`` — секунды от постановки до начала выполнения, ``latency`` —
+    до завершения; по STATS_WINDOW последним выполненным задачам.
+    """
+    now = timezone.now()
+    depth = dict(Job.objects.filter(status=Job.QUEUED).values_list(
+        'task'
+    ).annotate(count=Count('id')).order_by('task'))
+    counts = dict(Job.objects.values_list('status').annotate(
+        count=Count('id')
+    ).order_by('status'))
+    oldest = Job.objects.filter(status=Job.QUEUED).aggregate(
+        oldest=Min('created_at')
+    )['oldest']
+    recent = Job.objects.filter(status=Job.DONE).order_by(
+        '-finished_at'
+    ).values_list('created_at', 'started_at', 'finished_at')[:STATS_WINDOW]
+    waits, latencies = [], []
+    for created_at, started_at, finished_at in recent:
+        waits.append((started_at - created_at).total_seconds())
+        latencies.append((finished_at - created_at).total_seconds())
+    return {
+        'depth': depth,
+        'statuses': {status: counts.get(status, 0)
+                     for status, _ in Job.STATUSES},
+        'oldest_age': (now - oldest).total_seconds() if oldest else 0,
+        'wait': _percentiles(waits),
+        'latency': _percentiles(latencies),
+    }
@@ -0,0 +1,73 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.bulk_load import BulkLoader, iter_json_array, iter_json_lines
+
+# Как часто печатать ход загрузки, секунд.
+PROGRESS_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает категории, места, посты и комментарии '
+            'из выгрузки dumpdata (JSON или JSONL, можно .gz) пачками. '
+            'Пользователи должны быть в базе заранее.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или «-» для stdin.')
+        parser.add_argument('--format', dest='file_format',
+                            choices=('json', 'jsonl'),
+                            help='Формат файла; по умолчанию по расширению.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько строк вставлять за раз.')
+
+    def open(self, path):
+        if path == '-':
+            return sys.stdin
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            return opener(path, 'rt', encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f'Не открыть {path}: {error}')
+
+    def handle(self, *args, path, file_format, batch_size, **options):
+        if file_format is None:
+            lines = path.removesuffix('.gz').endswith(('.jsonl', '.ndjson'))
+            file_format = 'jsonl' if lines else 'json'
+        self.reported_at = time.monotonic()
+        loader = BulkLoader(batch_size, on_batch=self.progress)
+        stream = self.open(path)
+        try:
+            records = (iter_json_lines(stream) if file_format == 'jsonl'
+                       else iter_json_array(stream))
+            for record in records:
+                loader.add(record)
+            loader.finish()
+        except ValueError as error:
+            # JSONDecodeError тоже ValueError.
+            raise CommandError(f'Ошибка в файле: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for error in loader.errors:
+            self.stderr.write(error)
+        for label, count in sorted(loader.loaded.items()):
+            self.stdout.write(f'{label}: {count}')
+        if loader.skipped:
+            skipped = ', '.join(f'{label}: {count}' for label, count
+                                in sorted(loader.skipped.items(), key=str))
+            self.stdout.write(f'Пропущены другие модели — {skipped}.')
+        self.stdout.write(
+            f'Загружено строк: {sum(loader.loaded.values())}, отклонено:'
+            f' {loader.rejected}, {loader.rate:.0f} строк/с.'
+        )
+
+    def progress(self, loader):
+        if time.monotonic() - self.reported_at >= PROGRESS_INTERVAL:
+            self.reported_at = time.monotonic()
+            self.stdout.write(
+                f'… {sum(loader.loaded.values())} строк,'
+                f' {loader.rate:.0f} строк/с'
+            )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from blog.query_plans import check_feed_plans
+
+
+class Command(BaseCommand):
+    help = ('Проверяет через EXPLAIN QUERY PLAN, что запросы лент '
+            'не проходят таблицы постов и комментариев целиком.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка рассчитана на планы SQLite.')
+        failed = False
+        for name, problems in check_feed_plans().items():
+            if not problems:
+                self.stdout.write(f'{name}: OK')
+                continue
+            failed = True
+            self.stdout.write(f'{name}:')
+            for line in problems:
+                self.stdout.write(f'    {line}')
+        if failed:
+            raise CommandError('Запросы лент выполняются без индексов.')
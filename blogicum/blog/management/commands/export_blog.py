@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.export import (CHUNK_SIZE, COLUMNS, FORMATS, column_names,
+                         export_queryset, iter_chunks)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты или комментарии в JSONL или CSV пачками '
+            'по id. С --checkpoint прерванная выгрузка продолжается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(COLUMNS))
+        parser.add_argument('--format', dest='file_format', default='jsonl',
+                            choices=sorted(FORMATS))
+        parser.add_argument('--output', help='Файл; по умолчанию stdout.')
+        parser.add_argument('--category', help='Slug категории.')
+        parser.add_argument('--author', help='Имя пользователя автора.')
+        parser.add_argument('--since', help='С даты (YYYY-MM-DD), '
+                                            'включительно.')
+        parser.add_argument('--until', help='По дату, включительно.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Сколько строк читать за запрос.')
+        parser.add_argument('--checkpoint',
+                            help='Файл с местом остановки выгрузки.')
+
+    def handle(self, *args, kind, file_format, output, checkpoint,
+               chunk_size, **options):
+        filters = {name: options[name]
+                   for name in ('category', 'author', 'since', 'until')}
+        if checkpoint and not output:
+            raise CommandError('--checkpoint работает только с --output.')
+        try:
+            queryset = export_queryset(kind, **filters)
+        except ValueError as error:
+            raise CommandError(error)
+        job = {'kind': kind, 'format': file_format, 'filters': filters}
+        state = self.load_checkpoint(checkpoint, job)
+        stream = self.open_output(output, state['offset'])
+        lines, _ = FORMATS[file_format]
+        exported = state['rows']
+        try:
+            for index, chunk in enumerate(
+                iter_chunks(queryset, state['last_id'], chunk_size)
+            ):
+                header = index == 0 and not state['last_id']
+                stream.write(''.join(
+                    lines(column_names(kind), chunk, header=header)
+                ).encode())
+                stream.flush()
+                exported += len(chunk)
+                if checkpoint:
+                    self.save_checkpoint(checkpoint, dict(
+                        job, last_id=chunk[-1][0], rows=exported,
+                        offset=stream.tell(),
+                    ))
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stderr.write(f'Выгружено строк: {exported}.')
+
+    @staticmethod
+    def load_checkpoint(path, job):
+        state = {'last_id': 0, 'rows': 0, 'offset': 0}
+        if not path or not os.path.exists(path):
+            return state
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+        if {key: saved.get(key) for key in job} != job:
+            raise CommandError(f'{path} — точка другой выгрузки.')
+        state.update((key, saved[key]) for key in state)
+        return state
+
+    @staticmethod
+    def save_checkpoint(path, state):
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def open_output(path, offset):
+        if not path:
+            return sys.stdout.buffer
+        if not offset:
+            return open(path, 'wb')
+        # Всё, что записано после точки остановки, выгрузится заново.
+        stream = open(path, 'r+b')
+        stream.truncate(offset)
+        stream.seek(offset)
+        return stream
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from blog import thumbnails
+from blog.caching import bump, groups_for_posts
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Готовит копии фотографий постов для srcset '
+            'в пуле процессов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Сколько процессов обрабатывают фото; '
+                                 '1 — без пула.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='После скольких фото сбрасывать кэш '
+                                 'карточек.')
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать и уже готовые копии.')
+
+    def handle(self, *args, workers, batch_size, force, **options):
+        names = (
+            name for name in Post.objects.exclude(image='').order_by(
+                'image'
+            ).values_list('image', flat=True).distinct().iterator()
+            if force or not thumbnails.available_widths(name)
+        )
+        done = failed = 0
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        generate = pool.map if pool else map
+        try:
+            while batch := list(islice(names, batch_size)):
+                for name, widths in zip(
+                    batch, generate(thumbnails.generate_variants, batch)
+                ):
+                    thumbnails.remember_variants(name, widths)
+                    done += bool(widths)
+                    failed += not widths
+                # Карточки в кэше фрагментов ещё ссылаются на оригиналы.
+                bump(groups_for_posts(Post.objects.filter(image__in=batch)))
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(f'Готово фотографий: {done}, '
+                          f'не удалось открыть: {failed}.')
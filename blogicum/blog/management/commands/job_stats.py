@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from blog import jobs
+
+
+class Command(BaseCommand):
+    help = 'Метрики фоновой очереди: глубина и задержки задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести метрики в JSON.')
+
+    def handle(self, *args, **options):
+        stats = jobs.stats()
+        if options['json']:
+            self.stdout.write(json.dumps(stats, ensure_ascii=False))
+            return
+        for status, count in stats['statuses'].items():
+            self.stdout.write(f'{status}: {count}')
+        for task, count in stats['depth'].items():
+            self.stdout.write(f'  в очереди {task}: {count}')
+        self.stdout.write(
+            f'Самая старая задача ждёт: {stats["oldest_age"]:.1f} с'
+        )
+        for name in ('wait', 'latency'):
+            values = stats[name]
+            if values['p50'] is not None:
+                self.stdout.write(f'{name}: p50 {values["p50"]:.2f} с,'
+                                  f' p95 {values["p95"]:.2f} с')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from blog.models import Post
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = ('Заново строит поисковый индекс постов '
+            'пачками по диапазонам id.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько id постов индексировать за раз.')
+
+    def handle(self, *args, batch_size, **options):
+        backend = get_backend()
+        last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+        backend.clear()
+        indexed = 0
+        for start in range(0, last_id + 1, batch_size):
+            posts = list(Post.objects.filter(
+                id__gte=start, id__lt=start + batch_size
+            ).only('id', 'title', 'text'))
+            if not posts:
+                continue
+            with transaction.atomic():
+                backend.index(posts)
+            indexed += len(posts)
+        self.stdout.write(f'Проиндексировано постов: {indexed}.')
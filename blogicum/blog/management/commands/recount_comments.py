@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from blog.counters import actual_comment_count
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Сверяет Post.comment_count с таблицей комментариев '
+            'и исправляет расхождения пачками по диапазонам id.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько id постов проверять за раз.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать расхождения.')
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        last_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+        checked = fixed = 0
+        for start in range(0, last_id + 1, batch_size):
+            window = {'id__gte': start, 'id__lt': start + batch_size}
+            actual = dict(
+                Comment.objects.filter(
+                    post_id__gte=start, post_id__lt=start + batch_size
+                ).order_by().values('post_id').annotate(n=Count('id'))
+                .values_list('post_id', 'n')
+            )
+            stored = Post.objects.filter(**window).values_list(
+                'id', 'comment_count'
+            )
+            drifted = [pk for pk, count in stored
+                       if actual.get(pk, 0) != count]
+            checked += len(stored)
+            if not drifted or dry_run:
+                fixed += len(drifted)
+                continue
+            # Значение пересчитывается внутри UPDATE, поэтому комментарии,
+            # добавленные во время проверки, не теряются.
+            with transaction.atomic():
+                fixed += Post.objects.filter(pk__in=drifted).update(
+                    comment_count=actual_comment_count()
+                )
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(
+            f'Проверено постов: {checked}. {verb} расхождений: {fixed}.'
+        )
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.replication import replicate
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплики из '
+            'DATABASE_REPLICAS — заменитель репликации для разработки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд.')
+
+    def handle(self, *args, interval, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте '
+                               'BLOGICUM_DB_REPLICAS.')
+        while True:
+            started = time.perf_counter()
+            updated = replicate()
+            self.stdout.write(
+                f'Реплики {", ".join(updated)} обновлены за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс.'
+            )
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,67 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog import jobs
+
+# Как часто удалять старые выполненные задачи, секунд.
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ('Воркер фоновой очереди: берёт задачи в аренду и выполняет. '
+            'Можно запустить несколько воркеров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти.')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Выйти после стольких задач (0 — без '
+                                 'ограничения).')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--visibility-timeout', type=int, default=None,
+                            help='Аренда задачи в секундах; по умолчанию '
+                                 'BLOG_JOBS_VISIBILITY_TIMEOUT.')
+
+    def handle(self, *args, once, max_jobs, poll_interval,
+               visibility_timeout, **options):
+        self.stopping = False
+        handlers = {signum: signal.signal(signum, self.stop)
+                    for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            done, failed = self.work(once, max_jobs, poll_interval,
+                                     visibility_timeout)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}.')
+
+    def work(self, once, max_jobs, poll_interval, visibility_timeout):
+        done = failed = 0
+        purged_at = None
+        while not self.stopping:
+            if (purged_at is None
+                    or time.monotonic() - purged_at > PURGE_INTERVAL):
+                jobs.purge()
+                purged_at = time.monotonic()
+            job = jobs.claim(visibility_timeout)
+            if job is None:
+                if once:
+                    break
+                close_old_connections()
+                time.sleep(poll_interval)
+                continue
+            if jobs.run(job):
+                done += 1
+            else:
+                failed += 1
+            if max_jobs and done + failed >= max_jobs:
+                break
+        return done, failed
+
+    def stop(self, signum, frame):
+        """Дорабатываем текущую задачу и выходим."""
+        self.stopping = True
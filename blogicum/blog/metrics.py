@@ -0,0 +1,381 @@
+"""Метрики горячего пути в формате Prometheus.
+
+Счётчики и гистограммы копятся в памяти процесса: у каждого потока
+свой словарь, поэтому запись идёт без блокировок, а сборка складывает
+словари всех потоков. Время запроса, БД и шаблонов по имени URL
+записывает MetricsMiddleware, попадания в кэш — места, где кэш
+читается (cache_result).
+
+Воркеров обычно несколько, поэтому при заданном BLOG_METRICS_DIR каждый
+процесс раз в BLOG_METRICS_FLUSH_INTERVAL секунд сохраняет свои
+значения в файл каталога с pid в имени, а ``/metrics`` складывает файлы
+всех процессов. Значения завершившихся процессов переносятся в общий
+архив каталога, а их файлы удаляются: счётчики не уменьшаются, и файлы
+перезапущенных воркеров не копятся. Это делает сбор метрик, а сразу —
+mark_process_dead из хука child_exit gunicorn.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+
+# Границы корзин гистограмм времени, в секундах.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Метрика: тип и описание.
+METRICS = {
+    'blog_requests_total': (
+        'counter', 'Запросы к сайту по имени URL и коду ответа.'),
+    'blog_request_duration_seconds': (
+        'histogram', 'Время ответа по имени URL.'),
+    'blog_db_duration_seconds': (
+        'histogram', 'Время запросов к БД за один запрос к сайту.'),
+    'blog_db_queries_total': (
+        'counter', 'Запросы к БД по имени URL.'),
+    'blog_template_duration_seconds': (
+        'histogram', 'Время рендера шаблонов за один запрос к сайту.'),
+    'blog_cache_requests_total': (
+        'counter', 'Чтения кэша: страницы, ленты, обсуждения.'),
+}
+
+# Значения метрик потока: (имя, метки) -> число или
+# [корзины..., сумма, количество] для гистограммы.
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+_process = {'token': uuid.uuid4().hex, 'flushed_at': time.monotonic()}
+# Время БД и шаблонов текущего запроса к сайту.
+request_timings = ContextVar('blog_request_timings', default=None)
+
+
+def _shard():
+    shard = getattr(_local, 'values', None)
+    if shard is None:
+        shard = _local.values = {}
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def _reset_after_fork():
+    # Воркер начинает с нуля: значения мастера уже в его файле.
+    global _local, _shards
+    _local, _shards = threading.local(), []
+    _process.update(token=uuid.uuid4().hex, flushed_at=time.monotonic())
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(
+        (label, str(value)) for label, value in labels.items()
+    ))
+
+
+def inc(name, value=1, **labels):
+    shard = _shard()
+    key = _key(name, labels)
+    shard[key] = shard.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    shard = _shard()
+    key = _key(name, labels)
+    histogram = shard.get(key)
+    if histogram is None:
+        histogram = shard[key] = [0] * (len(BUCKETS) + 3)
+    for index, bound in enumerate(BUCKETS):
+        if value <= bound:
+            break
+    else:
+        index = len(BUCKETS)
+    histogram[index] += 1
+    histogram[-2] += value
+    histogram[-1] += 1
+
+
+def cache_result(cache_name, hit):
+    inc('blog_cache_requests_total', cache=cache_name,
+        result='hit' if hit else 'miss')
+
+
+def _add(total, key, value):
+    if isinstance(value, list):
+        current = total.setdefault(key, [0] * len(value))
+        for index, item in enumerate(value):
+            current[index] += item
+    else:
+        total[key] = total.get(key, 0) + value
+
+
+def collect():
+    """Значения метрик всех потоков процесса."""
+    with _shards_lock:
+        shards = list(_shards)
+    total = {}
+    for shard in shards:
+        # Копия словаря под GIL атомарна, даже если поток пишет в него.
+        for key, value in shard.copy().items():
+            _add(total, key, list(value) if isinstance(value, list)
+                 else value)
+    return total
+
+
+def _process_file():
+    directory = Path(settings.BLOG_METRICS_DIR)
+    return directory / f'worker-{os.getpid()}-{_process["token"]}.json'
+
+
+def _write(path, data):
+    temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+    temporary.write_text(json.dumps(data))
+    os.replace(temporary, path)
+
+
+def flush():
+    """Сохраняет значения процесса в его файл каталога метрик."""
+    if not settings.BLOG_METRICS_DIR:
+        return
+    _process['flushed_at'] = time.monotonic()
+    path = _process_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write(path, [
+        [name, labels, value] for (name, labels), value in collect().items()
+    ])
+
+
+def maybe_flush():
+    interval = settings.BLOG_METRICS_FLUSH_INTERVAL
+    if time.monotonic() - _process['flushed_at'] >= interval:
+        flush()
+
+
+@atexit.register
+def _flush_on_exit():
+    if settings.configured and getattr(settings, 'BLOG_METRICS_DIR', None):
+        flush()
+
+
+def _pid(path):
+    try:
+        return int(path.name.split('-')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path, default):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        # Файл пропал или ещё пишется — возьмём при следующем сборе.
+        return default
+
+
+class _DirectoryLock:
+    """Блокировка каталога метрик между процессами."""
+
+    def __init__(self, directory):
+        self.path = directory / '.lock'
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _archive(directory, paths):
+    """Переносит значения файлов paths в архив и удаляет файлы.
+
+    Архив помнит перенесённые файлы, пока они есть: если процесс упал
+    между записью архива и удалением, файл не сложится дважды.
+    Вызывается под блокировкой каталога.
+    """
+    path = directory / 'archive.json'
+    archive = _read(path, {'merged': [], 'values': []})
+    merged = set(archive['merged'])
+    total = {}
+    for name, labels, value in archive['values']:
+        _add(total, (name, tuple(map(tuple, labels))), value)
+    for worker_file in paths:
+        if worker_file.name in merged:
+            continue
+        for name, labels, value in _read(worker_file, []):
+            _add(total, (name, tuple(map(tuple, labels))), value)
+        merged.add(worker_file.name)
+    _write(path, {
+        'merged': sorted(name for name in merged
+                         if (directory / name).exists()),
+        'values': [[name, labels, value]
+                   for (name, labels), value in total.items()],
+    })
+    for worker_file in paths:
+        worker_file.unlink(missing_ok=True)
+
+
+def mark_process_dead(pid):
+    """Переносит значения завершившегося процесса pid в архив."""
+    directory = Path(settings.BLOG_METRICS_DIR)
+    with _DirectoryLock(directory):
+        _archive(directory, list(directory.glob(f'worker-{pid}-*.json')))
+
+
+def collect_all():
+    """Значения метрик всех процессов."""
+    if not settings.BLOG_METRICS_DIR:
+        return collect()
+    flush()
+    directory = Path(settings.BLOG_METRICS_DIR)
+    with _DirectoryLock(directory):
+        workers = list(directory.glob('worker-*.json'))
+        dead = [path for path in workers
+                if (pid := _pid(path)) is not None and not _alive(pid)]
+        if dead:
+            _archive(directory, dead)
+        archive = _read(directory / 'archive.json',
+                        {'merged': [], 'values': []})
+        total = {}
+        sources = [archive['values']] + [
+            _read(path, []) for path in workers
+            if path not in dead and path.name not in archive['merged']
+        ]
+    for values in sources:
+        for name, labels, value in values:
+            _add(total, (name, tuple(map(tuple, labels))), value)
+    return total
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+         .replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _histogram_lines(name, labels, value):
+    cumulative = 0
+    for bound, count in zip(BUCKETS + ('+Inf',), value):
+        cumulative += count
+        yield f'{name}_bucket{_labels(labels, le=bound)} {cumulative}'
+    yield f'{name}_sum{_labels(labels)} {value[-2]}'
+    yield f'{name}_count{_labels(labels)} {value[-1]}'
+
+
+def render(values, gauges=()):
+    """Текст в формате Prometheus; gauges — (имя, описание, метки, число)."""
+    by_name = {}
+    for (name, labels), value in sorted(values.items()):
+        by_name.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, series in by_name.items():
+        kind, description = METRICS.get(name, ('untyped', ''))
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        for labels, value in series:
+            if kind == 'histogram':
+                lines.extend(_histogram_lines(name, labels, value))
+            else:
+                lines.append(f'{name}{_labels(labels)} {value}')
+    described = set()
+    for name, description, labels, value in gauges:
+        if name not in described:
+            described.add(name)
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+        lines.append(f'{name}{_labels(labels.items())} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _time_queries(execute, sql, params, many, context):
+    timings = request_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings['db'] += time.perf_counter() - started
+        timings['queries'] += 1
+
+
+class RequestTimer:
+    """Засекает время запроса к сайту, его запросов к БД и шаблонов."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {'db': 0.0, 'queries': 0, 'template': 0.0}
+
+    def __enter__(self):
+        self.token = request_timings.set(self.timings)
+        for connection in connections.all():
+            connection.execute_wrappers.append(_time_queries)
+        return self
+
+    def __exit__(self, *exc_info):
+        for connection in connections.all():
+            if _time_queries in connection.execute_wrappers:
+                connection.execute_wrappers.remove(_time_queries)
+        request_timings.reset(self.token)
+
+    def record(self, view, method, status):
+        inc('blog_requests_total', view=view, method=method, status=status)
+        observe('blog_request_duration_seconds',
+                time.perf_counter() - self.started, view=view)
+        observe('blog_db_duration_seconds', self.timings['db'], view=view)
+        inc('blog_db_queries_total', self.timings['queries'], view=view)
+        observe('blog_template_duration_seconds', self.timings['template'],
+                view=view)
+        maybe_flush()
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        timings = request_timings.get()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings['template'] += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонизатор Django, который засекает время рендера.
+
+    Вложенные шаблоны ({% include %}) рендерит уже сам шаблон, поэтому
+    время страницы не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except django_backend.TemplateDoesNotExist as error:
+            django_backend.reraise(error, self)
@@ -0,0 +1,131 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import metrics
+from .query_budget import QueryBudgetError, QueryRecorder, budget_for
+from .routers import new_request_state, request_state
+
+logger = logging.getLogger(__name__)
+
+# Cookie со временем, до которого пользователь читает с основной базы.
+PRIMARY_COOKIE = 'blog_read_primary'
+
+
+class PrimaryStickinessMiddleware:
+    """Закрепляет за основной базой пользователя, который только что писал.
+
+    Реплика может отставать: после создания поста или комментария
+    автор должен сразу увидеть их в ленте. Поэтому запрос с записью
+    ставит cookie, и на REPLICA_STICKY_SECONDS чтение идёт в default.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        try:
+            pinned_until = float(request.COOKIES.get(PRIMARY_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        state = new_request_state(
+            pinned=pinned_until > time.time()
+            or request.method not in ('GET', 'HEAD', 'OPTIONS')
+        )
+        token = request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+        if state['wrote']:
+            window = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(PRIMARY_COOKIE, str(time.time() + window),
+                                max_age=window, httponly=True,
+                                samesite='Lax')
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Проверяет число запросов к БД и повторы запросов (N+1).
+
+    BLOG_QUERY_BUDGET_MODE: ``off`` — не считать, ``log`` — писать
+    предупреждение в лог, ``raise`` — падать с QueryBudgetError (так
+    работают тесты). Запросы потокового ответа считаются, пока он
+    отдаётся.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.BLOG_QUERY_BUDGET_MODE
+        if mode == 'off':
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        with recorder:
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self._stream(
+                request, response.streaming_content, recorder, mode
+            )
+        else:
+            self.check(request, recorder, mode)
+        return response
+
+    def _stream(self, request, content, recorder, mode):
+        with recorder:
+            yield from content
+        self.check(request, recorder, mode)
+
+    @staticmethod
+    def check(request, recorder, mode):
+        match = request.resolver_match
+        if match is None:
+            return
+        problems = recorder.problems(budget_for(match.view_name))
+        if not problems:
+            return
+        message = f'{request.method} {request.path} ({match.view_name}): ' + (
+            '\n'.join(problems)
+        )
+        if mode == 'raise':
+            raise QueryBudgetError(message)
+        logger.warning(message)
+
+
+class MetricsMiddleware:
+    """Записывает время ответа, БД и шаблонов по имени URL (blog.metrics).
+
+    Потоковый ответ учитывается, когда отдан целиком.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.BLOG_METRICS_ENABLED:
+            return self.get_response(request)
+        timer = metrics.RequestTimer()
+        with timer:
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self._stream(
+                request, response, response.streaming_content, timer
+            )
+        else:
+            self.record(request, response, timer)
+        return response
+
+    def _stream(self, request, response, content, timer):
+        with timer:
+            yield from content
+        self.record(request, response, timer)
+
+    @staticmethod
+    def record(request, response, timer):
+        match = request.resolver_match
+        timer.record(match.view_name if match else 'unresolved',
+                     request.method, response.status_code)
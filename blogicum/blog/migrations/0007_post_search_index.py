@@ -0,0 +1,54 @@
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+# Нормализация текста на момент миграции (как в blog.search.text):
+# миграция не зависит от кода приложения, который может измениться.
+WORD = re.compile(r'\w+')
+RUSSIAN = snowballstemmer.stemmer('russian')
+ENGLISH = snowballstemmer.stemmer('english')
+
+
+def index_text(text):
+    return ' '.join(
+        (ENGLISH if word.isascii() else RUSSIAN).stemWord(word)
+        for word in WORD.findall(text.lower().replace('ё', 'е'))
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE blog_post_fts USING fts5("
+        "title, text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    Post = apps.get_model('blog', 'Post')
+    rows = [
+        (pk, index_text(title), index_text(text))
+        for pk, title, text in Post.objects.values_list(
+            'id', 'title', 'text'
+        ).iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO blog_post_fts (rowid, title, text) '
+            'VALUES (%s, %s, %s)', rows
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS blog_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
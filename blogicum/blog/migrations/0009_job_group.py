@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='group',
+            field=models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Операция'),
+        ),
+    ]
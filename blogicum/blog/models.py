@@ -1,6 +1,9 @@
-from django.db import models
+from contextvars import ContextVar
+
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 USER = get_user_model()
 
@@ -19,6 +22,93 @@ class BaseModel(models.Model):
         ordering = (['-pub_date'])
 
 
+# Посты, которые сейчас удаляются: id -> True на время Post.delete()
+# и PostQuerySet.delete() или слабая ссылка на экземпляр поста при
+# каскаде (например, вместе с пользователем). Комментарии таких постов
+# обработчики сигналов поштучно не обрабатывают.
+deleting_posts = ContextVar('blog_deleting_posts', default={})
+
+
+def is_being_deleted(post_id):
+    mark = deleting_posts.get().get(post_id)
+    # Метка каскада живёт, пока жив удаляемый экземпляр: если удаление
+    # упало, экземпляр освобождён вместе со сборщиком.
+    return mark is True or (mark is not None and mark() is not None)
+
+
+def _delete_with_comments(using, post_ids, delete):
+    """Удаляет комментарии постов, затем сами посты.
+
+    Без этого каскад удалял бы комментарии с поштучными сигналами:
+    на большом обсуждении — десятки тысяч запросов. Счётчики и снимки
+    удаляемых постов обновлять незачем, поэтому обработчики сигналов
+    комментариев их пропускают.
+    """
+    token = deleting_posts.set(
+        {**deleting_posts.get(), **dict.fromkeys(post_ids, True)}
+    )
+    try:
+        with transaction.atomic(using=using):
+            comments_deleted, comment_counts = Comment.objects.using(
+                using
+            ).filter(post__in=post_ids).only('id', 'post_id').delete()
+            deleted, counts = delete()
+    finally:
+        deleting_posts.reset(token)
+    counts.update(comment_counts)
+    return deleted + comments_deleted, counts
+
+
+def published_q():
+    """Условие публикации поста для всех читателей."""
+    return models.Q(
+        is_published=True,
+        category__is_published=True,
+        pub_date__lte=timezone.now(),
+    )
+
+
+class PostQuerySet(models.QuerySet):
+    """Выборки постов для лент."""
+
+    def published(self):
+        """Посты, видимые всем: опубликованные и уже наступившие."""
+        return self.filter(published_q())
+
+    def visible_to(self, user):
+        """Посты, которые может открыть пользователь.
+
+        Опубликованные — всем, свои неопубликованные — автору.
+        """
+        if user.is_authenticated:
+            return self.filter(published_q() | models.Q(author=user))
+        return self.published()
+
+    def delete(self):
+        if self.query.is_sliced:
+            # Пусть QuerySet.delete() сам сообщит об ошибке.
+            return super().delete()
+        return _delete_with_comments(
+            self.db, list(self.values_list('pk', flat=True)), super().delete
+        )
+
+    def for_feed(self):
+        """Всё, что нужно карточке поста, одним запросом.
+
+        Автор, категория и местоположение подтягиваются JOIN-ом,
+        а колонки, которые карточка не выводит, не загружаются.
+        """
+        return self.select_related(
+            'author', 'category', 'location'
+        ).only(
+            'id', 'title', 'text', 'pub_date', 'is_published', 'image',
+            'comment_count',
+            'author__username',
+            'category__slug', 'category__title', 'category__is_published',
+            'location__name', 'location__is_published',
+        )
+
+
 class Post(BaseModel):
     title = models.CharField(max_length=TEXT_LEN,
                              verbose_name='Заголовок')
@@ -42,10 +132,59 @@ class Post(BaseModel):
                                  blank=False, null=True,
                                  verbose_name='Местоположение')
     image = models.ImageField('Фото', upload_to='posts_images', blank=True)
+    # Счётчик поддерживается сигналами комментариев (blog.signals),
+    # сверить с таблицей комментариев: manage.py recount_comments.
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Количество комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta(BaseModel.Meta):
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
+        # Индексы под ленты из blog.views: фильтр по публикации и дате,
+        # сортировка «от новых к старым» с id для курсорной пагинации.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                condition=models.Q(is_published=True),
+                name='post_published_feed_idx',
+            ),
+            models.Index(
+                fields=['category', '-pub_date', '-id'],
+                condition=models.Q(is_published=True),
+                name='post_category_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx',
+            ),
+        ]
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(Post, instance=self)
+        return _delete_with_comments(
+            using, [self.pk],
+            lambda: super(Post, self).delete(using, keep_parents),
+        )
+
+    def save(self, *args, **kwargs):
+        """Сохранение поста без перезаписи счётчика комментариев.
+
+        Экземпляр мог быть загружен до появления новых комментариев,
+        поэтому при обновлении счётчик из памяти в БД не пишется.
+        """
+        if (not self._state.adding and self.pk is not None
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            skipped = self.get_deferred_fields() | {'comment_count'}
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
 
 
 class Category(BaseModel):
@@ -100,3 +239,53 @@ class Comment(BaseModel):
         ordering = ('created_at',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'],
+                         name='comment_post_created_idx'),
+        ]
+
+
+class Job(models.Model):
+    """Задача фоновой очереди (см. blog.jobs)."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не удалась'),
+    ]
+
+    task = models.CharField('Задача', max_length=100)
+    # Общая метка пачек одной операции (см. jobs.enqueue_chunks).
+    group = models.CharField('Операция', max_length=32, blank=True,
+                             db_index=True)
+    payload = models.JSONField('Аргументы', default=dict)
+    status = models.CharField('Состояние', max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Попыток не больше',
+                                                    default=5)
+    run_after = models.DateTimeField('Выполнить после', default=timezone.now)
+    # Пока не истекла аренда, задачу не возьмёт другой воркер.
+    locked_until = models.DateTimeField('Аренда до', null=True, blank=True)
+    lease = models.CharField('Аренда', max_length=32, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Добавлена', auto_now_add=True)
+    started_at = models.DateTimeField('Начата', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        ordering = ('run_after', 'id')
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'],
+                         name='job_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
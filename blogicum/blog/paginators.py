@@ -0,0 +1,278 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+# Направления перехода, зашитые в курсор.
+NEXT = 'n'
+PREVIOUS = 'p'
+LAST = 'l'
+
+
+class CursorPage:
+    """Страница, полученная пагинацией по ключу."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage ({len(self.object_list)} objects)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(PREVIOUS, self.object_list[0])
+
+    @property
+    def last_cursor(self):
+        return self.paginator.encode_cursor(LAST)
+
+
+class CursorPaginator:
+    """Пагинация по ключу сортировки без OFFSET и COUNT(*).
+
+    Курсор хранит значения полей сортировки крайнего объекта страницы,
+    поэтому любая страница выбирается одним запросом по индексу
+    с LIMIT, независимо от её «глубины».
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+    def encode_cursor(self, direction, obj=None):
+        values = []
+        if obj is not None:
+            values = [
+                self.queryset.model._meta.get_field(name).value_to_string(obj)
+                for name in self.fields
+            ]
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбор курсора; для испорченного курсора — None."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction == LAST:
+                return direction, []
+            if direction not in (NEXT, PREVIOUS):
+                return None
+            if len(raw_values) != len(self.fields):
+                return None
+            values = [
+                self.queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, raw_values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None
+        return direction, values
+
+    def _after(self, values, forward):
+        """Условие «строго после ключа» для лексикографического порядка.
+
+        Первое поле дополнительно ограничено нестрогим неравенством:
+        так SQLite ищет начало страницы по индексу, а не перебирает
+        строки с начала ленты.
+        """
+        lookup, bound = (('lt', 'lte') if self.descending == forward
+                         else ('gt', 'gte'))
+        condition = Q()
+        for position, name in enumerate(self.fields):
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for previous, value in zip(self.fields[:position], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return Q(**{f'{self.fields[0]}__{bound}': values[0]}) & condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def page_queryset(self, cursor=None):
+        """Направление и запрос (с LIMIT), которым выбирается страница."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        limit = self.per_page + 1
+        if decoded is None:
+            return None, self.queryset.order_by(*self.ordering)[:limit]
+        direction, values = decoded
+        if direction == LAST:
+            return direction, self.queryset.order_by(
+                *self._reversed_ordering()
+            )[:limit]
+        if direction == NEXT:
+            return direction, self.queryset.filter(
+                self._after(values, forward=True)
+            ).order_by(*self.ordering)[:limit]
+        return direction, self.queryset.filter(
+            self._after(values, forward=False)
+        ).order_by(*self._reversed_ordering())[:limit]
+
+    def page(self, cursor=None):
+        """Страница по курсору; без курсора — первая."""
+        direction, queryset = self.page_queryset(cursor)
+        rows = list(queryset)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction is None:
+            return CursorPage(rows, self, has_next=more, has_previous=False)
+        if direction == NEXT:
+            return CursorPage(rows, self, has_next=more, has_previous=True)
+        # Для «назад» и «последней» строки выбраны в обратном порядке.
+        return CursorPage(rows[::-1], self,
+                          has_next=direction == PREVIOUS,
+                          has_previous=more)
+
+    def legacy_page(self, number):
+        """Страница по старому номеру ?page=N (через OFFSET, без COUNT)."""
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset.order_by(*self.ordering)[
+            offset:offset + self.per_page + 1
+        ])
+        if not rows and number > 1:
+            # Номер за пределами ленты — как Paginator.get_page, отдаём
+            # последнюю страницу.
+            return self.page(self.encode_cursor(LAST))
+        return CursorPage(rows[:self.per_page], self,
+                          has_next=len(rows) > self.per_page,
+                          has_previous=number > 1)
+
+    def get_page(self, cursor=None, page_number=None):
+        """Страница по курсору с запасным разбором ?page=N."""
+        if not cursor and page_number:
+            return self.legacy_page(page_number)
+        return self.page(cursor)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор без точного COUNT(*) по большим таблицам.
+
+    Строки считаются точно до exact_limit: это EXACT_COUNT_LIMIT, но не
+    меньше строк по страницу за запрошенной (page_number), так что
+    листать дальше можно всегда. Дальше число строк оценивается: у всей
+    таблицы — по статистике СУБД или по наибольшему id, у выборки с
+    фильтрами — по плану запроса (EXPLAIN) там, где СУБД его оценивает.
+    Без оценки число строк — нижняя граница: truncated, а список
+    показывает «больше exact_limit».
+    """
+
+    EXACT_COUNT_LIMIT = 10000
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, page_number=1):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        self.exact_limit = max(self.EXACT_COUNT_LIMIT,
+                               (page_number + 1) * self.per_page)
+        self.estimated = self.truncated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        # Лишняя строка показывает, что подсчёт упёрся в предел.
+        limited = queryset[:self.exact_limit + 1].count()
+        if limited <= self.exact_limit:
+            return limited
+        if queryset.query.where:
+            estimate = self._estimate_filtered(queryset)
+        else:
+            estimate = self._estimate(queryset)
+        if estimate > limited:
+            self.estimated = True
+            return estimate
+        self.truncated = True
+        return limited
+
+    @staticmethod
+    def _estimate_filtered(queryset):
+        """Оценка числа строк выборки планировщиком PostgreSQL, иначе 0."""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            # План SQLite и MySQL без оценки строк либо с грубой.
+            return 0
+        sql, params = queryset.query.sql_with_params()
+        try:
+            with transaction.atomic(using=queryset.db), \
+                    connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0]
+        except DatabaseError:
+            return 0
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @staticmethod
+    def _estimate(queryset):
+        """Примерное число строк таблицы выборки."""
+        model = queryset.model
+        connection = connections[queryset.db]
+        table = model._meta.db_table
+        try:
+            # Точка сохранения: ошибка не должна оборвать транзакцию.
+            with transaction.atomic(using=queryset.db), \
+                    connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('SELECT reltuples FROM pg_class '
+                                   'WHERE oid = %s::regclass', [table])
+                elif connection.vendor == 'sqlite':
+                    # Заполняется командой ANALYZE.
+                    cursor.execute('SELECT stat FROM sqlite_stat1 '
+                                   'WHERE tbl = %s LIMIT 1', [table])
+                else:
+                    cursor.execute('SELECT 0')
+                row = cursor.fetchone()
+        except DatabaseError:
+            row = None
+        # reltuples — дробное число, stat — «строк строк-на-ключ ...».
+        estimate = int(float(str(row[0]).split()[0])) if row else 0
+        if estimate > 0:
+            return estimate
+        return model._base_manager.using(queryset.db).aggregate(
+            last=Max('pk')
+        )['last'] or 0
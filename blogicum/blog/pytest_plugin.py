@@ -0,0 +1,43 @@
+"""Плагин pytest: бюджет запросов и N+1 в тестах.
+
+Подключается в conftest.py (``pytest_plugins``). Каждый запрос тестового
+клиента проверяется QueryBudgetMiddleware в режиме ``raise``: превышение
+BLOG_QUERY_BUDGETS или повтор запросов валит тест. Тест, которому это
+не нужно, помечается ``@pytest.mark.query_budget('log')``. Фикстура
+query_budget проверяет запросы кода самого теста::
+
+    with query_budget(3):
+        list(get_post_list(user))
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from .query_budget import QueryBudgetError, QueryRecorder
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(mode): режим проверки запросов для запросов'
+        ' тестового клиента (off, log или raise).',
+    )
+
+
+@pytest.fixture(autouse=True)
+def _query_budget_mode(request, settings):
+    marker = request.node.get_closest_marker('query_budget')
+    settings.BLOG_QUERY_BUDGET_MODE = marker.args[0] if marker else 'raise'
+
+
+@pytest.fixture
+def query_budget():
+    """Контекст, который падает при превышении бюджета или N+1."""
+    @contextmanager
+    def check(budget=None, threshold=None):
+        with QueryRecorder() as recorder:
+            yield recorder
+        problems = recorder.problems(budget, threshold)
+        if problems:
+            raise QueryBudgetError('\n'.join(problems))
+    return check
@@ -0,0 +1,165 @@
+"""Учёт SQL-запросов запроса к сайту: бюджет и поиск N+1.
+
+QueryRecorder записывает каждый запрос ко всем базам вместе с местом,
+откуда он выполнен: строкой шаблона и строкой кода проекта. Запросы
+одной формы (SQL без значений параметров), повторённые
+BLOG_QUERY_REPEAT_THRESHOLD раз и больше, — признак N+1: например,
+шаблон ленты обращается к ``post.author`` без select_related.
+
+Повторы, которые выполняются намеренно (например, чтение таблицы
+пачками в потоковой выгрузке), помечаются контекстом batches() и за
+N+1 не считаются.
+
+Бюджеты — наибольшее число запросов для имени URL — задаёт
+BLOG_QUERY_BUDGETS; проверяет их QueryBudgetMiddleware, а в тестах —
+плагин blog.pytest_plugin.
+"""
+import re
+import sys
+import time
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+# Значения в тексте SQL и списки параметров IN (%s, %s, ...).
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+PARAMS_LIST = re.compile(r'\((?:%s, )+%s\)')
+# Файлы, чьи кадры не считаются местом запроса.
+OWN_FILES = (__file__, str(Path(__file__).with_name('middleware.py')))
+
+# Выполняются ли сейчас запросы внутри batches().
+_batched = ContextVar('blog_query_batched', default=False)
+
+
+class QueryBudgetError(AssertionError):
+    """Запрос к сайту превысил бюджет запросов или содержит N+1."""
+
+
+def shape(sql):
+    """SQL без значений: запросы N+1 различаются только ими."""
+    return PARAMS_LIST.sub('(...)', LITERAL.sub('?', sql))
+
+
+def _template_location(frame):
+    node = frame.f_locals.get('self')
+    origin = getattr(node, 'origin', None)
+    token = getattr(node, 'token', None)
+    if origin is None or token is None:
+        return None
+    return f'{origin.template_name}:{token.lineno}'
+
+
+def _is_project_file(filename):
+    return (filename.startswith(str(settings.BASE_DIR))
+            and 'site-packages' not in filename
+            and filename not in OWN_FILES)
+
+
+def where():
+    """Строка шаблона и строка кода проекта, откуда выполнен запрос."""
+    template = code = None
+    frame = sys._getframe(1)
+    while frame is not None and (template is None or code is None):
+        filename = frame.f_code.co_filename
+        if (template is None and frame.f_code.co_name == 'render_annotated'
+                and filename.endswith('template/base.py')):
+            template = _template_location(frame)
+        elif code is None and _is_project_file(filename):
+            code = f'{filename}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return template, code
+
+
+@contextmanager
+def batches():
+    """Помечает запросы внутри как пачки одной выборки, а не N+1.
+
+    В бюджет запросов они входят как обычно.
+    """
+    token = _batched.set(True)
+    try:
+        yield
+    finally:
+        _batched.reset(token)
+
+
+Query = namedtuple('Query', 'sql alias duration template code batched')
+
+
+class Repeat(namedtuple('Repeat', 'shape count locations')):
+    """Запросы одной формы, повторённые много раз."""
+
+    def __str__(self):
+        return (f'{self.count} раз: {self.shape}\n'
+                + '\n'.join(f'    из {place}' for place in self.locations))
+
+
+def location(query):
+    return ', '.join(filter(None, (query.template, query.code))) or '?'
+
+
+class QueryRecorder:
+    """Записывает запросы ко всем базам, пока открыт контекст."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            template, code = where()
+            self.queries.append(Query(
+                sql, context['connection'].alias,
+                time.perf_counter() - started, template, code,
+                _batched.get(),
+            ))
+
+    def __enter__(self):
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeats(self, threshold=None):
+        """Формы SELECT вне batches(), повторённые threshold раз и больше."""
+        threshold = threshold or settings.BLOG_QUERY_REPEAT_THRESHOLD
+        groups = defaultdict(list)
+        for query in self.queries:
+            if query.batched:
+                continue
+            if query.sql.lstrip().upper().startswith('SELECT'):
+                groups[shape(query.sql)].append(query)
+        return [
+            Repeat(sql, len(queries),
+                   list(dict.fromkeys(map(location, queries))))
+            for sql, queries in groups.items() if len(queries) >= threshold
+        ]
+
+    def problems(self, budget=None, threshold=None):
+        """Описания нарушений: превышенный бюджет и повторы запросов."""
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(f'{len(self)} запросов при бюджете {budget}.')
+        problems.extend(f'Похоже на N+1, {repeat}'
+                        for repeat in self.repeats(threshold))
+        return problems
+
+
+def budget_for(view_name):
+    """Бюджет запросов для имени URL вида ``blog:index``."""
+    return settings.BLOG_QUERY_BUDGETS.get(
+        view_name, settings.BLOG_QUERY_BUDGET_DEFAULT
+    )
@@ -0,0 +1,60 @@
+"""Проверка планов запросов лент через EXPLAIN QUERY PLAN (SQLite)."""
+import re
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils import timezone
+
+from .models import Comment, Post
+from .paginators import CursorPaginator, NEXT
+from .views import COMMENTS_PER_PAGE, NUMBER_OF_POSTS, get_post_list
+
+# Таблицы, полный проход по которым недопустим.
+WATCHED_TABLES = ('blog_post', 'blog_comment')
+
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING)\b')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def feed_queries():
+    """Запросы лент и комментариев в том виде, как их строят view."""
+    author = User(pk=1)
+    feeds = {
+        'index': get_post_list(AnonymousUser()),
+        'category': get_post_list(AnonymousUser(), category=1),
+        'profile': get_post_list(AnonymousUser(), author=author),
+        'own_profile': get_post_list(author, author=author),
+    }
+    # Курсор на середину ленты — как в ссылке «следующая страница».
+    middle = Post(id=1, pub_date=timezone.now())
+    queries = {}
+    for name, post_list in feeds.items():
+        paginator = CursorPaginator(post_list, NUMBER_OF_POSTS)
+        queries[name] = paginator.page_queryset()[1]
+        queries[f'{name}_next'] = paginator.page_queryset(
+            paginator.encode_cursor(NEXT, middle)
+        )[1]
+    comments = CursorPaginator(Comment.objects.filter(post_id=1),
+                               COMMENTS_PER_PAGE,
+                               ordering=('created_at', 'id'))
+    queries['comments'] = comments.page_queryset()[1]
+    return queries
+
+
+def plan_problems(queryset):
+    """Строки плана с полным проходом таблицы или сортировкой в памяти."""
+    problems = []
+    for line in queryset.explain().splitlines():
+        match = FULL_SCAN.search(line)
+        if match and match.group(1) in WATCHED_TABLES:
+            problems.append(line)
+        elif TEMP_SORT in line:
+            problems.append(line)
+    return problems
+
+
+def check_feed_plans():
+    """Словарь «запрос — проблемные строки плана» по всем лентам."""
+    return {
+        name: plan_problems(queryset)
+        for name, queryset in feed_queries().items()
+    }
@@ -0,0 +1,26 @@
+"""Заменитель репликации для локальной проверки реплик на SQLite."""
+import sqlite3
+
+from django.conf import settings
+from django.db import connections
+
+
+def replicate():
+    """Копирует основную базу во все реплики через backup API SQLite.
+
+    Возвращает список обновлённых алиасов реплик.
+    """
+    source_path = settings.DATABASES['default']['NAME']
+    updated = []
+    with sqlite3.connect(source_path) as source:
+        for alias in settings.DATABASE_REPLICAS:
+            # Соединения Django с репликой держат старый снимок.
+            connections[alias].close()
+            target = sqlite3.connect(settings.DATABASES[alias]['NAME'],
+                                     timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            updated.append(alias)
+    return updated
@@ -0,0 +1,47 @@
+"""Маршрутизация чтения на реплики БД."""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Состояние текущего запроса: читать ли с основной базы и была ли запись.
+# Заполняется PrimaryStickinessMiddleware; вне запроса — None.
+request_state = ContextVar('blog_replica_state', default=None)
+
+
+def new_request_state(pinned=False):
+    return {'pinned': pinned, 'wrote': False}
+
+
+class ReplicaRouter:
+    """Чтение моделей из REPLICA_APPS — с реплик, запись — в default.
+
+    Пока запрос закреплён за основной базой (запрос с записью или
+    пользователь недавно писал), чтение тоже идёт в default, чтобы
+    не показать данные, ещё не дошедшие до реплики.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or model._meta.app_label not in settings.REPLICA_APPS:
+            return 'default'
+        state = request_state.get()
+        if state is None or state['pinned'] or state['wrote']:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        # Запись в кэш (DatabaseCache) реплики не касается: его читают
+        # с основной базы.
+        if state is not None and model._meta.app_label != 'django_cache':
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        return {obj1._state.db, obj2._state.db} <= databases or None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными от основной базы.
+        return db not in settings.DATABASE_REPLICAS
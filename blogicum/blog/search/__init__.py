@@ -0,0 +1,32 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд задаётся настройкой BLOG_SEARCH_BACKEND. Бэкенд умеет
+индексировать посты (index), убирать их из индекса (remove, clear)
+и искать (search): вернуть id постов из выборки в порядке релевантности.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Сколько найденных постов показывать, не больше.
+MAX_RESULTS = 1000
+
+
+def get_backend():
+    return import_string(settings.BLOG_SEARCH_BACKEND)()
+
+
+def index_posts(posts):
+    """Добавляет или обновляет посты в индексе."""
+    get_backend().index(posts)
+
+
+def remove_posts(post_ids):
+    """Убирает посты из индекса."""
+    get_backend().remove(post_ids)
+
+
+def search_posts(query):
+    """Id опубликованных постов по запросу, самые релевантные первыми."""
+    from ..models import Post
+
+    return get_backend().search(Post.objects.published(), query, MAX_RESULTS)
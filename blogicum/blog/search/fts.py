@@ -0,0 +1,66 @@
+"""Поиск через виртуальную таблицу FTS5 SQLite."""
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+from ..models import Post
+from .text import PHRASE, PREFIX, index_text, parse_query
+
+# Таблица создаётся миграцией 0007_post_search_index.
+TABLE = 'blog_post_fts'
+
+
+class Fts5Backend:
+    """Индекс FTS5 в той же базе, что и посты.
+
+    Индекс обновляют задачи очереди blog.index_posts и blog.remove_posts,
+    поэтому правка поста видна в поиске после выполнения задачи.
+    """
+
+    # Веса bm25 для совпадений в заголовке и в тексте.
+    weights = (10.0, 1.0)
+
+    def _cursor(self):
+        return connections[router.db_for_write(Post)].cursor()
+
+    def index(self, posts):
+        rows = [(post.id, index_text(post.title), index_text(post.text))
+                for post in posts]
+        with self._cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                               [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, title, text) '
+                f'VALUES (%s, %s, %s)', rows
+            )
+
+    def remove(self, post_ids):
+        with self._cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                               [(post_id,) for post_id in post_ids])
+
+    def clear(self):
+        with self._cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+
+    @staticmethod
+    def _match(kind, value):
+        # Термы — только буквы и цифры, кавычки в них не попадут.
+        if kind == PHRASE:
+            return '"' + ' '.join(value) + '"'
+        if kind == PREFIX:
+            return f'"{value}"*'
+        return f'"{value}"'
+
+    def search(self, queryset, query, limit):
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        match = ' '.join(self._match(kind, value) for kind, value in clauses)
+        post_table = queryset.model._meta.db_table
+        return list(queryset.extra(
+            tables=[TABLE],
+            where=[f'{TABLE}.rowid = {post_table}.id', f'{TABLE} MATCH %s'],
+            params=[match],
+        ).order_by(
+            RawSQL(f'bm25({TABLE}, %s, %s)', self.weights), '-pub_date'
+        ).values_list('id', flat=True)[:limit])
@@ -0,0 +1,387 @@
+"""Поисковый индекс на чистом Python для баз без FTS5.
+
+Индекс лежит в каталоге BLOG_SEARCH_INDEX_DIR неизменяемыми сегментами.
+Сегмент — словарь термов (``<имя>.terms.json``) и файл постингов
+(``<имя>.postings``), который читается через mmap. Постинг терма —
+документы по возрастанию id: разность id с предыдущим документом, число
+вхождений и разности позиций вхождений, всё в varint. Позиции нужны
+для фраз; слова заголовка стоят в начале документа, слова текста —
+со сдвигом TEXT_OFFSET, чтобы фраза не склеивала заголовок с текстом.
+
+Изменённые посты записываются новым сегментом, удалённые — списком
+``deleted`` нового сегмента. Документ принадлежит самому новому
+сегменту, где он упомянут. Когда сегментов больше MAX_SEGMENTS,
+они сливаются в один. Запись идёт после фиксации транзакции и под
+файловой блокировкой, оглавление заменяется атомарно.
+"""
+import bisect
+import fcntl
+import json
+import math
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import router, transaction
+
+from ..models import Post
+from .text import PHRASE, PREFIX, parse_query, stems
+
+MANIFEST = 'manifest.json'
+LOCK = 'lock'
+# Сколько сегментов копится до слияния.
+MAX_SEGMENTS = 8
+# С какой позиции начинаются слова текста.
+TEXT_OFFSET = 1 << 16
+# Вхождение в заголовок весит как столько вхождений в текст.
+TITLE_WEIGHT = 10
+# Параметры BM25.
+K1 = 1.2
+B = 0.75
+
+# Прочитанные индексы процесса: каталог -> (поколение, читатель).
+_readers = {}
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buffer, position):
+    value = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode_postings(postings):
+    """Байты постинга из словаря «id документа — позиции»."""
+    out = bytearray()
+    previous_doc = 0
+    for doc_id in sorted(postings):
+        positions = postings[doc_id]
+        _write_varint(out, doc_id - previous_doc)
+        _write_varint(out, len(positions))
+        previous_position = 0
+        for position in positions:
+            _write_varint(out, position - previous_position)
+            previous_position = position
+        previous_doc = doc_id
+    return bytes(out)
+
+
+def decode_postings(buffer, start, end):
+    """Пары (id документа, позиции) из участка файла постингов."""
+    doc_id = 0
+    position = start
+    while position < end:
+        delta, position = _read_varint(buffer, position)
+        doc_id += delta
+        count, position = _read_varint(buffer, position)
+        positions = []
+        current = 0
+        for _ in range(count):
+            delta, position = _read_varint(buffer, position)
+            current += delta
+            positions.append(current)
+        yield doc_id, positions
+
+
+def document_terms(post):
+    """Термы поста с позициями: {основа: [позиции]} и длина документа."""
+    terms = {}
+    title = stems(post.title)
+    text = stems(post.text)
+    for offset, words in ((0, title), (TEXT_OFFSET, text)):
+        for index, term in enumerate(words):
+            terms.setdefault(term, []).append(offset + index)
+    return terms, len(title) + len(text)
+
+
+class Segment:
+    """Сегмент индекса, открытый на чтение."""
+
+    def __init__(self, directory, name):
+        self.name = name
+        with open(directory / f'{name}.terms.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.terms = meta['terms']
+        self.sorted_terms = sorted(self.terms)
+        self.docs = {int(doc_id): length
+                     for doc_id, length in meta['docs'].items()}
+        self.deleted = set(meta['deleted'])
+        with open(directory / f'{name}.postings', 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self.postings = mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+            else:
+                self.postings = b''
+
+    def postings_for(self, term):
+        if term not in self.terms:
+            return iter(())
+        offset, length = self.terms[term]
+        return decode_postings(self.postings, offset, offset + length)
+
+    def terms_with_prefix(self, prefix):
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        for term in self.sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+
+class Reader:
+    """Все сегменты индекса и владелец каждого документа.
+
+    Сегменты неизменяемы, поэтому читатель нового поколения берёт
+    владельцев у прежнего (base), если его сегменты — начало нового
+    списка, и применяет только добавленные сегменты.
+    """
+
+    def __init__(self, segments, base=None):
+        self.segments = segments
+        if base is not None and base.segments == segments[
+            :len(base.segments)
+        ]:
+            self.owner = dict(base.owner)
+            self.lengths = dict(base.lengths)
+            added = segments[len(base.segments):]
+        else:
+            self.owner = {}
+            self.lengths = {}
+            added = segments
+        for segment in added:
+            for doc_id, length in segment.docs.items():
+                self.owner[doc_id] = segment
+                self.lengths[doc_id] = length
+            for doc_id in segment.deleted:
+                self.owner[doc_id] = None
+                self.lengths.pop(doc_id, None)
+        self.live = len(self.lengths)
+        self.average_length = (sum(self.lengths.values()) / self.live
+                               if self.live else 0)
+
+    def _postings(self, terms_of_segment):
+        """Живые постинги: {id документа: {терм: позиции}}."""
+        found = {}
+        for segment in self.segments:
+            for term in terms_of_segment(segment):
+                for doc_id, positions in segment.postings_for(term):
+                    if self.owner.get(doc_id) is segment:
+                        found.setdefault(doc_id, {})[term] = positions
+        return found
+
+    def match(self, kind, value):
+        """Документы, подходящие под условие: {id: взвешенная частота}."""
+        if kind == PHRASE:
+            found = self._postings(lambda segment: set(value))
+            matches = {}
+            for doc_id, terms in found.items():
+                if len(terms) == len(set(value)):
+                    frequency = self._phrase_frequency(value, terms)
+                    if frequency:
+                        matches[doc_id] = frequency
+            return matches
+        if kind == PREFIX:
+            found = self._postings(
+                lambda segment: segment.terms_with_prefix(value)
+            )
+        else:
+            found = self._postings(lambda segment: (value,))
+        return {
+            doc_id: sum(self._frequency(positions)
+                        for positions in terms.values())
+            for doc_id, terms in found.items()
+        }
+
+    @staticmethod
+    def _frequency(positions):
+        return sum(TITLE_WEIGHT if position < TEXT_OFFSET else 1
+                   for position in positions)
+
+    def _phrase_frequency(self, phrase, terms):
+        following = [set(terms[term]) for term in phrase[1:]]
+        starts = [
+            start for start in terms[phrase[0]]
+            if all(start + shift in positions
+                   for shift, positions in enumerate(following, 1))
+        ]
+        return self._frequency(starts)
+
+    def score(self, matches):
+        """BM25 документов по одному условию запроса."""
+        idf = math.log(1 + (self.live - len(matches) + 0.5)
+                       / (len(matches) + 0.5))
+        scores = {}
+        for doc_id, frequency in matches.items():
+            norm = K1 * (1 - B + B * self.lengths[doc_id]
+                         / (self.average_length or 1))
+            scores[doc_id] = idf * frequency * (K1 + 1) / (frequency + norm)
+        return scores
+
+
+class InvertedIndexBackend:
+    """Индекс в файлах рядом с проектом, без расширений SQLite."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or settings.BLOG_SEARCH_INDEX_DIR)
+
+    def _manifest(self):
+        try:
+            with open(self.directory / MANIFEST, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'next': 0, 'segments': []}
+
+    def _save_manifest(self, manifest):
+        manifest['generation'] += 1
+        temporary = self.directory / f'{MANIFEST}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temporary, self.directory / MANIFEST)
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield self._manifest()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_segment(self, manifest, postings, docs, deleted=()):
+        name = f'segment_{manifest["next"]:06d}'
+        manifest['next'] += 1
+        terms, data, offset = {}, bytearray(), 0
+        for term in sorted(postings):
+            encoded = encode_postings(postings[term])
+            terms[term] = [offset, len(encoded)]
+            data += encoded
+            offset += len(encoded)
+        with open(self.directory / f'{name}.postings', 'wb') as f:
+            f.write(data)
+        with open(self.directory / f'{name}.terms.json', 'w',
+                  encoding='utf-8') as f:
+            json.dump({'terms': terms, 'docs': docs,
+                       'deleted': sorted(deleted)}, f, ensure_ascii=False)
+        manifest['segments'].append(name)
+
+    def _remove_files(self, names):
+        for name in names:
+            for suffix in ('.postings', '.terms.json'):
+                try:
+                    os.remove(self.directory / f'{name}{suffix}')
+                except FileNotFoundError:
+                    pass
+
+    def _merge(self, manifest):
+        """Сливает все сегменты в один, отбрасывая устаревшие записи."""
+        reader = self._load(manifest)
+        postings = {}
+        for segment in reader.segments:
+            for term in segment.sorted_terms:
+                for doc_id, positions in segment.postings_for(term):
+                    if reader.owner.get(doc_id) is segment:
+                        postings.setdefault(term, {})[doc_id] = positions
+        old = manifest['segments']
+        manifest['segments'] = []
+        self._write_segment(manifest, postings, reader.lengths)
+        return old
+
+    def _commit(self, documents, deleted):
+        with self._locked() as manifest:
+            postings, docs = {}, {}
+            for doc_id, (terms, length) in documents.items():
+                docs[doc_id] = length
+                for term, positions in terms.items():
+                    postings.setdefault(term, {})[doc_id] = positions
+            self._write_segment(manifest, postings, docs, deleted)
+            obsolete = []
+            if len(manifest['segments']) > MAX_SEGMENTS:
+                obsolete = self._merge(manifest)
+            self._save_manifest(manifest)
+            self._remove_files(obsolete)
+
+    def _on_commit(self, documents, deleted=()):
+        # Откат транзакции с постом не должен попасть в индекс.
+        transaction.on_commit(lambda: self._commit(documents, deleted),
+                              using=router.db_for_write(Post))
+
+    def index(self, posts):
+        self._on_commit({post.id: document_terms(post) for post in posts})
+
+    def remove(self, post_ids):
+        self._on_commit({}, deleted=list(post_ids))
+
+    def clear(self):
+        with self._locked() as manifest:
+            old = manifest['segments']
+            manifest['segments'] = []
+            self._save_manifest(manifest)
+            self._remove_files(old)
+
+    def _load(self, manifest, base=None):
+        """Читатель сегментов оглавления; открытые в base не перечитываются."""
+        opened = {segment.name: segment
+                  for segment in (base.segments if base else ())}
+        return Reader([
+            opened.get(name) or Segment(self.directory, name)
+            for name in manifest['segments']
+        ], base)
+
+    def reader(self):
+        """Читатель текущего поколения индекса (кэшируется в процессе)."""
+        manifest = self._manifest()
+        cached = _readers.get(self.directory)
+        if cached is not None and cached[0] == manifest['generation']:
+            return cached[1]
+        base = cached[1] if cached is not None else None
+        try:
+            reader = self._load(manifest, base)
+        except FileNotFoundError:
+            # Сегменты слили, пока читали оглавление: читаем новое.
+            manifest = self._manifest()
+            reader = self._load(manifest, base)
+        _readers[self.directory] = (manifest['generation'], reader)
+        return reader
+
+    def search(self, queryset, query, limit):
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        reader = self.reader()
+        scores = None
+        for kind, value in clauses:
+            clause_scores = reader.score(reader.match(kind, value))
+            if scores is None:
+                scores = clause_scores
+            else:
+                scores = {doc_id: score + clause_scores[doc_id]
+                          for doc_id, score in scores.items()
+                          if doc_id in clause_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], -doc_id))
+        # Публикацию проверяет база: посты и категории меняются
+        # без переиндексации, а отложенные посты публикуются сами.
+        found = []
+        for start in range(0, len(ranked), 500):
+            batch = ranked[start:start + 500]
+            allowed = set(queryset.filter(id__in=batch).values_list(
+                'id', flat=True
+            ))
+            found += [doc_id for doc_id in batch if doc_id in allowed]
+            if len(found) >= limit:
+                break
+        return found[:limit]
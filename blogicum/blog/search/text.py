@@ -0,0 +1,76 @@
+"""Нормализация текста для поискового индекса.
+
+Слова приводятся к основе стеммером Snowball: русские — русским,
+латиница — английским. Индекс и запрос проходят одну и ту же обработку,
+поэтому «котами» находит пост про «кота».
+"""
+import re
+import threading
+from functools import lru_cache
+
+import snowballstemmer
+
+WORD = re.compile(r'\w+')
+
+_stemmers = threading.local()
+
+
+def words(text):
+    """Слова текста в нижнем регистре, «ё» заменена на «е»."""
+    return WORD.findall(text.lower().replace('ё', 'е'))
+
+
+@lru_cache(maxsize=100_000)
+def stem(word):
+    """Основа слова; словарь текстов невелик, поэтому основы кэшируются."""
+    # Стеммеры Snowball хранят состояние, поэтому у каждого потока свои.
+    if not hasattr(_stemmers, 'russian'):
+        _stemmers.russian = snowballstemmer.stemmer('russian')
+        _stemmers.english = snowballstemmer.stemmer('english')
+    if word.isascii():
+        return _stemmers.english.stemWord(word)
+    return _stemmers.russian.stemWord(word)
+
+
+def stems(text):
+    """Основы слов текста в исходном порядке."""
+    return [stem(word) for word in words(text)]
+
+
+def index_text(text):
+    """Текст поля в том виде, в каком он попадает в индекс."""
+    return ' '.join(stems(text))
+
+
+# Виды условий запроса.
+TERM = 'term'
+PREFIX = 'prefix'
+PHRASE = 'phrase'
+
+# «фраза в кавычках», префикс* или отдельное слово.
+QUERY = re.compile(r'"([^"]*)"|(\w+)\*|(\w+)')
+
+
+def parse_query(query):
+    """Разбор запроса на условия, которые должны выполняться все сразу.
+
+    Слово превращается в основу (TERM), слово со звёздочкой ищется
+    по началу основы (PREFIX), слова в кавычках — подряд (PHRASE).
+    Начало слова тоже приводится к основе: в индексе у «котами» основа
+    «кот», и «котам*» без этого не нашло бы ничего.
+    """
+    clauses = []
+    for phrase, prefix, word in QUERY.findall(
+        query.lower().replace('ё', 'е')
+    ):
+        if phrase:
+            terms = stems(phrase)
+            if len(terms) > 1:
+                clauses.append((PHRASE, terms))
+            elif terms:
+                clauses.append((TERM, terms[0]))
+        elif prefix:
+            clauses.append((PREFIX, stem(prefix)))
+        else:
+            clauses.append((TERM, stem(word)))
+    return clauses
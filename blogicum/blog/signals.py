@@ -0,0 +1,236 @@
+import weakref
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import jobs, snapshots, thumbnails
+from .caching import (bump, category_group, forget_publication_state,
+                      groups_for_posts)
+from .models import (Category, Comment, Location, Post, deleting_posts,
+                     is_being_deleted)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    """Увеличиваем счётчик комментариев поста."""
+    # При загрузке фикстур счётчик приходит вместе с постом.
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшаем счётчик комментариев поста.
+
+    Срабатывает и для удаления из админки и QuerySet.delete():
+    при наличии обработчиков Django удаляет комментарии поштучно.
+    """
+    if is_being_deleted(instance.post_id):
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, raw=False, **kwargs):
+    """Сбрасываем страницу поста и ленты с его счётчиком комментариев."""
+    if not raw and not is_being_deleted(instance.post_id):
+        bump(groups_for_posts(Post.objects.filter(pk=instance.post_id)))
+
+
+@receiver(post_save, sender=Comment)
+def comment_snapshot_saved(sender, instance, created, raw=False, **kwargs):
+    """Добавляем или перерисовываем комментарий в снимке обсуждения."""
+    if raw:
+        return
+    if created:
+        snapshots.comment_added(instance)
+    else:
+        snapshots.comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_snapshot_deleted(sender, instance, **kwargs):
+    if not is_being_deleted(instance.post_id):
+        snapshots.comment_removed(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_pages_before_change(sender, instance, raw=False, **kwargs):
+    """Запоминаем страницы, где пост выводился до изменения."""
+    instance._old_page_groups = set()
+    if not raw and instance.pk is not None:
+        instance._old_page_groups = groups_for_posts(
+            Post.objects.filter(pk=instance.pk)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_pages_changed(sender, instance, raw=False, **kwargs):
+    """Сбрасываем старые и новые страницы поста."""
+    if not raw:
+        bump(getattr(instance, '_old_page_groups', set())
+             | groups_for_posts(Post.objects.filter(pk=instance.pk)))
+        forget_publication_state()
+
+
+@receiver(pre_delete, sender=Post)
+def post_pages_deleted(sender, instance, **kwargs):
+    # Каскад шлёт pre_delete всем строкам до удаления первой из них.
+    # Метки упавших удалений (их экземпляры уже освобождены) — выкидываем.
+    marks = {pk: mark for pk, mark in deleting_posts.get().items()
+             if is_being_deleted(pk)}
+    if instance.pk not in marks:
+        deleting_posts.set({**marks, instance.pk: weakref.ref(instance)})
+    bump(groups_for_posts(Post.objects.filter(pk=instance.pk)))
+    forget_publication_state()
+    snapshots.drop([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def post_search_changed(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    """Переиндексируем заголовок и текст поста."""
+    if raw:
+        return
+    if update_fields is not None and not {'title', 'text'} & set(
+        update_fields
+    ):
+        return
+    jobs.enqueue('blog.index_posts', post_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def post_image_variants(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    """Готовим копии новой фотографии поста для srcset."""
+    if raw or 'image' in instance.get_deferred_fields():
+        return
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    name = instance.image.name
+    # У прежней фотографии копии уже есть: это ответ из кэша.
+    if name and not thumbnails.available_widths(name):
+        jobs.enqueue('blog.thumbnails', name=name)
+
+
+@receiver(post_delete, sender=Post)
+def post_search_deleted(sender, instance, **kwargs):
+    marks = deleting_posts.get()
+    # Метку Post.delete() снимает он сам.
+    if isinstance(marks.get(instance.pk), weakref.ref):
+        deleting_posts.set({pk: mark for pk, mark in marks.items()
+                            if pk != instance.pk})
+    jobs.enqueue('blog.remove_posts', post_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=Category)
+def category_pages_before_change(sender, instance, raw=False, **kwargs):
+    """Запоминаем прежний slug категории."""
+    instance._old_page_groups = set()
+    if not raw and instance.pk is not None:
+        instance._old_page_groups = {
+            category_group(slug) for slug in Category.objects.filter(
+                pk=instance.pk
+            ).values_list('slug', flat=True)
+        }
+
+
+@receiver(post_save, sender=Category)
+def category_pages_changed(sender, instance, raw=False, **kwargs):
+    """Сбрасываем страницу категории и страницы всех её постов.
+
+    Постов у категории много, поэтому их страницы сбрасывает фоновая
+    задача.
+    """
+    if not raw:
+        jobs.enqueue(
+            'blog.invalidate_posts',
+            groups=sorted(getattr(instance, '_old_page_groups', set())
+                          | {category_group(instance.slug)}),
+            category_id=instance.pk,
+        )
+
+
+@receiver(pre_delete, sender=Category)
+def category_pages_deleted(sender, instance, **kwargs):
+    # После удаления у постов не останется ссылки на категорию.
+    bump({category_group(instance.slug)}
+         | groups_for_posts(Post.objects.filter(category=instance.pk)))
+
+
+@receiver(post_save, sender=Location)
+def location_pages_changed(sender, instance, raw=False, **kwargs):
+    """Сбрасываем страницы постов с этим местоположением."""
+    if not raw:
+        jobs.enqueue('blog.invalidate_posts', location_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Location)
+def location_pages_deleted(sender, instance, **kwargs):
+    bump(groups_for_posts(Post.objects.filter(location=instance.pk)))
+
+
+def _profile_changed(update_fields):
+    # Вход на сайт обновляет только last_login — страницы не меняются.
+    return update_fields is None or set(update_fields) - {'last_login'}
+
+
+@receiver(pre_save, sender=User)
+def user_pages_before_change(sender, instance, raw=False,
+                             update_fields=None, **kwargs):
+    """Запоминаем прежнее имя пользователя."""
+    instance._old_usernames = []
+    if (not raw and instance.pk is not None
+            and _profile_changed(update_fields)):
+        instance._old_usernames = list(User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_pages_changed(sender, instance, created, raw=False,
+                       update_fields=None, **kwargs):
+    if not raw and not created and _profile_changed(update_fields):
+        jobs.enqueue('blog.user_changed', user_id=instance.pk, usernames=(
+            getattr(instance, '_old_usernames', []) + [instance.username]
+        ))
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Выставляем PRAGMA из settings.SQLITE_PRAGMAS новому соединению.
+
+    Здесь только настройки соединения: busy_timeout заставляет писателя
+    подождать блокировку вместо ошибки «database is locked».
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(post_migrate)
+def set_sqlite_journal_mode(sender, using, **kwargs):
+    """Переводим базу в settings.SQLITE_JOURNAL_MODE после migrate.
+
+    WAL позволяет читать ленты, пока пишется комментарий. Режим
+    сохраняется в файле базы, поэтому соединениям его не выставляем.
+    """
+    connection = connections[using]
+    mode = getattr(settings, 'SQLITE_JOURNAL_MODE', None)
+    if sender.label != 'blog' or connection.vendor != 'sqlite' or not mode:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode = {mode}')
@@ -0,0 +1,320 @@
+"""Снимки обсуждений популярных постов.
+
+Комментарии поста хранятся в кэше готовым HTML, разбитым на куски
+по CHUNK_SIZE штук. Кусок называется по id своего первого комментария,
+а оглавление поста хранит для каждого куска первый и последний ключи
+(created_at, id) и число комментариев. Создание, правка и удаление
+комментария меняют один кусок и оглавление, не перестраивая обсуждение.
+
+Собирает снимок целиком только фоновая задача blog.build_snapshot:
+у поста с тысячами комментариев это секунды рендера. Пока снимка нет
+или он устарел, страница обсуждения читается из базы.
+
+HTML снимка одинаков для всех читателей: кнопки правки и удаления шаблон
+добавляет сам, сравнивая ``author_id`` записи с текущим пользователем.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import jobs, metrics
+from .paginators import LAST, NEXT, PREVIOUS, CursorPage
+
+# Комментариев в одном куске снимка.
+CHUNK_SIZE = 100
+# Сколько секунд хранить снимок; правки, потерянные при гонке, живут
+# не дольше этого срока.
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+LOCK_TIMEOUT = 10
+# Сколько секунд пересборка считается поставленной в очередь.
+BUILD_TIMEOUT = 60 * 5
+
+CommentEntry = namedtuple('CommentEntry', 'id created_at author_id html')
+
+
+def _manifest_key(post_id):
+    return f'blog:comments:{post_id}'
+
+
+def _chunk_key(post_id, name):
+    return f'blog:comments:{post_id}:{name}'
+
+
+def _lock_key(post_id):
+    return f'blog:comments:{post_id}:lock'
+
+
+def _stale_key(post_id):
+    return f'blog:comments:{post_id}:stale'
+
+
+def _building_key(post_id):
+    return f'blog:comments:{post_id}:building'
+
+
+def _sort_key(item):
+    return item.created_at, item.id
+
+
+def render_entry(comment):
+    """Запись снимка: комментарий без кнопок, зависящих от читателя."""
+    html = render_to_string('includes/comment_body.html',
+                            {'comment': comment})
+    return CommentEntry(comment.id, comment.created_at, comment.author_id,
+                        mark_safe(html))
+
+
+def _describe(name, entries):
+    return {
+        'name': name,
+        'first': _sort_key(entries[0]),
+        'last': _sort_key(entries[-1]),
+        'count': len(entries),
+    }
+
+
+def build(post_id, comment_count):
+    """Собирает снимок обсуждения заново и возвращает оглавление."""
+    from .models import Comment
+
+    # Изменения, помеченные позже начала сборки, в снимок могли не попасть.
+    built_at = time.time_ns()
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(
+        'id', 'text', 'created_at', 'post_id', 'author__username'
+    ).order_by('created_at', 'id')
+    entries = [render_entry(comment) for comment in comments.iterator()]
+    manifest = {'comment_count': comment_count, 'built_at': built_at,
+                'chunks': []}
+    values = {}
+    for start in range(0, len(entries), CHUNK_SIZE):
+        chunk = entries[start:start + CHUNK_SIZE]
+        name = str(chunk[0].id)
+        manifest['chunks'].append(_describe(name, chunk))
+        values[_chunk_key(post_id, name)] = chunk
+    values[_manifest_key(post_id)] = manifest
+    cache.set_many(values, SNAPSHOT_TIMEOUT)
+    return manifest
+
+
+def schedule_build(post_id):
+    """Ставит сборку снимка в очередь, если она ещё не поставлена."""
+    if cache.add(_building_key(post_id), 1, BUILD_TIMEOUT):
+        jobs.enqueue('blog.build_snapshot', post_id=post_id)
+
+
+def rebuild(post_id):
+    """Собирает снимок поста по его текущему счётчику комментариев."""
+    from .models import Post
+
+    try:
+        comment_count = Post.objects.filter(pk=post_id).values_list(
+            'comment_count', flat=True
+        ).first()
+        if comment_count is not None:
+            build(post_id, comment_count)
+    finally:
+        cache.delete(_building_key(post_id))
+
+
+def _mark_stale(post_id):
+    # Оглавление не удаляется: его читают, пока сборка не готова, чтобы
+    # узнать, что снимок устарел, а сборку ставят один раз.
+    cache.set(_stale_key(post_id), time.time_ns(), SNAPSHOT_TIMEOUT)
+
+
+def _chunks_for_page(chunks, direction, key, limit):
+    """Куски оглавления (по порядку), в которых лежит страница.
+
+    Кусок с курсором может дать любую часть своих записей, поэтому
+    соседние куски добираются, пока их хватает на страницу целиком.
+    """
+    if direction in (None, NEXT):
+        start = 0
+        if direction == NEXT:
+            start = next((index for index, chunk in enumerate(chunks)
+                          if chunk['last'] > key), len(chunks))
+        selected, total = [], 0
+        for chunk in chunks[start:]:
+            if total >= limit:
+                break
+            if selected or direction is None:
+                total += chunk['count']
+            selected.append(chunk)
+        return selected
+    end = len(chunks)
+    if direction == PREVIOUS:
+        end = next((index + 1 for index in range(len(chunks) - 1, -1, -1)
+                    if chunks[index]['first'] < key), 0)
+    selected, total = [], 0
+    for chunk in reversed(chunks[:end]):
+        if total >= limit:
+            break
+        if selected or direction == LAST:
+            total += chunk['count']
+        selected.append(chunk)
+    return selected[::-1]
+
+
+def _page_from_entries(entries, paginator, direction, key):
+    """Страница по тем же правилам, что и CursorPaginator.page."""
+    per_page = paginator.per_page
+    if direction is None:
+        rows = entries[:per_page + 1]
+        return CursorPage(rows[:per_page], paginator,
+                          has_next=len(rows) > per_page, has_previous=False)
+    if direction == NEXT:
+        rows = [entry for entry in entries
+                if _sort_key(entry) > key][:per_page + 1]
+        return CursorPage(rows[:per_page], paginator,
+                          has_next=len(rows) > per_page, has_previous=True)
+    if direction == PREVIOUS:
+        entries = [entry for entry in entries if _sort_key(entry) < key]
+    rows = entries[-per_page - 1:]
+    return CursorPage(rows[-per_page:], paginator,
+                      has_next=direction == PREVIOUS,
+                      has_previous=len(rows) > per_page)
+
+
+def snapshot_page(post, paginator, cursor=None):
+    """Страница комментариев из снимка; None — читать из базы.
+
+    Если снимка нет, его счётчик расходится с ``post.comment_count``,
+    он помечен устаревшим или из кэша пропал нужный кусок, сборка
+    ставится в очередь, а страница читается из базы.
+    """
+    if post.comment_count < settings.BLOG_COMMENT_SNAPSHOT_THRESHOLD:
+        return None
+    decoded = paginator.decode_cursor(cursor) if cursor else None
+    direction, key = None, None
+    if decoded is not None:
+        direction, values = decoded
+        key = tuple(values)
+    manifest_key = _manifest_key(post.id)
+    found = cache.get_many([manifest_key, _stale_key(post.id)])
+    manifest = found.get(manifest_key)
+    metrics.cache_result('comments', manifest is not None)
+    if (manifest is None
+            or manifest['comment_count'] != post.comment_count
+            or found.get(_stale_key(post.id), 0)
+            > manifest.get('built_at', 0)):
+        schedule_build(post.id)
+        return None
+    chunks = _chunks_for_page(manifest['chunks'], direction, key,
+                              paginator.per_page + 1)
+    keys = [_chunk_key(post.id, chunk['name']) for chunk in chunks]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        # Кусок вытеснен из кэша.
+        schedule_build(post.id)
+        return None
+    entries = [entry for chunk_key in keys for entry in found[chunk_key]]
+    return _page_from_entries(entries, paginator, direction, key)
+
+
+def drop(post_ids):
+    """Удаляет снимки обсуждений постов."""
+    cache.delete_many([_manifest_key(post_id) for post_id in post_ids])
+
+
+def _find_chunk(chunks, key):
+    return next((chunk for chunk in chunks
+                 if chunk['first'] <= key <= chunk['last']), None)
+
+
+def _append(post_id, manifest, comment):
+    chunks = manifest['chunks']
+    entry = render_entry(comment)
+    if chunks and _sort_key(entry) < chunks[-1]['last']:
+        # Комментарий задним числом (фикстуры, админка) — не в конец.
+        return None
+    if chunks and chunks[-1]['count'] < CHUNK_SIZE:
+        chunk = chunks[-1]
+        entries = cache.get(_chunk_key(post_id, chunk['name']))
+        if entries is None:
+            return None
+        entries.append(entry)
+    else:
+        chunk = {'name': str(entry.id)}
+        chunks.append(chunk)
+        entries = [entry]
+    chunk.update(_describe(chunk['name'], entries))
+    manifest['comment_count'] += 1
+    return {_chunk_key(post_id, chunk['name']): entries}
+
+
+def _replace(post_id, manifest, comment):
+    chunk = _find_chunk(manifest['chunks'], _sort_key(comment))
+    if chunk is None:
+        return None
+    entries = cache.get(_chunk_key(post_id, chunk['name']))
+    if entries is None:
+        return None
+    for index, entry in enumerate(entries):
+        if entry.id == comment.id:
+            entries[index] = render_entry(comment)
+            return {_chunk_key(post_id, chunk['name']): entries}
+    return None
+
+
+def _remove(post_id, manifest, comment):
+    chunk = _find_chunk(manifest['chunks'], _sort_key(comment))
+    if chunk is None:
+        return None
+    key = _chunk_key(post_id, chunk['name'])
+    entries = cache.get(key)
+    if entries is None:
+        return None
+    entries = [entry for entry in entries if entry.id != comment.id]
+    manifest['comment_count'] -= 1
+    if not entries:
+        manifest['chunks'].remove(chunk)
+        cache.delete(key)
+        return {}
+    chunk.update(_describe(chunk['name'], entries))
+    return {key: entries}
+
+
+def _apply(change, comment):
+    """Применяет изменение комментария к снимку его поста, если он есть.
+
+    Изменения одного поста идут под блокировкой в кэше. Если снимок
+    меняют параллельно или его кусок пропал, снимок помечается
+    устаревшим: следующее чтение ставит его сборку в очередь.
+    """
+    post_id = comment.post_id
+    manifest_key = _manifest_key(post_id)
+    if cache.get(manifest_key) is None:
+        return
+    if not cache.add(_lock_key(post_id), 1, LOCK_TIMEOUT):
+        _mark_stale(post_id)
+        return
+    try:
+        manifest = cache.get(manifest_key)
+        if manifest is None:
+            return
+        values = change(post_id, manifest, comment)
+        if values is None:
+            _mark_stale(post_id)
+            return
+        values[manifest_key] = manifest
+        cache.set_many(values, SNAPSHOT_TIMEOUT)
+    finally:
+        cache.delete(_lock_key(post_id))
+
+
+def comment_added(comment):
+    _apply(_append, comment)
+
+
+def comment_changed(comment):
+    _apply(_replace, comment)
+
+
+def comment_removed(comment):
+    _apply(_remove, comment)
@@ -0,0 +1,118 @@
+"""Обработчики фоновых задач блога (см. blog.jobs)."""
+import logging
+
+from django.db import router, transaction
+from django.db.models import Q
+
+from . import search, snapshots, thumbnails
+from .caching import (author_group, bump, forget_publication_state,
+                      groups_for_posts)
+from .counters import actual_comment_count
+from .jobs import task
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+
+@task('blog.thumbnails')
+def make_thumbnails(name):
+    """Готовит копии фотографии и обновляет карточки с ней."""
+    widths = thumbnails.generate_variants(name)
+    thumbnails.remember_variants(name, widths)
+    if widths:
+        bump(groups_for_posts(Post.objects.filter(image=name)))
+
+
+@task('blog.index_posts')
+def index_posts(post_ids):
+    # Удалённые до выполнения задачи посты просто не найдутся.
+    search.index_posts(
+        Post.objects.filter(id__in=post_ids).only('id', 'title', 'text')
+    )
+
+
+@task('blog.remove_posts')
+def remove_posts(post_ids):
+    search.remove_posts(post_ids)
+
+
+@task('blog.build_snapshot')
+def build_snapshot(post_id):
+    """Собирает снимок обсуждения поста (см. snapshots.snapshot_page)."""
+    snapshots.rebuild(post_id)
+
+
+@task('blog.invalidate_posts')
+def invalidate_posts(groups=(), category_id=None, location_id=None):
+    """Сбрасывает группы и страницы постов категории или места."""
+    posts = Q()
+    if category_id is not None:
+        posts |= Q(category=category_id)
+    if location_id is not None:
+        posts |= Q(location=location_id)
+    if posts:
+        groups = set(groups) | groups_for_posts(Post.objects.filter(posts))
+    bump(set(groups))
+
+
+@task('blog.user_changed')
+def user_changed(user_id, usernames):
+    """Сбрасывает страницы с постами и комментариями пользователя."""
+    bump({author_group(username) for username in usernames}
+         | groups_for_posts(Post.objects.filter(
+             Q(author=user_id) | Q(comments__author=user_id)
+         ).distinct()))
+    # В снимках обсуждений имя автора уже отрендерено.
+    snapshots.drop(Comment.objects.filter(
+        author=user_id
+    ).values_list('post_id', flat=True).distinct())
+
+
+def _raw_delete(queryset):
+    # QuerySet.delete() при обработчиках сигналов загружает строки
+    # и удаляет их по одной; здесь — один DELETE, а работу обработчиков
+    # задача делает сама для всей пачки.
+    return queryset._raw_delete(queryset.db)
+
+
+@task('blog.bulk_posts')
+def bulk_posts(ids, operation, category_id=None):
+    """Пачка массового действия над постами (см. PostAdmin).
+
+    operation — publish, unpublish, move (в категорию category_id)
+    или delete.
+    """
+    posts = Post.objects.filter(id__in=ids)
+    groups = groups_for_posts(posts)
+    with transaction.atomic(using=router.db_for_write(Post)):
+        if operation == 'delete':
+            ids = list(posts.values_list('id', flat=True))
+            _raw_delete(Comment.objects.filter(post__in=ids))
+            changed = _raw_delete(Post.objects.filter(id__in=ids))
+        else:
+            if operation == 'move':
+                changed = posts.update(category_id=category_id)
+            else:
+                changed = posts.update(is_published=operation == 'publish')
+            groups |= groups_for_posts(posts)
+    bump(groups)
+    forget_publication_state()
+    if operation == 'delete':
+        snapshots.drop(ids)
+        search.remove_posts(ids)
+    logger.info('Массовое действие %s: постов %s', operation, changed)
+
+
+@task('blog.bulk_comments')
+def bulk_comments(ids):
+    """Пачка массового удаления комментариев."""
+    comments = Comment.objects.filter(id__in=ids)
+    post_ids = sorted(set(comments.values_list('post_id', flat=True)))
+    with transaction.atomic(using=router.db_for_write(Comment)):
+        deleted = _raw_delete(comments)
+        Post.objects.filter(id__in=post_ids).update(
+            comment_count=actual_comment_count()
+        )
+    bump(groups_for_posts(Post.objects.filter(id__in=post_ids)))
+    snapshots.drop(post_ids)
+    logger.info('Удалено комментариев: %s', deleted)
@@ -0,0 +1,26 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post):
+    """Фотография поста с копиями под ширину экрана.
+
+    Пока копий нет, выводится оригинал.
+    """
+    name = post.image.name
+    widths = thumbnails.available_widths(name)
+    context = {'original': post.image.url, 'src': post.image.url}
+    if widths:
+        context.update(
+            src=post.image.storage.url(
+                thumbnails.variant_name(name, widths[-1], 'jpg')
+            ),
+            webp=thumbnails.srcset(name, widths, 'webp'),
+            jpeg=thumbnails.srcset(name, widths, 'jpg'),
+            sizes=thumbnails.SIZES,
+        )
+    return context
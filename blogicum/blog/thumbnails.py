@@ -0,0 +1,125 @@
+"""Уменьшенные копии фотографий постов для srcset.
+
+Рядом с оригиналом Post.image сохраняются копии шириной VARIANT_WIDTHS
+в WebP и JPEG: для ``posts_images/cat.jpg`` это
+``posts_images/cat.640w.webp`` и ``posts_images/cat.640w.jpg``. Копий
+не шире оригинала: узкая фотография получает одну копию своей ширины.
+
+Какие ширины есть у фотографии, запоминается в кэше, чтобы карточкам
+ленты не проверять файлы в хранилище. Модуль не импортирует модели:
+generate_variants выполняется и в процессах команды
+generate_thumbnails.
+"""
+import hashlib
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+VARIANT_WIDTHS = (320, 640, 1280)
+# Расширение копии: формат Pillow и параметры сохранения.
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Какую ширину занимает фотография: карточка ленты — 40rem.
+SIZES = '(min-width: 672px) 640px, 100vw'
+# Тег EXIF Orientation и его значения с поворотом на 90°.
+ORIENTATION = 0x0112
+ROTATED = {5, 6, 7, 8}
+
+
+def variant_name(name, width, ext):
+    stem, _ = posixpath.splitext(name)
+    return f'{stem}.{width}w.{ext}'
+
+
+def target_widths(width):
+    """Ширины копий для оригинала шириной width."""
+    return sorted({min(target, width) for target in VARIANT_WIDTHS})
+
+
+def _variants_key(name):
+    return 'blog:image:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def _encode(image, image_format, options):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(name, storage=default_storage):
+    """Сохраняет копии фотографии name и возвращает их ширины.
+
+    Повреждённый или пропавший файл даёт пустой список: карточка
+    покажет оригинал.
+    """
+    try:
+        with storage.open(name, 'rb') as f:
+            image = ImageOps.exif_transpose(Image.open(f))
+            image.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        return []
+    widths = target_widths(image.width)
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = (image if width == image.width else
+                   image.resize((width, height), Image.Resampling.LANCZOS))
+        for ext, (image_format, options) in FORMATS.items():
+            variant = variant_name(name, width, ext)
+            # Хранилище не перезаписывает файлы, а дописывает к имени
+            # суффикс: старую копию удаляем сами.
+            storage.delete(variant)
+            storage.save(variant, _encode(resized, image_format, options))
+    return widths
+
+
+def remember_variants(name, widths):
+    # Копий может не быть, пока их готовят: такой ответ храним недолго.
+    timeout = None if widths else settings.BLOG_PAGE_CACHE_TIMEOUT
+    cache.set(_variants_key(name), widths, timeout)
+
+
+def _original_width(name, storage):
+    try:
+        with storage.open(name, 'rb') as f:
+            # Image.open читает только заголовок файла.
+            image = Image.open(f)
+            width, height = image.size
+            if image.getexif().get(ORIENTATION) in ROTATED:
+                width = height
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        return None
+    return width
+
+
+def available_widths(name, storage=default_storage):
+    """Ширины готовых копий фотографии name."""
+    widths = cache.get(_variants_key(name))
+    if widths is None:
+        # Копии могли сделать в другом процессе: смотрим на файлы.
+        width = _original_width(name, storage)
+        widths = [] if width is None else [
+            target for target in target_widths(width) if all(
+                storage.exists(variant_name(name, target, ext))
+                for ext in FORMATS
+            )
+        ]
+        remember_variants(name, widths)
+    return widths
+
+
+def srcset(name, widths, ext, storage=default_storage):
+    return ', '.join(
+        f'{storage.url(variant_name(name, width, ext))} {width}w'
+        for width in widths
+    )
@@ -1,5 +1,18 @@
-from django.urls import path
-from . import views
+from django.urls import path, register_converter
+from . import feeds, views
+
+
+class FeedFormatConverter:
+    regex = '|'.join(feeds.FORMATS)
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+register_converter(FeedFormatConverter, 'feed')
 
 
 app_name = 'blog'
@@ -35,5 +48,20 @@ urlpatterns = [
     path('posts/<int:post_id>/delete_comment/<int:comment_id>/',
          views.CommentDeleteView.as_view(),
          name='delete_comment'),
+    path('feeds/<feed:feed_format>/',
+         feeds.feed,
+         name='feed'),
+    path('category/<slug:category_slug>/feeds/<feed:feed_format>/',
+         feeds.feed,
+         name='category_feed'),
+    path('profile/<str:username>/feeds/<feed:feed_format>/',
+         feeds.feed,
+         name='profile_feed'),
+    path('search/',
+         views.search,
+         name='search'),
+    path('metrics',
+         views.metrics,
+         name='metrics'),
     path('', views.index, name='index'),
 ]
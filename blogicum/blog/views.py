@@ -1,20 +1,46 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.db.models import Count
-from django.utils import timezone
-from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.contrib.auth.mixins import (LoginRequiredMixin,
                                         UserPassesTestMixin)
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
 from django.views.generic import (
     DetailView, UpdateView, CreateView, DeleteView)
+from . import jobs
+from .caching import (INDEX, attach_card_versions, author_group,
+                      cache_page_for_anonymous, category_group,
+                      conditional_page, post_group)
+from .metrics import collect_all, render as render_metrics
 from .models import Comment, Category, Post
+from .paginators import LAST, CursorPaginator
+from .search import search_posts
+from .snapshots import snapshot_page
 from .forms import (PostForm, UpdateProfileModelForm,
                     CommentForm, UpdateCommentModelForm)
 
 
 # Количество постов на одной странице.
 NUMBER_OF_POSTS = 10
+# Количество комментариев на одной странице поста.
+COMMENTS_PER_PAGE = 50
+
+
+def get_post_list(user, category='', author=''):
+    """Посты ленты: общей, категории или автора."""
+    post_list = Post.objects.for_feed()
+    if category != '':
+        return post_list.published().filter(category=category)
+    if author != '':
+        post_list = post_list.filter(author=author)
+        # Автор видит в профиле и свои неопубликованные посты.
+        if author != user:
+            post_list = post_list.published()
+        return post_list
+    return post_list.published()
 
 
 def paginator_settings(request,
@@ -22,40 +48,18 @@ def paginator_settings(request,
                        category: str = '',
                        author: str = ''):
     """Настройка пагинатора."""
-    if category != '':
-        post_list = Post.objects.annotate(
-            comment_count=Count("comments")
-        ).filter(
-            is_published=True, category__is_published=True,
-            pub_date__lte=timezone.now(), category=category
-        ).order_by('-pub_date')
-    elif author != '':
-        if author != request.user:
-            post_list = Post.objects.annotate(
-                comment_count=Count("comments")
-            ).filter(
-                author=author, is_published=True,
-                category__is_published=True,
-                pub_date__lte=timezone.now()
-            ).order_by('-pub_date')
-        else:
-            post_list = Post.objects.annotate(
-                comment_count=Count("comments")
-            ).filter(
-                author=author
-            ).order_by('-pub_date')
-    else:
-        post_list = Post.objects.annotate(
-            comment_count=Count("comments")
-        ).filter(
-            is_published=True, category__is_published=True,
-            pub_date__lte=timezone.now()).order_by('-pub_date')
-    paginator = Paginator(post_list, number_of_posts)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = get_post_list(request.user, category, author)
+    # Пагинация по ключу (pub_date, id): глубокие страницы стоят
+    # столько же, сколько первая. Старые ссылки ?page=N продолжают работать.
+    paginator = CursorPaginator(post_list, number_of_posts)
+    page_obj = paginator.get_page(request.GET.get('cursor'),
+                                  request.GET.get('page'))
+    attach_card_versions(page_obj)
     return page_obj
 
 
+@conditional_page(lambda: {INDEX})
+@cache_page_for_anonymous(lambda: {INDEX}, scheduled=True)
 def index(request):
     """Главная с постами."""
     template = 'blog/index.html'
@@ -64,32 +68,60 @@ def index(request):
     return render(request, template, context)
 
 
+def search(request):
+    """Поиск по опубликованным постам."""
+    template = 'blog/search.html'
+    query = request.GET.get('q', '').strip()
+    found = search_posts(query) if query else []
+    # Результаты упорядочены по релевантности, поэтому страницы — по
+    # номеру, а посты загружаются только для текущей страницы.
+    page_obj = Paginator(found, NUMBER_OF_POSTS).get_page(
+        request.GET.get('page')
+    )
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    attach_card_versions(page_obj.object_list)
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, template, context)
+
+
+@conditional_page(lambda post_id: {post_group(post_id)})
+@cache_page_for_anonymous(lambda post_id: {post_group(post_id)})
 def post_detail(request, post_id):
     """Пост."""
     template = 'blog/detail.html'
+    # Видимость проверяется в том же запросе, что загружает пост.
     post = get_object_or_404(
-        Post,
+        Post.objects.visible_to(request.user).select_related(
+            'author', 'category', 'location'
+        ),
         id=post_id
     )
-    # Тут не CBV, поэтому отдельную функцию не буду делать))) лень.
-    if request.user != post.author:
-        post = get_object_or_404(
-            Post,
-            id=post_id,
-            is_published=True,
-            category__is_published=True,
-            pub_date__lte=timezone.now(),
-        )
-
     form = CommentForm()
-    comments = Comment.objects.filter(post_id=post_id)
+    comments = Comment.objects.filter(post_id=post.id).select_related(
+        'author'
+    ).only('id', 'text', 'created_at', 'post_id', 'author__username')
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE,
+                                ordering=('created_at', 'id'))
+    cursor = request.GET.get('cursor')
+    # Обсуждение популярного поста берём из снимка, без запроса к БД.
+    page = snapshot_page(post, paginator, cursor)
+    if page is None:
+        page = paginator.get_page(cursor)
     context = {'post': post,
                'form': form,
-               'comments': comments
+               'comments': page
                }
     return render(request, template, context)
 
 
+@conditional_page(lambda category_slug: {category_group(category_slug)})
+@cache_page_for_anonymous(
+    lambda category_slug: {category_group(category_slug)}, scheduled=True
+)
 def category_posts(request, category_slug):
     """Посты по заданой категории."""
     template = 'blog/category.html'
@@ -180,6 +212,12 @@ class PostDeleteView(LoginRequiredMixin, AuthorVerificationMixin,
         return super().dispatch(request, *args, **kwargs)
 
 
+@method_decorator(conditional_page(
+    lambda username: {author_group(username)}
+), name='get')
+@method_decorator(cache_page_for_anonymous(
+    lambda username: {author_group(username)}, scheduled=True
+), name='get')
 class ProfileDetailView(DetailView):
     """Информация профиля."""
 
@@ -242,8 +280,15 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
     def get_success_url(self):
-        return reverse('blog:post_detail',
-                       kwargs={'post_id': self.post_obj.id})
+        url = reverse('blog:post_detail',
+                      kwargs={'post_id': self.post_obj.id})
+        # Новый комментарий — в конце списка: ведём на последнюю страницу.
+        if self.post_obj.comment_count >= COMMENTS_PER_PAGE:
+            url += '?cursor=' + CursorPaginator(
+                Comment.objects.none(), COMMENTS_PER_PAGE,
+                ordering=('created_at', 'id')
+            ).encode_cursor(LAST)
+        return f'{url}#comment_{self.object.id}'
 
 
 class CommentUpdateView(LoginRequiredMixin, AuthorVerificationMixin,
@@ -289,3 +334,36 @@ class CommentDeleteView(LoginRequiredMixin, AuthorVerificationMixin,
         if not self.test_func():
             return redirect(self.get_success_url())
         return super().dispatch(request, *args, **kwargs)
+
+
+def job_gauges():
+    """Состояние очереди задач для /metrics."""
+    stats = jobs.stats()
+    gauges = [('blog_jobs', 'Задачи очереди по состоянию.',
+               {'status': status}, count)
+              for status, count in stats['statuses'].items()]
+    gauges += [('blog_jobs_queued', 'Ждущие задачи по обработчику.',
+                {'task': name}, count)
+               for name, count in stats['depth'].items()]
+    gauges.append(('blog_jobs_oldest_age_seconds',
+                   'Сколько ждёт самая старая задача.', {},
+                   stats['oldest_age']))
+    return gauges
+
+
+def metrics(request):
+    """Метрики в формате Prometheus по токену BLOG_METRICS_TOKEN.
+
+    Токен передаётся заголовком ``Authorization: Bearer <токен>``.
+    Адрес клиента не проверяется: за обратным прокси все запросы
+    приходят с 127.0.0.1.
+    """
+    token = settings.BLOG_METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if (not settings.BLOG_METRICS_ENABLED or not token
+            or not constant_time_compare(authorization, f'Bearer {token}')):
+        raise Http404
+    return HttpResponse(
+        render_metrics(collect_all(), job_gauges()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
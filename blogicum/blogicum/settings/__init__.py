@@ -0,0 +1,21 @@
+"""Настройки проекта.
+
+Профиль выбирается переменной окружения BLOGICUM_ENV:
+dev (по умолчанию), prod или bench.
+"""
+import os
+
+ENVIRONMENT = os.getenv('BLOGICUM_ENV', 'dev')
+
+if ENVIRONMENT == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif ENVIRONMENT == 'bench':
+    from .bench import *  # noqa: F401,F403
+elif ENVIRONMENT == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль настроек BLOGICUM_ENV={ENVIRONMENT!r}.'
+    )
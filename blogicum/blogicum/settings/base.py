@@ -0,0 +1,234 @@
+"""Общие настройки всех профилей (см. blogicum/settings/__init__.py)."""
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+SECRET_KEY = os.getenv(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-aei^dd(lkyg+yw!$o%36smxo0#669*il)ed8707hrwg-2wyd=('
+)
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django_bootstrap5',
+    'blog.apps.BlogConfig',
+    'pages.apps.PagesConfig',
+]
+
+MIDDLEWARE = [
+    'blog.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.QueryBudgetMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.PrimaryStickinessMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'blogicum.urls'
+
+TEMPLATES_DIR = BASE_DIR / 'templates'
+
+TEMPLATES = [
+    {
+        # Шаблонизатор Django, засекающий время рендера (blog.metrics).
+        'BACKEND': 'blog.metrics.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'blogicum.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        # Сколько секунд держать соединение между запросами (0 — закрывать):
+        # PRAGMA выполняются один раз на соединение, а не на каждый запрос.
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_CONN_MAX_AGE', 60)),
+    }
+}
+
+# Реплики только для чтения: пути к файлам через запятую в
+# BLOGICUM_DB_REPLICAS. Локально их наполняет manage.py replicate_sqlite.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.getenv('BLOGICUM_DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# Приложения, чьи модели читаются с реплик.
+REPLICA_APPS = ['blog']
+
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_STICKY_SECONDS = 10
+
+# Режим журнала хранится в самом файле базы, поэтому выставляется один
+# раз после migrate, а не на каждое соединение (см. blog.signals).
+SQLITE_JOURNAL_MODE = 'WAL'
+
+# PRAGMA для каждого нового соединения с SQLite (см. blog.signals).
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Сколько секунд хранить страницы блога для анонимных читателей.
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 5
+
+# С какого числа комментариев обсуждение поста хранится в кэше готовым
+# HTML (см. blog.snapshots).
+BLOG_COMMENT_SNAPSHOT_THRESHOLD = 50
+
+# Бэкенд полнотекстового поиска по постам (см. blog.search).
+BLOG_SEARCH_BACKEND = 'blog.search.fts.Fts5Backend'
+# Каталог индекса для blog.search.inverted.InvertedIndexBackend — бэкенда
+# для баз без FTS5.
+BLOG_SEARCH_INDEX_DIR = BASE_DIR / 'search_index'
+
+# Фоновая очередь задач (см. blog.jobs). Воркер: manage.py run_jobs.
+# Выполнять задачи сразу, без очереди и воркера.
+BLOG_JOBS_EAGER = False
+# Через сколько секунд задачу упавшего воркера берёт другой.
+BLOG_JOBS_VISIBILITY_TIMEOUT = 60 * 5
+# Сколько секунд хранить выполненные задачи для метрик.
+BLOG_JOBS_RETENTION = 60 * 60 * 24
+
+# Метрики в формате Prometheus на /metrics (см. blog.metrics).
+BLOG_METRICS_ENABLED = True
+# Каталог, где воркеры складывают свои метрики; без него /metrics
+# показывает метрики только того процесса, который ответил.
+BLOG_METRICS_DIR = os.getenv('BLOGICUM_METRICS_DIR') or None
+# Как часто воркер сохраняет свои метрики в каталог, в секундах.
+BLOG_METRICS_FLUSH_INTERVAL = 5
+# Токен для /metrics (заголовок Authorization: Bearer <токен>);
+# без токена /metrics отвечает 404.
+BLOG_METRICS_TOKEN = os.getenv('BLOGICUM_METRICS_TOKEN') or None
+
+# Бюджет запросов к БД на запрос к сайту (см. blog.query_budget).
+# off — не считать запросы, log — предупреждать в логе, raise — падать.
+BLOG_QUERY_BUDGET_MODE = 'off'
+# Наибольшее число запросов для имени URL; для прочих URL —
+# BLOG_QUERY_BUDGET_DEFAULT (None — без ограничения).
+BLOG_QUERY_BUDGETS = {
+    'blog:index': 6,
+    'blog:category_posts': 7,
+    'blog:profile': 7,
+    'blog:post_detail': 8,
+    'blog:search': 4,
+    'blog:feed': 4,
+    'blog:category_feed': 5,
+    'blog:profile_feed': 5,
+}
+BLOG_QUERY_BUDGET_DEFAULT = None
+# Со скольких повторов запроса одной формы считать его N+1.
+BLOG_QUERY_REPEAT_THRESHOLD = 5
+
+
+# Password validation
+# https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/3.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru-RU'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/3.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = [
+    BASE_DIR / "static",
+]
+
+STATIC_ROOT = BASE_DIR / 'static_collected'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+
+CSRF_FAILURE_VIEW = 'pages.views.csrf_failure_view'
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+LOGIN_REDIRECT_URL = 'blog:index'
+
+MEDIA_ROOT = BASE_DIR / 'media'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
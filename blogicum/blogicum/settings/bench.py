@@ -0,0 +1,19 @@
+"""Бенчмарки: боевые настройки на отдельной базе."""
+import os
+from copy import deepcopy
+
+from .prod import *  # noqa: F401,F403
+from .prod import ALLOWED_HOSTS, BASE_DIR, DATABASES
+
+ALLOWED_HOSTS = ALLOWED_HOSTS + ['testserver']
+
+DATABASES = deepcopy(DATABASES)
+DATABASES['default']['NAME'] = os.getenv(
+    'BLOGICUM_BENCH_DB', BASE_DIR / 'bench.sqlite3'
+)
+
+# Статика не собирается через collectstatic.
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+# Быстрый хешер для массового создания пользователей.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
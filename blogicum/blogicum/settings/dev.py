@@ -0,0 +1,21 @@
+"""Разработка: отладка, debug_toolbar и задачи без воркера."""
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + ['debug_toolbar']
+
+MIDDLEWARE = MIDDLEWARE + [
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+# Фоновые задачи выполняются сразу: воркер run_jobs не нужен.
+BLOG_JOBS_EAGER = True
+
+# Предупреждать в логе о лишних запросах к БД и N+1.
+BLOG_QUERY_BUDGET_MODE = 'log'
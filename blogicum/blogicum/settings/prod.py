@@ -0,0 +1,45 @@
+"""Боевой запуск.
+
+Без отладки и debug_toolbar, с общим для процессов кэшем, кэшем
+шаблонов и сжатой статикой.
+"""
+import os
+from copy import deepcopy
+
+from .base import *  # noqa: F401,F403
+from .base import ALLOWED_HOSTS, TEMPLATES
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv(
+    'DJANGO_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)
+).split(',')
+
+# Кэш, общий для всех процессов: версии страниц и снимки обсуждений
+# сбрасывает воркер run_jobs, а читают веб-процессы. Таблицу создаёт
+# manage.py createcachetable; Redis и др. — через DJANGO_CACHE_BACKEND.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND',
+                             'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'blog_cache'),
+    }
+}
+
+# Кэширующий загрузчик разбирает каждый шаблон один раз за жизнь
+# процесса, а не на каждый рендер.
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Компилировать шаблоны при старте воркера (см. blogicum/wsgi.py).
+TEMPLATE_WARMUP = True
+
+# Статика с хешем в имени (вечный кэш в браузере) и .gz-копиями
+# для gzip_static веб-сервера.
+STATICFILES_STORAGE = 'blogicum.storage.CompressedManifestStaticFilesStorage'
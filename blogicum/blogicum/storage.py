@@ -0,0 +1,37 @@
+"""Хранилище статики для боевого профиля."""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем в имени и .gz-копиями текстовых файлов.
+
+    Веб-сервер отдаёт готовые .gz (gzip_static в nginx), не сжимая
+    файлы на каждый запрос.
+    """
+
+    compressible = ('.css', '.js', '.svg', '.txt', '.xml', '.json', '.ico')
+
+    def post_process(self, paths, dry_run=False, **options):
+        # Файл может обрабатываться в несколько проходов; сжимается
+        # итоговое имя из последнего.
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if not dry_run:
+            for hashed_name in hashed_names.values():
+                if hashed_name.endswith(self.compressible):
+                    self._write_gzip(hashed_name)
+
+    def _write_gzip(self, name):
+        with self.open(name) as source:
+            content = source.read()
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            with open(self.path(name + '.gz'), 'wb') as target:
+                target.write(compressed)
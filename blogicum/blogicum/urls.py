@@ -23,6 +23,6 @@ urlpatterns = [
 handler404 = 'pages.views.page_not_found_view'
 handler500 = 'pages.views.server_error_view'
 
-if settings.DEBUG:
+if 'debug_toolbar' in settings.INSTALLED_APPS:
     import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
@@ -0,0 +1,45 @@
+"""Предварительная компиляция шаблонов при старте воркера."""
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+
+
+def template_names(engine, include_apps=False):
+    """Имена шаблонов из TEMPLATES['DIRS'] (и приложений, если нужно)."""
+    dirs = list(engine.dirs)
+    if include_apps:
+        dirs.extend(get_app_template_dirs('templates'))
+    names = set()
+    for directory in map(Path, dirs):
+        names.update(
+            path.relative_to(directory).as_posix()
+            for path in directory.rglob('*.html')
+        )
+    return sorted(names)
+
+
+def warm_templates(include_apps=False):
+    """Загружает шаблоны, заполняя кэш загрузчика.
+
+    Возвращает число скомпилированных шаблонов, время в секундах
+    и словарь «шаблон — ошибка» для шаблонов, которые не разобрались.
+    """
+    started = time.perf_counter()
+    compiled, errors = 0, {}
+    for engine in engines.all():
+        for name in template_names(engine, include_apps):
+            try:
+                engine.get_template(name)
+            except Exception as error:
+                errors[name] = f'{type(error).__name__}: {error}'
+            else:
+                compiled += 1
+    return compiled, time.perf_counter() - started, errors
+
+
+def warm_on_boot():
+    if getattr(settings, 'TEMPLATE_WARMUP', False):
+        warm_templates()
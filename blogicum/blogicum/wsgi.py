@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны компилируются до первого запроса; с gunicorn --preload —
+# один раз в мастер-процессе, до fork воркеров.
+from blogicum.warmup import warm_on_boot  # noqa: E402
+
+warm_on_boot()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blogicum.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = ('Компилирует все шаблоны проекта; с кэширующим загрузчиком '
+            'заполняет его кэш и находит шаблоны с ошибками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', dest='include_apps',
+                            help='Также шаблоны установленных приложений.')
+
+    def handle(self, *args, include_apps, **options):
+        compiled, seconds, errors = warm_templates(include_apps)
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        self.stdout.write(
+            f'Скомпилировано шаблонов: {compiled} за {seconds * 1000:.1f} мс.'
+        )
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}.')
@@ -0,0 +1,121 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.admin import PostAdmin
+from blog.models import Post
+from blog.paginators import EstimatedCountPaginator
+
+pytestmark = [pytest.mark.django_db]
+
+CHANGELIST = "/admin/blog/post/"
+
+
+@pytest.fixture
+def admin_posts(django_user_model, published_category, published_location):
+    created = []
+
+    def create(count):
+        start = len(created)
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f"author{index}")
+            for index in range(start * 5, (start + count) * 5)
+        )
+        users = django_user_model.objects.filter(
+            username__startswith="author"
+        ).order_by("id")[start * 5:]
+        Post.objects.bulk_create(
+            Post(title=f"Пост {index}", text="Текст",
+                 pub_date=timezone.now(), author=author,
+                 category=published_category, location=published_location)
+            for index, author in enumerate(users[:count], start)
+        )
+        created.extend(Post.objects.order_by("id")[start:])
+        return created
+    return create
+
+
+def _changelist(client, **params):
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(CHANGELIST, params)
+    assert response.status_code == 200
+    return response, len(queries), time.perf_counter() - started
+
+
+def test_changelist_queries_do_not_grow_with_rows(admin_client, admin_posts):
+    admin_posts(5)
+    _, few_queries, _ = _changelist(admin_client)
+    posts = admin_posts(95)
+    response, many_queries, elapsed = _changelist(admin_client)
+    assert many_queries == few_queries, (
+        "Убедитесь, что число запросов списка постов в админке не зависит"
+        " от числа строк: list_select_related и автодополнение."
+    )
+    assert many_queries <= 12
+    assert elapsed < 5, "Список постов в админке рисуется слишком долго."
+    content = response.content.decode("utf-8")
+    assert "author499" not in content, (
+        "Убедитесь, что в списке постов нет <select> со всеми"
+        " пользователями."
+    )
+    assert posts[-1].author.username in content
+
+
+def test_author_filter(admin_client, admin_posts):
+    posts = admin_posts(3)
+    response, _, _ = _changelist(
+        admin_client, author__username=posts[1].author.username
+    )
+    assert list(response.context["cl"].result_list) == [posts[1]], (
+        "Убедитесь, что посты в админке фильтруются по имени автора."
+    )
+    assert 'name="author__username"' in response.content.decode("utf-8")
+
+
+def test_estimated_count_paginator(monkeypatch, admin_posts):
+    admin_posts(8)
+    monkeypatch.setattr(EstimatedCountPaginator, "EXACT_COUNT_LIMIT", 5)
+    Post.objects.filter(id=Post.objects.order_by("id")[2].id).delete()
+    with CaptureQueriesContext(connection) as queries:
+        count = EstimatedCountPaginator(Post.objects.all(), 10).count
+    assert count >= 7 and not any(
+        "COUNT(*)" in query["sql"] and "LIMIT" not in query["sql"]
+        for query in queries
+    ), "Убедитесь, что для большой таблицы число строк оценивается."
+    filtered = Post.objects.filter(title__startswith="Пост")
+    paginator = EstimatedCountPaginator(filtered, 2)
+    assert paginator.count == 6 and paginator.truncated, (
+        "Убедитесь, что выборка с фильтром больше предела помечается"
+        " как обрезанная."
+    )
+    assert EstimatedCountPaginator(filtered, 2, page_number=3).count == 7
+    assert EstimatedCountPaginator(Post.objects.all()[:0], 10).count == 0
+
+
+def test_filtered_changelist_above_limit(monkeypatch, admin_client,
+                                         admin_posts):
+    admin_posts(10)
+    monkeypatch.setattr(EstimatedCountPaginator, "EXACT_COUNT_LIMIT", 3)
+    monkeypatch.setattr(PostAdmin, "list_per_page", 2)
+    response, _, _ = _changelist(admin_client, q="Пост")
+    content = response.content.decode("utf-8")
+    assert "больше 4 Публикации" in content, (
+        "Убедитесь, что список с фильтром показывает, что число постов"
+        " подсчитано не полностью."
+    )
+    assert "?p=3&amp;q=" in content and "showall" not in content
+    response, _, _ = _changelist(admin_client, q="Пост", p=3)
+    assert len(response.context["cl"].result_list) == 2, (
+        "Убедитесь, что список с фильтром листается дальше"
+        " EXACT_COUNT_LIMIT."
+    )
+    assert "больше 8" in response.content.decode("utf-8")
+    response, _, _ = _changelist(admin_client, q="Пост", p=5)
+    content = response.content.decode("utf-8")
+    assert len(response.context["cl"].result_list) == 2
+    assert response.context["cl"].result_count == 10
+    assert "больше" not in content and "10 Публикации" in content
@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog import jobs
+from blog.admin import PostAdmin
+from blog.models import Comment, Job, Post
+
+pytestmark = [pytest.mark.django_db]
+
+POSTS = "/admin/blog/post/"
+COMMENTS = "/admin/blog/comment/"
+
+
+@pytest.fixture
+def posts(mixer, user, another_user, published_category,
+          published_location):
+    return [
+        mixer.blend(
+            "blog.Post", author=author, category=published_category,
+            location=published_location, is_published=True,
+            pub_date=timezone.now() - timedelta(days=1),
+            title=f"Массовый {index}",
+        )
+        for index, author in enumerate((user, user, another_user))
+    ]
+
+
+def _action(client, url, action, objs, **data):
+    return client.post(url, {
+        "action": action, "_selected_action": [obj.pk for obj in objs],
+        **data,
+    })
+
+
+def test_publish_and_unpublish(admin_client, unlogged_client, posts):
+    assert "Массовый 0" in unlogged_client.get("/").content.decode()
+    response = _action(admin_client, POSTS, "unpublish", posts[:2])
+    assert response.status_code == 302
+    assert not Post.objects.filter(pk=posts[0].pk, is_published=True).exists()
+    assert Post.objects.get(pk=posts[2].pk).is_published
+    content = unlogged_client.get("/").content.decode()
+    assert "Массовый 0" not in content and "Массовый 2" in content, (
+        "Убедитесь, что массовое снятие с публикации сбрасывает кэш"
+        " главной страницы."
+    )
+    _action(admin_client, POSTS, "publish", posts[:2])
+    assert "Массовый 0" in unlogged_client.get("/").content.decode()
+
+
+def test_move_to_category(admin_client, unlogged_client, mixer, posts):
+    target = mixer.blend("blog.Category", is_published=True)
+    unlogged_client.get(f"/category/{target.slug}/")
+    response = _action(admin_client, POSTS, "move_to_category", posts[:1])
+    assert response.status_code == 200, (
+        "Убедитесь, что перенос в категорию сначала спрашивает категорию."
+    )
+    assert "category" in response.context["form"].fields
+    response = _action(admin_client, POSTS, "move_to_category", posts[:1],
+                       category=target.pk, apply="1")
+    assert response.status_code == 302
+    assert Post.objects.get(pk=posts[0].pk).category == target
+    content = unlogged_client.get(f"/category/{target.slug}/").content
+    assert "Массовый 0" in content.decode(), (
+        "Убедитесь, что перенос сбрасывает кэш страницы новой категории."
+    )
+
+
+def test_delete_posts_by_author(admin_client, unlogged_client, mixer, user,
+                                posts):
+    mixer.blend("blog.Comment", post=posts[0], author=user)
+    response = _action(admin_client, POSTS, "delete_by_author", posts[:1])
+    assert response.status_code == 302
+    assert list(Post.objects.values_list("pk", flat=True)) == [posts[2].pk], (
+        "Убедитесь, что удаление по автору удаляет все его публикации."
+    )
+    assert not Comment.objects.exists()
+    assert unlogged_client.get(f"/posts/{posts[0].pk}/").status_code == 404
+    assert "Массовый 1" not in unlogged_client.get("/").content.decode()
+
+
+def test_delete_comments_recounts(admin_client, mixer, user, another_user,
+                                  posts):
+    comments = [mixer.blend("blog.Comment", post=posts[2], author=author)
+                for author in (user, user, another_user)]
+    Post.objects.filter(pk=posts[2].pk).update(comment_count=3)
+    response = _action(admin_client, COMMENTS, "delete_by_author",
+                       comments[:1])
+    assert response.status_code == 302
+    assert list(Comment.objects.all()) == comments[2:]
+    assert Post.objects.get(pk=posts[2].pk).comment_count == 1, (
+        "Убедитесь, что массовое удаление комментариев пересчитывает"
+        " счётчик комментариев поста."
+    )
+
+
+def test_actions_are_chunked_jobs(settings, monkeypatch, admin_client, posts):
+    settings.BLOG_JOBS_EAGER = False
+    monkeypatch.setattr(PostAdmin, "chunk_size", 2)
+    response = _action(admin_client, POSTS, "unpublish", posts,
+                       select_across="1")
+    assert response.status_code == 302
+    assert Post.objects.filter(is_published=True).count() == 3, (
+        "Убедитесь, что массовое действие выполняется в фоне, а не"
+        " в запросе."
+    )
+    chunks = Job.objects.filter(task="blog.bulk_posts").order_by("id")
+    assert [job.payload["ids"] for job in chunks] == [
+        [posts[0].pk, posts[1].pk], [posts[2].pk]
+    ], "Убедитесь, что действие разбивается на пачки по chunk_size."
+    group = chunks[0].group
+    assert jobs.group_progress(group)[Job.QUEUED] == 2
+    while (claimed := jobs.claim()) is not None:
+        jobs.run(claimed)
+    assert jobs.group_progress(group)[Job.DONE] == 2
+    assert not Post.objects.filter(is_published=True).exists()
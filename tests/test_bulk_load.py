@@ -0,0 +1,143 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from blog.bulk_load import iter_json_array
+from blog.models import Category, Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _records(user):
+    yield {"model": "auth.permission", "pk": 1, "fields": {}}
+    yield {"model": "blog.category", "pk": 10, "fields": {
+        "title": "Загрузка", "description": "-", "slug": "bulk",
+        "is_published": True, "created_at": "2022-12-18T23:03:52Z",
+    }}
+    yield {"model": "blog.location", "pk": 10, "fields": {
+        "name": "Байона", "is_published": True,
+    }}
+    for pk in range(100, 105):
+        yield {"model": "blog.post", "pk": pk, "fields": {
+            "title": f"Пост {pk}", "text": "Текст",
+            "pub_date": "2020-01-01T00:00:00Z", "author": user.id,
+            "category": 10, "location": 10,
+            "created_at": "2021-05-01T10:00:00Z",
+        }}
+    yield {"model": "blog.post", "pk": 200, "fields": {
+        "title": "Без категории в базе", "text": "Текст",
+        "pub_date": "2020-01-01T00:00:00Z", "author": user.id,
+        "category": 999,
+    }}
+    yield {"model": "blog.post", "pk": 201, "fields": {
+        "title": "Без даты", "text": "Текст", "author": user.id,
+    }}
+    for pk in range(100, 103):
+        yield {"model": "blog.comment", "pk": pk, "fields": {
+            "text": "Отзыв", "post": 100, "author": user.id,
+            "created_at": "2021-05-02T10:00:00Z",
+        }}
+
+
+def test_json_array_reader_handles_chunk_boundaries():
+    data = [{"model": "blog.post", "pk": pk, "fields": {"title": "«ё» ,]"}}
+            for pk in range(20)]
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    for chunk_size in (1, 5, 64, len(text)):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == data
+    assert list(iter_json_array(io.StringIO("[]"))) == []
+
+
+@pytest.mark.parametrize("suffix", ["json", "jsonl"])
+def test_bulk_load(tmp_path, user, unlogged_client, suffix):
+    records = list(_records(user))
+    path = tmp_path / f"dump.{suffix}"
+    with open(path, "w", encoding="utf-8") as f:
+        if suffix == "json":
+            json.dump(records, f, ensure_ascii=False)
+        else:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+    output, errors = io.StringIO(), io.StringIO()
+    call_command("bulk_load", str(path), batch_size=2,
+                 stdout=output, stderr=errors)
+
+    assert set(Post.objects.values_list("id", flat=True)) == set(
+        range(100, 105)
+    ), "Убедитесь, что bulk_load загружает посты и отклоняет неверные."
+    assert "pk=200" in errors.getvalue() and "pk=201" in errors.getvalue()
+    assert "Загружено строк: 10, отклонено: 2" in output.getvalue()
+    post = Post.objects.get(id=100)
+    assert post.created_at.year == 2021, (
+        "Убедитесь, что bulk_load сохраняет created_at из выгрузки."
+    )
+    assert post.comment_count == 3 and Comment.objects.count() == 3, (
+        "Убедитесь, что после загрузки комментариев пересчитан"
+        " comment_count."
+    )
+    response = unlogged_client.get("/search/", {"q": "Пост"})
+    assert len(response.context["page_obj"]) == 5, (
+        "Убедитесь, что загруженные посты попадают в поисковый индекс."
+    )
+
+    call_command("bulk_load", str(path), stdout=io.StringIO(),
+                 stderr=io.StringIO())
+    assert Category.objects.count() == 1 and Post.objects.count() == 5, (
+        "Убедитесь, что повторная загрузка не дублирует строки."
+    )
+
+
+def _dumpdata_records(user):
+    # Как у dumpdata blog: посты раньше категорий и мест.
+    for pk in (1, 2, 3):
+        yield {"model": "blog.post", "pk": pk, "fields": {
+            "title": f"Из дампа {pk}", "text": "Текст",
+            "pub_date": "2020-01-01T00:00:00Z", "author": user.id,
+            "category": 1, "location": 1,
+        }}
+    yield {"model": "blog.post", "pk": 4, "fields": {
+        "title": "Без категории", "text": "Текст",
+        "pub_date": "2020-01-01T00:00:00Z", "author": user.id,
+        "category": 999,
+    }}
+    for pk, slug in ((1, "dump"), (2, "dump")):
+        yield {"model": "blog.category", "pk": pk, "fields": {
+            "title": "Дамп", "description": "-", "slug": slug,
+            "is_published": True,
+        }}
+    yield {"model": "blog.location", "pk": 1, "fields": {
+        "name": "Байона", "is_published": True,
+    }}
+    for pk in (1, 2):
+        yield {"model": "blog.comment", "pk": pk, "fields": {
+            "text": "Отзыв", "post": 3, "author": user.id,
+        }}
+
+
+def test_bulk_load_waits_for_references(tmp_path, user):
+    path = tmp_path / "dump.jsonl"
+    path.write_text("".join(
+        json.dumps(record) + "\n" for record in _dumpdata_records(user)
+    ))
+    output, errors = io.StringIO(), io.StringIO()
+    call_command("bulk_load", str(path), batch_size=2,
+                 stdout=output, stderr=errors)
+    assert set(Post.objects.values_list("id", flat=True)) == {1, 2, 3}, (
+        "Убедитесь, что посты, записанные раньше своих категорий,"
+        " дожидаются их, а не отклоняются."
+    )
+    assert Post.objects.get(id=3).comment_count == 2
+    assert "blog.post pk=4: Нет строки category=999." in errors.getvalue()
+    assert "blog.category pk=2: Нарушает уникальность." in errors.getvalue()
+    assert "Загружено строк: 7, отклонено: 2" in output.getvalue(), (
+        "Убедитесь, что загруженными считаются только вставленные строки."
+    )
+
+    output = io.StringIO()
+    call_command("bulk_load", str(path), batch_size=2,
+                 stdout=output, stderr=io.StringIO())
+    assert "Загружено строк: 0" in output.getvalue(), (
+        "Убедитесь, что строки, которые уже есть в базе, не считаются"
+        " загруженными."
+    )
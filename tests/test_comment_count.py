@@ -0,0 +1,127 @@
+import gc
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from blog import snapshots
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _stored_count(post):
+    post.refresh_from_db(fields=["comment_count"])
+    return post.comment_count
+
+
+def test_comment_count_follows_comments(
+        mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend("blog.Comment", post=post, author=user)
+    assert _stored_count(post) == 3, (
+        "Убедитесь, что `Post.comment_count` увеличивается при создании"
+        " комментария."
+    )
+
+    comments[0].delete()
+    post.comments.filter(pk=comments[1].pk).delete()
+    assert _stored_count(post) == 1, (
+        "Убедитесь, что `Post.comment_count` уменьшается при удалении"
+        " комментария, в том числе через `QuerySet.delete()`."
+    )
+
+    post.title = "Заголовок после комментариев"
+    stale = type(post).objects.get(pk=post.pk)
+    mixer.blend("blog.Comment", post=post, author=user)
+    stale.save()
+    assert _stored_count(post) == 2, (
+        "Убедитесь, что сохранение поста не затирает счётчик комментариев."
+    )
+
+
+def test_recount_comments_repairs_drift(
+        mixer, user, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post, author=user)
+    type(post).objects.filter(pk=post.pk).update(comment_count=42)
+
+    call_command("recount_comments", batch_size=1)
+    assert _stored_count(post) == 2, (
+        "Убедитесь, что команда `recount_comments` исправляет расхождения"
+        " счётчика комментариев."
+    )
+
+
+def _delete_queries(client, post):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(f"/posts/{post.pk}/delete/")
+    assert response.status_code == 302
+    return len(queries)
+
+
+def test_post_delete_does_not_touch_comments_one_by_one(
+        mixer, user, user_client, published_category
+):
+    small, large = mixer.cycle(2).blend(
+        "blog.Post", author=user, category=published_category
+    )
+    mixer.cycle(5).blend("blog.Comment", post=small, author=user)
+    mixer.cycle(200).blend("blog.Comment", post=large, author=user)
+    few = _delete_queries(user_client, small)
+    many = _delete_queries(user_client, large)
+    # QuerySet.delete() удаляет строки пачками по 100.
+    assert many <= few + 1 and many <= 16, (
+        "Убедитесь, что удаление поста удаляет его комментарии пачками,"
+        f" а не поштучно: {few} запросов при 5 комментариях, {many} —"
+        " при 200."
+    )
+    assert not Comment.objects.exists()
+
+
+def test_user_delete_keeps_other_counters(
+        mixer, user, another_user, post_with_published_location
+):
+    post = post_with_published_location
+    other = mixer.blend("blog.Post", author=another_user,
+                        category=post.category)
+    mixer.cycle(50).blend("blog.Comment", post=post, author=another_user)
+    mixer.cycle(2).blend("blog.Comment", post=other, author=user)
+    mixer.blend("blog.Comment", post=other, author=another_user)
+    with CaptureQueriesContext(connection) as queries:
+        user.delete()
+    assert len(queries) < 30, (
+        "Убедитесь, что комментарии удаляемых вместе с пользователем"
+        " постов не обрабатываются поштучно."
+    )
+    assert _stored_count(other) == 1, (
+        "Убедитесь, что удаление пользователя уменьшает счётчики"
+        " комментариев чужих постов."
+    )
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.parametrize("delete", ["post", "user"])
+def test_failed_delete_does_not_leave_posts_marked(
+        monkeypatch, mixer, user, post_with_published_location, delete
+):
+    post = post_with_published_location
+    comments = mixer.cycle(2).blend("blog.Comment", post=post, author=user)
+
+    def fail(post_ids):
+        raise RuntimeError("Сбой при удалении")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(snapshots, "drop", fail)
+        with pytest.raises(RuntimeError), transaction.atomic():
+            (post if delete == "post" else user).delete()
+    gc.collect()
+    assert _stored_count(post) == 2
+    comments[0].delete()
+    assert _stored_count(post) == 1, (
+        "Убедитесь, что после упавшего удаления поста счётчик его"
+        " комментариев снова обновляется."
+    )
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _urls(post):
+    return (
+        "/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+        f"/profile/{post.author.username}/",
+    )
+
+
+def test_unchanged_pages_are_not_modified(
+        unlogged_client, user_client, post_with_published_location
+):
+    for client in (unlogged_client, user_client):
+        for url in _urls(post_with_published_location):
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response.has_header("ETag"), (
+                f"Убедитесь, что страница `{url}` отдаёт ETag."
+            )
+            assert "no-cache" in response["Cache-Control"]
+            repeated = client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+            assert repeated.status_code == 304, (
+                f"Убедитесь, что страница `{url}` с неизменившимся ETag"
+                " отвечает 304 Not Modified."
+            )
+    for url in _urls(post_with_published_location):
+        response = unlogged_client.get(url)
+        repeated = unlogged_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        assert repeated.status_code == 304, (
+            f"Убедитесь, что страница `{url}` учитывает If-Modified-Since."
+        )
+
+
+def test_etag_depends_on_user(
+        user_client, another_user_client, post_with_published_location
+):
+    response = user_client.get("/")
+    assert not response.has_header("Last-Modified"), (
+        "Страница авторизованного пользователя не должна отдавать"
+        " Last-Modified: она у каждого пользователя своя."
+    )
+    assert another_user_client.get(
+        "/", HTTP_IF_NONE_MATCH=response["ETag"]
+    ).status_code == 200, (
+        "Убедитесь, что ETag страницы зависит от пользователя."
+    )
+
+
+def test_changes_invalidate_validators(
+        mixer, user, unlogged_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    response = unlogged_client.get(url)
+    mixer.blend("blog.Comment", post=post, author=user, text="Новый отзыв")
+    repeated = unlogged_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert repeated.status_code == 200, (
+        "Убедитесь, что новый комментарий меняет ETag страницы поста."
+    )
+    assert "Новый отзыв" in repeated.content.decode("utf-8")
+
+
+def test_scheduled_publication_changes_validators(
+        monkeypatch, mixer, user, user_client, unlogged_client,
+        published_category, post_with_published_location
+):
+    scheduled = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, title="Отложенный пост",
+        pub_date=timezone.now() + timedelta(hours=1),
+    )
+    response = user_client.get("/")
+    assert scheduled.title not in response.content.decode("utf-8")
+    category_url = f"/category/{published_category.slug}/"
+    anonymous_response = unlogged_client.get(category_url)
+
+    real_now = timezone.now
+    monkeypatch.setattr(
+        timezone, "now", lambda: real_now() + timedelta(hours=2)
+    )
+    repeated = user_client.get("/", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert repeated.status_code == 200, (
+        "Убедитесь, что ETag ленты меняется, когда наступает время"
+        " отложенной публикации."
+    )
+    assert scheduled.title in repeated.content.decode("utf-8")
+    assert unlogged_client.get(
+        category_url,
+        HTTP_IF_MODIFIED_SINCE=anonymous_response["Last-Modified"],
+    ).status_code == 200, (
+        "Убедитесь, что Last-Modified ленты меняется, когда наступает"
+        " время отложенной публикации."
+    )
+
+
+def test_etag_changes_after_relogin(
+        client, user, post_with_published_location
+):
+    user.set_password("пароль-для-входа")
+    user.save()
+    credentials = {"username": user.username, "password": "пароль-для-входа"}
+    url = f"/posts/{post_with_published_location.id}/"
+    client.post("/auth/login/", credentials)
+    response = client.get(url)
+    assert client.get(
+        url, HTTP_IF_NONE_MATCH=response["ETag"]
+    ).status_code == 304
+    client.post("/auth/logout/")
+    client.post("/auth/login/", credentials)
+    repeated = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert repeated.status_code == 200, (
+        "Убедитесь, что после нового входа страница с формой отдаётся"
+        " заново: в старой CSRF-токен уже недействителен."
+    )
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _page(client, url):
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        f"Убедитесь, что страница `{url}` загружается без ошибок."
+    )
+    return response.context["page_obj"]
+
+
+@pytest.fixture
+def three_pages_of_posts(mixer, user, published_category):
+    # Три полные страницы и неполная; у пар постов одна дата
+    # публикации, чтобы курсор различал их по id.
+    pub_date = timezone.now() - timedelta(days=1)
+    return [
+        mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            is_published=True,
+            pub_date=pub_date - timedelta(hours=index // 2),
+        )
+        for index in range(N_PER_PAGE * 3 + N_PER_PAGE // 2)
+    ]
+
+
+def _ids(page):
+    return [post.id for post in page]
+
+
+def test_cursor_walk(user_client, three_pages_of_posts):
+    expected = [post.id for post in sorted(
+        three_pages_of_posts,
+        key=lambda post: (post.pub_date, post.id),
+        reverse=True,
+    )]
+    pages = [_page(user_client, "/")]
+    while pages[-1].has_next():
+        pages.append(
+            _page(user_client, f"/?cursor={pages[-1].next_cursor}")
+        )
+    assert [post_id for page in pages for post_id in _ids(page)] == (
+        expected
+    ), (
+        "Убедитесь, что переход по курсорам `?cursor=` проходит всю ленту"
+        " без пропусков и повторов, «от новых к старым»."
+    )
+    assert len(pages) == 4
+
+    middle = pages[1]
+    response = user_client.get(f"/?cursor={pages[0].next_cursor}")
+    content = response.content.decode("utf-8")
+    for cursor in (middle.previous_cursor, middle.next_cursor):
+        assert f'href="?cursor={cursor}"' in content, (
+            "Убедитесь, что на средней странице ленты есть ссылки"
+            " на предыдущую и следующую страницы."
+        )
+    previous = _page(user_client, f"/?cursor={middle.previous_cursor}")
+    assert _ids(previous) == _ids(pages[0]), (
+        "Убедитесь, что ссылка на предыдущую страницу ведёт на предыдущую"
+        " страницу ленты."
+    )
+    following = _page(user_client, f"/?cursor={middle.next_cursor}")
+    assert _ids(following) == _ids(pages[2]), (
+        "Убедитесь, что ссылка на следующую страницу ведёт на следующую"
+        " страницу ленты."
+    )
+
+    back = [pages[-1]]
+    while back[-1].has_previous():
+        back.append(
+            _page(user_client, f"/?cursor={back[-1].previous_cursor}")
+        )
+    assert [_ids(page) for page in reversed(back)] == [
+        _ids(page) for page in pages
+    ], (
+        "Убедитесь, что по ссылкам на предыдущие страницы можно вернуться"
+        " с последней страницы на первую через те же страницы."
+    )
+
+
+def test_legacy_page_links(user_client, many_posts_with_published_locations):
+    first = [post.id for post in _page(user_client, "/")]
+    second = [post.id for post in _page(user_client, "/?page=2")]
+    assert len(second) == N_PER_PAGE and not set(first) & set(second), (
+        "Убедитесь, что старые ссылки вида `?page=N` продолжают работать."
+    )
+    broken = [post.id for post in _page(user_client, "/?cursor=garbage")]
+    assert broken == first, (
+        "Убедитесь, что для испорченного курсора отдаётся первая страница."
+    )
+
+
+def test_no_count_query(user_client, many_posts_with_published_locations):
+    page = _page(user_client, "/")
+    with CaptureQueriesContext(connection) as queries:
+        user_client.get(f"/?cursor={page.next_cursor}")
+    for query in queries.captured_queries:
+        sql = query["sql"].upper()
+        assert "COUNT(*)" not in sql and "OFFSET" not in sql, (
+            "Убедитесь, что курсорная пагинация не выполняет COUNT(*)"
+            " и OFFSET."
+        )
@@ -0,0 +1,42 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.caching import publication_state
+
+pytestmark = [pytest.mark.django_db]
+
+# Запросов на одну страницу ленты: сессия и пользователь (для
+# залогиненного клиента), объект страницы (категория/профиль) и сама лента.
+# Даты публикаций общие для всех страниц и берутся из кэша.
+FEED_QUERIES = {
+    "index": {"unlogged": 1, "logged": 3},
+    "category": {"unlogged": 2, "logged": 4},
+    "profile": {"unlogged": 2, "logged": 4},
+}
+
+
+def test_feed_query_count(
+        user, user_client, unlogged_client, published_category,
+        many_posts_with_published_locations
+):
+    urls = {
+        "index": "/",
+        "category": f"/category/{published_category.slug}/",
+        "profile": f"/profile/{user.username}/",
+    }
+    publication_state()
+    for client_name, client in (
+            ("unlogged", unlogged_client), ("logged", user_client)
+    ):
+        for feed, url in urls.items():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            assert len(response.context["page_obj"]) > 0
+            expected = FEED_QUERIES[feed][client_name]
+            assert len(queries) == expected, (
+                f"Убедитесь, что страница `{url}` выполняет {expected}"
+                f" запрос(а) к БД, а не {len(queries)}: автор, категория и"
+                " местоположение постов должны загружаться одним запросом"
+                " вместе с лентой."
+            )
@@ -0,0 +1,82 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+FORMATS = ("rss", "atom", "json")
+
+
+def _body(response):
+    if response.streaming:
+        return b"".join(response.streaming_content).decode("utf-8")
+    return response.content.decode("utf-8")
+
+
+def _feed_urls(post):
+    for feed_format in FORMATS:
+        yield f"/feeds/{feed_format}/"
+        yield f"/category/{post.category.slug}/feeds/{feed_format}/"
+        yield f"/profile/{post.author.username}/feeds/{feed_format}/"
+
+
+def test_feeds_show_published_posts(
+        mixer, user, unlogged_client, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.blend("blog.Post", author=user, category=post.category,
+                is_published=False, title="Черновик")
+    mixer.blend("blog.Post", author=user, category=post.category,
+                is_published=True, title="Отложенный",
+                pub_date=timezone.now() + timedelta(days=1))
+    for url in _feed_urls(post):
+        response = unlogged_client.get(url)
+        assert response.status_code == 200, url
+        assert response.streaming, (
+            f"Убедитесь, что лента `{url}` отдаётся потоком."
+        )
+        body = _body(response)
+        assert post.title in body, (
+            f"Убедитесь, что в ленте `{url}` есть опубликованный пост."
+        )
+        assert "Черновик" not in body and "Отложенный" not in body, (
+            f"Убедитесь, что лента `{url}` отбирает посты по тем же"
+            " правилам публикации, что и страницы лент."
+        )
+    json_feed = json.loads(_body(unlogged_client.get("/feeds/json/")))
+    assert json_feed["items"][0]["title"] == post.title
+
+
+def test_feed_body_is_cached_and_invalidated(
+        unlogged_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/category/{post.category.slug}/feeds/rss/"
+    first = unlogged_client.get(url)
+    _body(first)
+    with CaptureQueriesContext(connection) as queries:
+        cached = unlogged_client.get(url)
+    assert not cached.streaming and len(queries) == 0, (
+        "Убедитесь, что готовое тело ленты берётся из кэша без запросов"
+        " к БД."
+    )
+    assert unlogged_client.get(
+        url, HTTP_IF_NONE_MATCH=first["ETag"]
+    ).status_code == 304
+
+    post.title = "Новый заголовок ленты"
+    post.save()
+    assert "Новый заголовок ленты" in _body(unlogged_client.get(url)), (
+        "Убедитесь, что правка поста сбрасывает кэш ленты."
+    )
+
+
+def test_unknown_feeds(unlogged_client, post_with_published_location):
+    assert unlogged_client.get("/feeds/xml/").status_code == 404
+    assert unlogged_client.get(
+        "/category/no-such-category/feeds/rss/"
+    ).status_code == 404
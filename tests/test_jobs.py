@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog import caching, jobs
+from blog.apps import check_shared_cache
+from blog.models import Job
+
+pytestmark = [pytest.mark.django_db]
+
+CALLS = []
+
+
+@jobs.task("tests.flaky", max_attempts=2)
+def flaky(fail):
+    CALLS.append(fail)
+    if fail:
+        raise ValueError("Сбой задачи")
+
+
+@pytest.fixture
+def queue(settings):
+    settings.BLOG_JOBS_EAGER = False
+    CALLS.clear()
+
+
+def test_post_save_work_goes_to_queue(
+        queue, mixer, user, published_category, unlogged_client
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+        title="Фоновая индексация",
+    )
+    assert "blog.index_posts" in set(
+        Job.objects.values_list("task", flat=True)
+    ), "Убедитесь, что индексация поста ставится в фоновую очередь."
+    response = unlogged_client.get("/search/", {"q": "индексация"})
+    assert list(response.context["page_obj"]) == []
+
+    call_command("run_jobs", once=True)
+    assert not Job.objects.exclude(status=Job.DONE).exists(), (
+        "Убедитесь, что run_jobs --once выполняет все готовые задачи."
+    )
+    response = unlogged_client.get("/search/", {"q": "индексация"})
+    assert [found.id for found in response.context["page_obj"]] == [post.id]
+
+
+def test_failed_job_is_retried_then_failed(queue):
+    job = jobs.enqueue("tests.flaky", fail=True)
+    assert jobs.run(jobs.claim()) is False
+    job.refresh_from_db()
+    assert job.status == Job.QUEUED and job.attempts == 1, (
+        "Убедитесь, что упавшая задача возвращается в очередь."
+    )
+    assert job.run_after > timezone.now() and jobs.claim() is None, (
+        "Убедитесь, что повтор задачи откладывается."
+    )
+    Job.objects.filter(id=job.id).update(run_after=timezone.now())
+    jobs.run(jobs.claim())
+    job.refresh_from_db()
+    assert job.status == Job.FAILED and "Сбой задачи" in job.last_error, (
+        "Убедитесь, что после max_attempts попыток задача не повторяется."
+    )
+    assert CALLS == [True, True]
+
+
+def test_visibility_timeout(queue):
+    job = jobs.enqueue("tests.flaky", fail=False)
+    first = jobs.claim(visibility_timeout=60)
+    assert first.id == job.id and jobs.claim() is None, (
+        "Убедитесь, что взятую задачу не берёт другой воркер."
+    )
+    Job.objects.filter(id=job.id).update(
+        locked_until=timezone.now() - timedelta(seconds=1)
+    )
+    second = jobs.claim()
+    assert second.id == job.id and second.lease != first.lease, (
+        "Убедитесь, что задачу упавшего воркера берут после истечения"
+        " аренды."
+    )
+    assert jobs.run(second) is True
+    # Завис и очнулся первый воркер: итог второго он не перезапишет.
+    jobs.run(first)
+    job.refresh_from_db()
+    assert job.status == Job.DONE and job.attempts == 2
+
+
+def test_stats(queue):
+    jobs.enqueue("tests.flaky", fail=False)
+    jobs.enqueue("tests.flaky", fail=False)
+    jobs.run(jobs.claim())
+    stats = jobs.stats()
+    assert stats["depth"] == {"tests.flaky": 1}
+    assert stats["statuses"][Job.DONE] == 1
+    assert stats["latency"]["p50"] is not None
+
+
+def test_worker_invalidation_reaches_web_cache(queue, settings,
+                                               published_category):
+    from blogicum.settings import prod
+
+    settings.CACHES = prod.CACHES
+    call_command("createcachetable", verbosity=0)
+    # Отдельный клиент кэша — как у веб-процесса.
+    web = caches.create_connection("default")
+    key = caching._version_key(caching.category_group(published_category.slug))
+    web.set(key, 1, None)
+    published_category.title = "Переименована"
+    published_category.save()
+    call_command("run_jobs", once=True)
+    assert web.get(key) != 1, (
+        "Убедитесь, что сброс кэша из воркера run_jobs виден другим"
+        " процессам."
+    )
+
+
+def test_queue_requires_shared_cache(settings):
+    settings.BLOG_JOBS_EAGER = False
+    settings.CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }}
+    with pytest.raises(ImproperlyConfigured):
+        check_shared_cache()
+    settings.BLOG_JOBS_EAGER = True
+    check_shared_cache()
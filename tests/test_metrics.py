@@ -0,0 +1,146 @@
+import json
+import re
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from blog import metrics
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _value(values, name, **labels):
+    value = values.get(metrics._key(name, labels), 0)
+    return value[-1] if isinstance(value, list) else value
+
+
+def _delta(before, name, **labels):
+    return (_value(metrics.collect(), name, **labels)
+            - _value(before, name, **labels))
+
+
+def test_request_metrics(unlogged_client, post_with_published_location):
+    before = metrics.collect()
+    unlogged_client.get("/")
+    unlogged_client.get("/")
+    assert _delta(before, "blog_requests_total", view="blog:index",
+                  method="GET", status=200) == 2, (
+        "Убедитесь, что запросы к сайту считаются по имени URL."
+    )
+    for name in ("blog_request_duration_seconds", "blog_db_duration_seconds",
+                 "blog_template_duration_seconds"):
+        assert _delta(before, name, view="blog:index") == 2, name
+    assert _delta(before, "blog_db_queries_total", view="blog:index") > 0
+    assert _delta(before, "blog_cache_requests_total", cache="page",
+                  result="hit") == 1, (
+        "Убедитесь, что попадания в кэш страниц считаются."
+    )
+    assert _delta(before, "blog_cache_requests_total", cache="page",
+                  result="miss") == 1
+
+    feed = unlogged_client.get("/feeds/rss/")
+    assert _delta(before, "blog_requests_total", view="blog:feed",
+                  method="GET", status=200) == 0
+    b"".join(feed.streaming_content)
+    assert _delta(before, "blog_requests_total", view="blog:feed",
+                  method="GET", status=200) == 1, (
+        "Убедитесь, что потоковый ответ учитывается, когда отдан."
+    )
+
+
+def test_metrics_endpoint(settings, client, post_with_published_location):
+    settings.BLOG_METRICS_TOKEN = "секрет"
+    client.get("/")
+    response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer секрет")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    assert "# TYPE blog_request_duration_seconds histogram" in text
+    assert re.search(
+        r'^blog_request_duration_seconds_bucket\{view="blog:index",'
+        r'le="\+Inf"\} \d+$', text, re.M
+    ), "Убедитесь, что /metrics отдаёт гистограммы в формате Prometheus."
+    assert 'blog_jobs{status="queued"}' in text
+    for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer чужой"}):
+        assert client.get("/metrics", **headers).status_code == 404, (
+            "Убедитесь, что /metrics закрыт для запросов без токена,"
+            " в том числе с 127.0.0.1 через прокси."
+        )
+
+
+def test_histogram_buckets_are_cumulative():
+    values = {}
+    metrics._add(values, metrics._key("blog_request_duration_seconds",
+                                      {"view": "v"}),
+                 [1, 0, 2] + [0] * 8 + [1, 3.5, 4])
+    lines = metrics.render(values).splitlines()
+    assert 'blog_request_duration_seconds_bucket{view="v",le="0.005"} 1' \
+        in lines
+    assert 'blog_request_duration_seconds_bucket{view="v",le="0.025"} 3' \
+        in lines
+    assert 'blog_request_duration_seconds_bucket{view="v",le="+Inf"} 4' \
+        in lines
+    assert 'blog_request_duration_seconds_count{view="v"} 4' in lines
+
+
+def test_threads_do_not_lose_increments():
+    before = metrics.collect()
+
+    def work():
+        for _ in range(1000):
+            metrics.inc("tests_threads_total")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _delta(before, "tests_threads_total") == 4000
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def test_processes_are_merged(settings, tmp_path):
+    settings.BLOG_METRICS_DIR = str(tmp_path)
+    metrics.inc("tests_processes_total")
+    own = _value(metrics.collect(), "tests_processes_total")
+    dead = tmp_path / f"worker-{_dead_pid()}-old.json"
+    dead.write_text(json.dumps([
+        ["tests_processes_total", [], 5],
+        ["blog_db_duration_seconds", [["view", "blog:index"]],
+         [1] + [0] * 11 + [0.001, 1]],
+    ]))
+    (tmp_path / "worker-1-other.1.tmp").write_text("{не дописан")
+    values = metrics.collect_all()
+    assert _value(values, "tests_processes_total") == own + 5, (
+        "Убедитесь, что /metrics складывает метрики всех процессов."
+    )
+    assert metrics._process_file().exists()
+    assert _value(values, "blog_db_duration_seconds",
+                  view="blog:index") >= 1
+    assert not dead.exists(), (
+        "Убедитесь, что файлы завершившихся процессов не копятся."
+    )
+    assert _value(metrics.collect_all(), "tests_processes_total") \
+        == own + 5, (
+        "Убедитесь, что значения завершившихся процессов сохраняются"
+        " в архиве и не складываются дважды."
+    )
+
+
+def test_mark_process_dead(settings, tmp_path):
+    settings.BLOG_METRICS_DIR = str(tmp_path)
+    pid = _dead_pid()
+    for token in ("a", "b"):
+        (tmp_path / f"worker-{pid}-{token}.json").write_text(
+            json.dumps([["tests_dead_total", [], 2]])
+        )
+    metrics.mark_process_dead(pid)
+    assert not list(tmp_path.glob(f"worker-{pid}-*.json"))
+    assert _value(metrics.collect_all(), "tests_dead_total") == 4
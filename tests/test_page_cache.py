@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _content(client, url):
+    return client.get(url).content.decode("utf-8")
+
+
+def test_anonymous_pages_are_cached(
+        unlogged_client, post_with_published_location
+):
+    post = post_with_published_location
+    urls = (
+        "/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+        f"/profile/{post.author.username}/",
+    )
+    for url in urls:
+        unlogged_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            unlogged_client.get(url)
+        assert len(queries) == 0, (
+            f"Убедитесь, что страница `{url}` для анонимного читателя"
+            " отдаётся из кэша без запросов к БД."
+        )
+
+
+def test_cache_invalidation(
+        mixer, user, unlogged_client, post_with_published_location,
+        another_category
+):
+    post = post_with_published_location
+    category_url = f"/category/{post.category.slug}/"
+    _content(unlogged_client, "/")
+    _content(unlogged_client, category_url)
+    _content(unlogged_client, f"/posts/{post.id}/")
+
+    mixer.blend("blog.Comment", post=post, author=user, text="Новый отзыв")
+    assert "Комментарии (1)" in _content(unlogged_client, "/"), (
+        "Убедитесь, что новый комментарий сбрасывает кэш ленты."
+    )
+    assert "Новый отзыв" in _content(unlogged_client, f"/posts/{post.id}/"), (
+        "Убедитесь, что новый комментарий сбрасывает кэш страницы поста."
+    )
+
+    post.title = "Обновлённый заголовок"
+    post.category = another_category
+    post.save()
+    assert "Обновлённый заголовок" not in _content(
+        unlogged_client, category_url
+    ), (
+        "Убедитесь, что при переносе поста в другую категорию сбрасывается"
+        " кэш страницы прежней категории."
+    )
+
+    post.category.is_published = False
+    post.category.save()
+    assert post.title not in _content(unlogged_client, "/"), (
+        "Убедитесь, что снятие категории с публикации сбрасывает кэш ленты."
+    )
+
+
+def test_cache_respects_scheduled_posts(
+        mixer, user, unlogged_client, published_category, monkeypatch
+):
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() + timedelta(seconds=30),
+    )
+    timeouts = []
+    from blog import caching
+
+    monkeypatch.setattr(
+        caching.cache, "set",
+        lambda key, value, timeout=None: timeouts.append(timeout),
+    )
+    unlogged_client.get("/")
+    assert timeouts and 0 < timeouts[-1] <= 30, (
+        "Убедитесь, что лента хранится в кэше не дольше, чем до публикации"
+        " ближайшего отложенного поста."
+    )
+
+
+def test_post_cards_are_cached_by_version(
+        mixer, user, user_client, post_with_published_location
+):
+    from django.core.cache import cache
+    from django.core.cache.utils import make_template_fragment_key
+
+    post = post_with_published_location
+    response = user_client.get("/")
+    card_version = response.context["page_obj"][0].card_version
+    key = make_template_fragment_key("post_card", [post.id, card_version])
+    assert cache.get(key), (
+        "Убедитесь, что карточка поста кэшируется фрагментом с ключом"
+        " из id поста и его версии."
+    )
+
+    mixer.blend("blog.Comment", post=post, author=user)
+    profile = user_client.get(f"/profile/{post.author.username}/")
+    assert profile.context["page_obj"][0].card_version != card_version, (
+        "Убедитесь, что версия карточки меняется вместе со счётчиком"
+        " комментариев."
+    )
+    assert "Комментарии (1)" in profile.content.decode("utf-8")
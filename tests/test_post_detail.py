@@ -0,0 +1,198 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from blog.caching import publication_state
+
+pytestmark = [pytest.mark.django_db]
+
+# Сессия, пользователь, пост вместе с автором, категорией и
+# местоположением, страница комментариев вместе с их авторами.
+POST_DETAIL_QUERIES = 4
+
+
+def test_post_detail_query_count(
+        mixer, user, another_user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(5).blend("blog.Comment", post=post, author=another_user)
+    mixer.cycle(5).blend("blog.Comment", post=post, author=user)
+    publication_state()
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.get(f"/posts/{post.id}/")
+    assert response.status_code == 200
+    assert len(queries) == POST_DETAIL_QUERIES, (
+        f"Убедитесь, что страница поста выполняет {POST_DETAIL_QUERIES}"
+        f" запроса к БД, а не {len(queries)}: пост загружается один раз,"
+        " авторы комментариев — вместе с комментариями."
+    )
+
+
+def test_post_detail_comments_are_paginated(
+        mixer, user, user_client, post_with_published_location
+):
+    from blog.views import COMMENTS_PER_PAGE
+
+    post = post_with_published_location
+    comments = mixer.cycle(COMMENTS_PER_PAGE + 5).blend(
+        "blog.Comment", post=post, author=user
+    )
+    first = user_client.get(f"/posts/{post.id}/").context["comments"]
+    ids = [comment.id for comment in comments]
+    assert [entry.id for entry in first] == ids[:COMMENTS_PER_PAGE], (
+        "Убедитесь, что на странице поста выводится первая страница"
+        " комментариев в порядке их создания."
+    )
+    assert first.has_next()
+
+    second = user_client.get(
+        f"/posts/{post.id}/?cursor={first.next_cursor}"
+    ).context["comments"]
+    assert [entry.id for entry in second] == ids[COMMENTS_PER_PAGE:], (
+        "Убедитесь, что ссылка «следующая страница» выводит оставшиеся"
+        " комментарии."
+    )
+
+    response = user_client.post(
+        f"/posts/{post.id}/comment/", data={"text": "Последнее слово"}
+    )
+    assert "?cursor=" in response.url and "#comment_" in response.url, (
+        "Убедитесь, что после добавления комментария к длинному обсуждению"
+        " пользователь попадает на последнюю страницу, к своему комментарию."
+    )
+    last = user_client.get(response.url)
+    assert "Последнее слово" in last.content.decode("utf-8")
+    assert not last.context["comments"].has_next()
+
+
+def test_hot_post_comments_come_from_snapshot(
+        settings, mixer, user, another_user, user_client,
+        post_with_published_location
+):
+    settings.BLOG_COMMENT_SNAPSHOT_THRESHOLD = 3
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    user_client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        user_client.get(url)
+    assert not [q for q in queries if "blog_comment" in q["sql"]], (
+        "Убедитесь, что комментарии популярного поста выводятся из снимка"
+        " в кэше, без запросов к таблице комментариев."
+    )
+
+    user_client.post(f"{url}comment/", data={"text": "Свежий отзыв"})
+    comment = post.comments.get(text="Свежий отзыв")
+    with CaptureQueriesContext(connection) as queries:
+        content = user_client.get(url).content.decode("utf-8")
+    assert not [q for q in queries if "blog_comment" in q["sql"]], (
+        "Убедитесь, что новый комментарий дописывается в снимок, а не"
+        " вызывает его пересборку."
+    )
+    assert "Свежий отзыв" in content, (
+        "Убедитесь, что новый комментарий попадает в снимок обсуждения."
+    )
+    assert f"/edit_comment/{comment.id}/" in content, (
+        "Убедитесь, что автор видит кнопки правки своего комментария"
+        " и в снимке обсуждения."
+    )
+    another_client = Client()
+    another_client.force_login(another_user)
+    assert f"/edit_comment/{comment.id}/" not in another_client.get(
+        url
+    ).content.decode("utf-8"), (
+        "Убедитесь, что кнопки правки комментария видит только его автор."
+    )
+
+    user_client.post(f"{url}edit_comment/{comment.id}/",
+                     data={"text": "Исправленный отзыв"})
+    content = user_client.get(url).content.decode("utf-8")
+    assert "Исправленный отзыв" in content and "Свежий отзыв" not in content, (
+        "Убедитесь, что правка комментария обновляет снимок обсуждения."
+    )
+
+    user_client.post(f"{url}delete_comment/{comment.id}/")
+    assert "Исправленный отзыв" not in user_client.get(url).content.decode(
+        "utf-8"
+    ), "Убедитесь, что удалённый комментарий пропадает из снимка."
+
+
+def test_snapshot_pages_match_database_pages(
+        settings, monkeypatch, mixer, user, user_client,
+        post_with_published_location
+):
+    from blog import snapshots, views
+
+    settings.BLOG_COMMENT_SNAPSHOT_THRESHOLD = 1
+    monkeypatch.setattr(snapshots, "CHUNK_SIZE", 3)
+    monkeypatch.setattr(views, "COMMENTS_PER_PAGE", 4)
+    post = post_with_published_location
+    comments = mixer.cycle(11).blend("blog.Comment", post=post, author=user)
+    comments[4].delete()
+    ids = [comment.id for comment in comments if comment.pk]
+    url = f"/posts/{post.id}/"
+
+    pages, cursor = [], ""
+    while True:
+        page = user_client.get(f"{url}?cursor={cursor}").context["comments"]
+        pages.append([entry.id for entry in page])
+        if not page.has_next():
+            break
+        cursor = page.next_cursor
+    assert pages == [ids[:4], ids[4:8], ids[8:]], (
+        "Убедитесь, что страницы обсуждения из снимка совпадают"
+        " со страницами из базы данных."
+    )
+    previous = user_client.get(
+        f"{url}?cursor={page.previous_cursor}"
+    ).context["comments"]
+    assert [entry.id for entry in previous] == ids[4:8]
+    last = user_client.get(f"{url}?cursor={page.last_cursor}")
+    assert [entry.id for entry in last.context["comments"]] == ids[6:]
+
+
+def test_snapshot_miss_is_built_in_background(
+        settings, mixer, user, another_user, user_client,
+        post_with_published_location
+):
+    from blog import snapshots
+    from blog.models import Job
+
+    settings.BLOG_COMMENT_SNAPSHOT_THRESHOLD = 3
+    settings.BLOG_JOBS_EAGER = False
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    comments = mixer.cycle(3).blend("blog.Comment", post=post,
+                                    author=another_user)
+    for _ in range(2):
+        response = user_client.get(url)
+        assert len(response.context["comments"]) == 3
+    assert Job.objects.filter(task="blog.build_snapshot").count() == 1, (
+        "Убедитесь, что снимок обсуждения собирает фоновая задача,"
+        " поставленная один раз, а страница пока читается из базы."
+    )
+    call_command("run_jobs", once=True)
+    with CaptureQueriesContext(connection) as queries:
+        user_client.get(url)
+    assert not [q for q in queries if "blog_comment" in q["sql"]]
+
+    comment = comments[0]
+    cache.add(snapshots._lock_key(post.id), 1)
+    comment.text = "Правка при занятой блокировке"
+    comment.save()
+    assert cache.get(snapshots._manifest_key(post.id)) is not None, (
+        "Убедитесь, что при занятой блокировке снимок не удаляется."
+    )
+    cache.delete(snapshots._lock_key(post.id))
+    content = user_client.get(url).content.decode("utf-8")
+    assert "Правка при занятой блокировке" in content, (
+        "Убедитесь, что устаревший снимок не показывается читателям."
+    )
+    call_command("run_jobs", once=True)
+    with CaptureQueriesContext(connection) as queries:
+        content = user_client.get(url).content.decode("utf-8")
+    assert not [q for q in queries if "blog_comment" in q["sql"]]
+    assert "Правка при занятой блокировке" in content
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+from django.db.models.query import QuerySet
+
+from blog.models import Post, PostQuerySet
+from blog.query_budget import QueryBudgetError, shape
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def lazy_feed(monkeypatch):
+    # Лента без select_related: карточка дочитывает автора по одному.
+    monkeypatch.setattr(PostQuerySet, "for_feed", QuerySet.all)
+
+
+def test_shape_ignores_values():
+    assert shape(
+        "SELECT * FROM blog_post WHERE id IN (%s, %s, %s) LIMIT 21"
+    ) == shape("SELECT * FROM blog_post WHERE id IN (%s, %s) LIMIT 10")
+    assert shape("SELECT 'a' FROM t WHERE x = 1") == (
+        "SELECT ? FROM t WHERE x = ?"
+    )
+
+
+def test_n_plus_one_fails_request(
+        lazy_feed, unlogged_client, many_posts_with_published_locations
+):
+    with pytest.raises(QueryBudgetError) as error:
+        unlogged_client.get("/")
+    message = str(error.value)
+    assert "blog:index" in message and "N+1" in message, (
+        "Убедитесь, что повтор запросов одной формы в ленте считается N+1."
+    )
+    assert "includes/post_card_body.html:" in message, (
+        "Убедитесь, что в отчёте о N+1 указана строка шаблона, которая"
+        " выполнила запрос."
+    )
+    assert "запросов при бюджете 6" in message
+
+
+@pytest.mark.query_budget("log")
+def test_log_mode_only_warns(
+        lazy_feed, caplog, unlogged_client,
+        many_posts_with_published_locations
+):
+    with caplog.at_level(logging.WARNING, logger="blog.middleware"):
+        assert unlogged_client.get("/").status_code == 200
+    assert "N+1" in caplog.text
+
+
+def test_feed_pages_fit_budget(
+        user_client, published_category, user,
+        many_posts_with_published_locations
+):
+    for url in ("/", f"/category/{published_category.slug}/",
+                f"/profile/{user.username}/"):
+        assert user_client.get(url).status_code == 200
+
+
+def test_query_budget_fixture(query_budget,
+                              many_posts_with_published_locations):
+    with query_budget(1) as recorder:
+        list(Post.objects.for_feed()[:10])
+    assert len(recorder) == 1
+    with pytest.raises(QueryBudgetError, match="N\\+1"):
+        with query_budget():
+            for post in Post.objects.all()[:10]:
+                post.author.username
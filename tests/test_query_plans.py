@@ -0,0 +1,19 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="Планы проверяются для SQLite."
+)
+def test_feed_queries_use_indexes():
+    try:
+        call_command("check_query_plans")
+    except CommandError as e:
+        raise AssertionError(
+            "Убедитесь, что для запросов лент и комментариев есть индексы:"
+            f" `check_query_plans` сообщает: {e}"
+        )
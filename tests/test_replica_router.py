@@ -0,0 +1,58 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from blog.middleware import PRIMARY_COOKIE, PrimaryStickinessMiddleware
+from blog.models import Post
+from blog.routers import ReplicaRouter, new_request_state, request_state
+
+REPLICAS = override_settings(DATABASE_REPLICAS=["replica1"])
+
+
+def _read_db(state):
+    token = request_state.set(state)
+    try:
+        return ReplicaRouter().db_for_read(Post)
+    finally:
+        request_state.reset(token)
+
+
+@REPLICAS
+def test_reads_go_to_replica_until_write():
+    state = new_request_state()
+    assert _read_db(state) == "replica1", (
+        "Убедитесь, что чтение постов в запросе без записи идёт с реплики."
+    )
+    token = request_state.set(state)
+    try:
+        assert ReplicaRouter().db_for_write(Post) == "default"
+    finally:
+        request_state.reset(token)
+    assert _read_db(state) == "default", (
+        "Убедитесь, что после записи чтение в том же запросе идёт"
+        " с основной базы."
+    )
+    assert _read_db(new_request_state(pinned=True)) == "default"
+
+
+@REPLICAS
+def test_writer_is_pinned_to_primary():
+    def view(request):
+        if request.method == "POST":
+            ReplicaRouter().db_for_write(Post)
+        return HttpResponse(_read_db(request_state.get()))
+
+    middleware = PrimaryStickinessMiddleware(view)
+    factory = RequestFactory()
+    response = middleware(factory.post("/posts/1/comment/"))
+    assert PRIMARY_COOKIE in response.cookies, (
+        "Убедитесь, что запрос с записью закрепляет пользователя за"
+        " основной базой."
+    )
+
+    request = factory.get("/")
+    request.COOKIES[PRIMARY_COOKIE] = response.cookies[PRIMARY_COOKIE].value
+    assert middleware(request).content == b"default", (
+        "Убедитесь, что недавно писавший пользователь читает с основной базы."
+    )
+    assert middleware(factory.get("/")).content == b"replica1"
@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _found(client, query):
+    response = client.get("/search/", {"q": query})
+    assert response.status_code == 200
+    return [post.id for post in response.context["page_obj"]]
+
+
+@pytest.fixture
+def search_posts(mixer, user, published_category):
+    def blend(**kwargs):
+        fields = {
+            "author": user,
+            "category": published_category,
+            "is_published": True,
+            "pub_date": timezone.now() - timedelta(days=1),
+            "text": "Обычный текст",
+        }
+        fields.update(kwargs)
+        return mixer.blend("blog.Post", **fields)
+    return blend
+
+
+def test_search_stems_and_ranks(unlogged_client, search_posts):
+    in_text = search_posts(title="Прогулка", text="Мы гуляли с котами.")
+    in_title = search_posts(title="Коты и кошки")
+    search_posts(title="Про собак", text="Только собака.")
+    assert _found(unlogged_client, "кот") == [in_title.id, in_text.id], (
+        "Убедитесь, что поиск находит словоформы запроса и ставит"
+        " совпадения в заголовке выше совпадений в тексте."
+    )
+    assert _found(unlogged_client, "!!!") == []
+
+
+def test_search_respects_publication(
+        unlogged_client, search_posts, mixer, user
+):
+    search_posts(title="Черновик про сову", is_published=False)
+    search_posts(
+        title="Отложенная сова", pub_date=timezone.now() + timedelta(days=1)
+    )
+    hidden_category = mixer.blend("blog.Category", is_published=False)
+    search_posts(title="Сова в скрытой категории", category=hidden_category)
+    assert _found(unlogged_client, "сова") == [], (
+        "Убедитесь, что поиск выводит только опубликованные посты"
+        " опубликованных категорий с наступившей датой публикации."
+    )
+
+
+def test_search_index_follows_posts(unlogged_client, search_posts):
+    post = search_posts(title="Старый заголовок")
+    post.title = "Новый заголовок про ежей"
+    post.save()
+    assert _found(unlogged_client, "ежи") == [post.id], (
+        "Убедитесь, что правка поста обновляет поисковый индекс."
+    )
+    assert _found(unlogged_client, "старый") == []
+
+    post.delete()
+    assert _found(unlogged_client, "ежи") == [], (
+        "Убедитесь, что удалённый пост пропадает из поискового индекса."
+    )
+
+
+def test_rebuild_search_index(unlogged_client, search_posts):
+    posts = [search_posts(title=f"Лиса номер {n}") for n in range(3)]
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM blog_post_fts")
+    call_command("rebuild_search_index", batch_size=2)
+    assert sorted(_found(unlogged_client, "лисы")) == [
+        post.id for post in posts
+    ], "Убедитесь, что команда `rebuild_search_index` заполняет индекс."
+
+
+@pytest.fixture
+def inverted_index(settings, tmp_path, django_capture_on_commit_callbacks):
+    settings.BLOG_SEARCH_BACKEND = "blog.search.inverted.InvertedIndexBackend"
+    settings.BLOG_SEARCH_INDEX_DIR = tmp_path / "search_index"
+
+    def committed():
+        # Индекс пишется после фиксации транзакции с постом.
+        return django_capture_on_commit_callbacks(execute=True)
+    return committed
+
+
+def test_inverted_index_queries(unlogged_client, search_posts, inverted_index):
+    with inverted_index():
+        red = search_posts(title="Рыжий кот", text="Кот спит на солнце.")
+        other = search_posts(title="Кот и рыжая лиса")
+        programming = search_posts(title="О программировании")
+    assert sorted(_found(unlogged_client, "кот")) == [red.id, other.id]
+    assert _found(unlogged_client, '"рыжий кот"') == [red.id], (
+        "Убедитесь, что запрос в кавычках ищет слова подряд."
+    )
+    assert _found(unlogged_client, "програм*") == [programming.id], (
+        "Убедитесь, что запрос со звёздочкой ищет по началу слова."
+    )
+    assert _found(unlogged_client, "кот лиса") == [other.id]
+
+
+def test_inverted_index_follows_posts(
+        unlogged_client, search_posts, inverted_index
+):
+    from blog.search import inverted
+
+    with inverted_index():
+        posts = [search_posts(title=f"Ёж номер {n}")
+                 for n in range(inverted.MAX_SEGMENTS + 2)]
+    with inverted_index():
+        posts[0].title = "Белка"
+        posts[0].save()
+        posts[1].delete()
+    assert _found(unlogged_client, "белка") == [posts[0].id]
+    assert sorted(_found(unlogged_client, "еж")) == [
+        post.id for post in posts[2:]
+    ], (
+        "Убедитесь, что правка и удаление поста обновляют индекс, в том"
+        " числе после слияния сегментов."
+    )
+    manifest = inverted.InvertedIndexBackend()._manifest()
+    assert len(manifest["segments"]) <= inverted.MAX_SEGMENTS
+
+
+def test_search_prefix_of_word_form(unlogged_client, search_posts):
+    cats = search_posts(title="Прогулка", text="Мы гуляли с котами.")
+    search_posts(title="Про собак", text="Только собака.")
+    assert _found(unlogged_client, "котам*") == [cats.id], (
+        "Убедитесь, что запрос со звёздочкой находит слова, начало которых"
+        " длиннее их основы в индексе."
+    )
+
+
+def test_inverted_reader_reuses_segments(
+        unlogged_client, search_posts, inverted_index
+):
+    from blog.search import inverted
+
+    backend = inverted.InvertedIndexBackend()
+    with inverted_index():
+        first = search_posts(title="Первый барсук")
+    with inverted_index():
+        second = search_posts(title="Второй барсук")
+    old = backend.reader()
+    with inverted_index():
+        first.delete()
+    new = backend.reader()
+    assert new is not old
+    assert new.segments[:2] == old.segments, (
+        "Убедитесь, что после записи читатель не перечитывает сегменты,"
+        " которые не менялись."
+    )
+    assert _found(unlogged_client, "барсук") == [second.id]
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+MANAGE = Path(__file__).resolve().parent.parent / "blogicum" / "manage.py"
+
+
+def test_migrate_switches_database_to_wal(tmp_path):
+    db_path = tmp_path / "db.sqlite3"
+    environment = dict(
+        os.environ, BLOGICUM_ENV="bench", BLOGICUM_BENCH_DB=str(db_path)
+    )
+    environment.pop("DJANGO_SETTINGS_MODULE", None)
+    subprocess.run(
+        [sys.executable, str(MANAGE), "migrate", "-v", "0"],
+        env=environment, check=True, capture_output=True,
+    )
+    with sqlite3.connect(db_path) as connection:
+        mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal", (
+        "Убедитесь, что после `migrate` база SQLite переведена в режим WAL:"
+        " режим хранится в файле базы и не выставляется на каждое"
+        " соединение."
+    )
+
+
+def test_connection_sets_only_connection_pragmas(tmp_path):
+    from django.db import connection
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+
+    db_path = tmp_path / "db.sqlite3"
+    sqlite3.connect(db_path).close()
+    wrapper = DatabaseWrapper(
+        {**connection.settings_dict, "NAME": str(db_path)}, alias="pragmas"
+    )
+    try:
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            mode = cursor.fetchone()[0]
+            cursor.execute("PRAGMA busy_timeout")
+            timeout = cursor.fetchone()[0]
+    finally:
+        wrapper.close()
+    assert timeout == 5000
+    assert mode == "delete", (
+        "Убедитесь, что новому соединению не выставляется journal_mode:"
+        " его выставляет `migrate`."
+    )
@@ -0,0 +1,88 @@
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from django.core.files.images import ImageFile
+from django.core.management import call_command
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def _image(width, height, name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), color=(73, 109, 137)).save(
+        buffer, format="JPEG"
+    )
+    return ImageFile(buffer, name=name)
+
+
+def _variants(media_root):
+    return sorted(path.name for path in (media_root / "posts_images").glob(
+        "*w.*"
+    ))
+
+
+def test_upload_creates_variants(
+        media_root, mixer, user, unlogged_client, published_category
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, image=_image(2000, 1000),
+    )
+    stem = post.image.name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    assert _variants(media_root) == sorted(
+        f"{stem}.{width}w.{ext}"
+        for width in (320, 640, 1280) for ext in ("jpg", "webp")
+    ), "Убедитесь, что при загрузке фото рядом сохраняются его копии."
+    with Image.open(media_root / "posts_images" / f"{stem}.640w.webp") as f:
+        assert f.size == (640, 320)
+
+    content = unlogged_client.get("/").content.decode("utf-8")
+    assert f"{stem}.320w.webp 320w" in content, (
+        "Убедитесь, что карточка поста отдаёт копии фото через srcset."
+    )
+    assert f'{stem}.1280w.jpg" srcset=' in content
+    assert f'href="{post.image.url}"' in content, (
+        "Убедитесь, что фото по-прежнему открывается в оригинале."
+    )
+
+
+def test_narrow_image_is_not_upscaled(media_root, mixer, user):
+    post = mixer.blend("blog.Post", author=user, image=_image(100, 80))
+    stem = post.image.name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    assert _variants(media_root) == [f"{stem}.100w.jpg",
+                                     f"{stem}.100w.webp"], (
+        "Убедитесь, что копии не бывают шире оригинала."
+    )
+
+
+def test_backfill_command(
+        media_root, mixer, user, unlogged_client, published_category
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, image=_image(700, 700),
+    )
+    for path in (media_root / "posts_images").glob("*w.*"):
+        path.unlink()
+    cache.clear()
+    content = unlogged_client.get("/").content.decode("utf-8")
+    assert "srcset" not in content and post.image.url in content, (
+        "Пока копий нет, карточка должна показывать оригинал."
+    )
+
+    call_command("generate_thumbnails", workers=2)
+    assert len(_variants(media_root)) == 6, (
+        "Убедитесь, что команда generate_thumbnails создаёт копии"
+        " для уже загруженных фото."
+    )
+    assert "700w" in unlogged_client.get("/").content.decode("utf-8"), (
+        "Убедитесь, что после команды карточки в кэше обновляются."
+    )